@@ -24,12 +24,27 @@ __maintainer__ = 'Patrick Michl'
 __authors__ = ['Patrick Michl <patrick.michl@gmail.com>']
 __credits__ = ['Willi Jäger', 'Rainer König']
 
-import nemoa.dataset
-import nemoa.model
-import nemoa.network
-import nemoa.system
-import nemoa.workspace
-from nemoa import session
+import importlib
+
+# Subpackages and submodules are imported with their first access by the
+# module level function __getattr__ (PEP 562), such that 'import nemoa' does
+# not import numpy, networkx etc. and does not probe the environment.
+
+def __getattr__(name):
+    """Import subpackage or submodule with the first attribute access."""
+    if not name.startswith('_'):
+        try:
+            return importlib.import_module(__name__ + '.' + name)
+        except ModuleNotFoundError as err:
+            if err.name != __name__ + '.' + name:
+                raise
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+def __dir__():
+    """Get names of module attributes, subpackages and submodules."""
+    import pkgutil
+    names = [info.name for info in pkgutil.iter_modules(__path__)]
+    return sorted(globals().keys() | names)
 
 def about(*args, **kwds):
     """Get meta information about current instance."""
@@ -41,6 +56,7 @@ def close():
 
 def get(*args, **kwds):
     """Get value from configuration instance."""
+    from nemoa import session
     return session.get(*args, **kwds)
 
 def list(*args, **kwds):
@@ -49,20 +65,25 @@ def list(*args, **kwds):
 
 def log(*args, **kwds):
     """Log errors, warnings, notes etc. to console and logfiles."""
+    from nemoa import session
     return session.log(*args, **kwds)
 
 def open(*args, **kwds):
     """Open object instance in current session."""
+    from nemoa import session
     return session.open(*args, **kwds)
 
 def path(*args, **kwds):
     """Get path to given object type or object."""
+    from nemoa import session
     return session.path(*args, **kwds)
 
 def run(*args, **kwds):
     """Run nemoa python script in current session."""
+    from nemoa import session
     return session.run(*args, **kwds)
 
 def set(*args, **kwds):
     """Set value in configuration instance."""
+    from nemoa import session
     return session.set(*args, **kwds)
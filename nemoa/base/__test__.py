@@ -8,9 +8,12 @@ __docformat__ = 'google'
 
 import tempfile
 import datetime
+import sys
 from pathlib import Path
+from unittest import skipUnless
+import numpy as np
 from nemoa.base import entity, binary, check, env, literal, stdio, this
-from nemoa.base import nbase, ndict
+from nemoa.base import nbase, ndict, shmem
 from nemoa.test import ModuleTestCase, Case
 from nemoa.types import Any, Function, Module, PathLikeList, StrList
 from nemoa.types import OrderedDict
@@ -157,6 +160,37 @@ class TestAssess(ModuleTestCase):
         names = entity.get_methods(obj, pattern='*b').keys()
         self.assertEqual(names, {'getb', 'setb'})
 
+    def test_get_registry(self) -> None:
+        obj = self.get_test_object()
+        registry = entity.get_registry(type(obj), pattern='get*')
+        self.assertIs(registry, entity.get_registry(type(obj), pattern='get*'))
+        self.assertEqual(registry.select(obj).keys(), {'geta', 'getb'})
+
+    def test_Registry(self) -> None:
+        obj = self.get_test_object()
+        registry = entity.Registry(type(obj), key='name', groupby='group')
+        self.assertEqual(registry.select(obj).keys(), {'a', 'b'})
+        self.assertEqual(registry.select(obj, 2, 'name'), {'b': 'b'})
+        self.assertEqual(
+            registry.groups(obj, 'group'), {1: {'a': 1}, 2: {'b': 2}})
+        self.assertEqual(registry.get(obj, 'a', val='group'), 1)
+        self.assertIsNone(registry.get(obj, 'a', 2))
+        method = registry.get(obj, 'b')['reference']
+        self.assertEqual(method.__self__, obj)
+
+    def test_Dispatcher(self) -> None:
+        from nemoa.errors import NotInSequenceError
+        dispatcher = entity.Dispatcher(
+            'nemoa.base.entity', {'get': 'get_', 'split': 'split_'})
+        self.assertIs(dispatcher.get('name', 'get'), entity.get_name)
+        self.assertEqual(dispatcher.call('name', 'get', list), 'list')
+        self.assertEqual(dispatcher.call('args', 'split', 'f(1)'),
+            ('f', (1, ), {}))
+        with self.assertRaises(NotInSequenceError):
+            dispatcher.get('name', 'set')
+        with self.assertRaises(NotInSequenceError):
+            dispatcher.get('unknown', 'get')
+
     def test_wrap_attr(self) -> None:
         obj = self.get_test_object()
         self.assertEqual(getattr(obj.geta, 'name', None), 'a')
@@ -746,3 +780,49 @@ class TestThis(ModuleTestCase):
         fullname = this.crop_functions.__module__ + '.' + name
         cropped = this.crop_functions(prefix='crop_', ref=this)
         self.assertIn('functions', cropped)
+
+    def test_get_functions(self) -> None:
+        funcs = this.get_functions(prefix='crop_', ref=this)
+        self.assertEqual(funcs, {'functions': this.crop_functions})
+
+class TestShmem(ModuleTestCase):
+    """Testcase for the module nemoa.base.shmem."""
+
+    module = 'nemoa.base.shmem'
+
+    def test_ArraySpec(self) -> None:
+        spec = shmem.ArraySpec('name', (2, 3), '<f8')
+        self.assertEqual(spec.shape, (2, 3))
+
+    def test_is_available(self) -> None:
+        self.assertEqual(shmem.is_available(), sys.version_info >= (3, 8))
+
+    @skipUnless(shmem.is_available(), "requires shared memory")
+    def test_share(self) -> None:
+        arr = np.arange(6.).reshape(2, 3)
+        obj, blocks = shmem.share({'a': [arr, 1], 'b': (arr, )})
+        try:
+            self.assertIsInstance(obj['a'][0], shmem.ArraySpec)
+            self.assertEqual(obj['a'][0].shape, (2, 3))
+            self.assertEqual(obj['a'][1], 1)
+            self.assertEqual(len(blocks), 2)
+        finally:
+            shmem.release(blocks, unlink=True)
+
+    @skipUnless(shmem.is_available(), "requires shared memory")
+    def test_attach(self) -> None:
+        arr = np.arange(6.).reshape(2, 3)
+        spec, blocks = shmem.share({'a': arr})
+        try:
+            obj, attached = shmem.attach(spec)
+            self.assertTrue(np.all(obj['a'] == arr))
+            obj['a'][0, 0] = -1.
+            obj2, attached2 = shmem.attach(spec)
+            self.assertEqual(obj2['a'][0, 0], -1.)
+            del obj, obj2
+            shmem.release(attached + attached2)
+        finally:
+            shmem.release(blocks, unlink=True)
+
+    def test_release(self) -> None:
+        pass # Function is testet in shmem.share and shmem.attach
@@ -7,6 +7,7 @@ __license__ = 'GPLv3'
 __docformat__ = 'google'
 
 import ast
+import functools
 import importlib
 import inspect
 import pkgutil
@@ -15,7 +16,7 @@ from nemoa.types import Any, ClassInfo, OptStr, OptStrDictOfTestFuncs
 from nemoa.types import OptModule, Module, StrList, OptFunction, Function
 from nemoa.types import Tuple, RecDict, Union, StrDict
 from nemoa.types import DictOfRecDicts, FuncWrapper, Method, StrOrType
-from nemoa.types import Callable, OrderedDict, Collection
+from nemoa.types import Callable, OrderedDict, Collection, Dict
 
 #
 # Structural Types
@@ -322,29 +323,48 @@ def get_parameters(obj: Callable, *args: Any, **kwds: Any) -> OrderedDict:
     # Check 'obj'
     check.is_callable("first argument", obj)
 
+    return _get_binder(obj)(*args, **kwds)
+
+def _get_binder(obj: Callable) -> Callable[..., OrderedDict]:
+    # Parameter filters of plain functions are only created once. Bound
+    # methods are not cached, since the cache would keep their instances
+    # alive.
+    if isinstance(obj, Function):
+        return _get_cached_binder(obj)
+    return _create_binder(obj)
+
+@functools.lru_cache(maxsize=None)
+def _get_cached_binder(obj: Callable) -> Callable[..., OrderedDict]:
+    return _create_binder(obj)
+
+def _create_binder(obj: Callable) -> Callable[..., OrderedDict]:
     # Get all Arguments
     spec = inspect.getfullargspec(obj)
     spec_args = spec.args
+    spec_keys = set(spec_args)
     spec_defaults = spec.defaults or []
-    args_list = list(zip(spec_args, args))
-
-    # Update Defaults
-    args_keys = dict(args_list).keys()
     defaults_list = list(zip(spec_args, spec_defaults[::-1]))[::-1]
-    for key, val in defaults_list:
-        if key not in args_keys:
-            args_list.append((key, val))
-    params = OrderedDict(args_list)
-
-    # Update Keyword Arguments
-    if spec.varkw:
-        params.update(kwds)
-    else:
-        for key, val in kwds.items():
-            if key in spec.args:
+    varkw = bool(spec.varkw)
+
+    def bind(*args: Any, **kwds: Any) -> OrderedDict:
+        params = OrderedDict(zip(spec_args, args))
+
+        # Update Defaults
+        for key, val in defaults_list:
+            if key not in params:
                 params[key] = val
 
-    return params
+        # Update Keyword Arguments
+        if varkw:
+            params.update(kwds)
+        else:
+            for key, val in kwds.items():
+                if key in spec_keys:
+                    params[key] = val
+
+        return params
+
+    return bind
 
 def call_attr(obj: object, attr: str, *args: Any, **kwds: Any) -> Any:
     """Call an object attribute with given arguments.
@@ -445,6 +465,44 @@ def get_methods(
 
     return mdict
 
+def get_registry(
+        cls: type, pattern: OptStr = None, key: OptStr = None,
+        groupby: OptStr = None) -> 'Registry':
+    """Get registry of the methods of a given class.
+
+    The registry is created with the first request and shared by all
+    instances of the class and all further requests with equal arguments.
+    Since the registry is not updated, methods which are added to the class
+    after the first request are not registered. The registries are stored
+    in the namespace of the class, such that they share its lifetime.
+
+    Args:
+        cls: Class object
+        pattern: Only methods, which names satisfy the wildcard pattern given
+            by 'pattern' are registered. The format of the wildcard pattern
+            is described in the standard library module :py:mod:`fnmatch`.
+        key: Name of the attribute which is used as the key of the
+            registered methods. If key is None, then the method names are
+            used as key. Default: None
+        groupby: Name of attribute which value is used to group the
+            registered methods. If groupby is None, then the methods are not
+            grouped. Default: None
+
+    Returns:
+        Instance of the class :class:`Registry`.
+
+    """
+    # Registries are not inherited by subclasses
+    registries = cls.__dict__.get('_registries')
+    if registries is None:
+        registries = {}
+        setattr(cls, '_registries', registries)
+    args = (pattern, key, groupby)
+    if args not in registries:
+        registries[args] = Registry(
+            cls, pattern=pattern, key=key, groupby=groupby)
+    return registries[args]
+
 def split_args(text: str) -> Tuple[str, tuple, dict]:
     """Split a function call in the function name, its arguments and keywords.
 
@@ -613,3 +671,221 @@ def search(
                 fd[name] = attr[val]
 
     return fd
+
+#
+# Classes
+#
+
+class Registry:
+    """Registry of the methods of a class.
+
+    The registry inspects the class once and indexes the attributes of its
+    methods by their key and their group, such that single methods are
+    looked up in constant time. Since the registry is shared by all
+    instances of the class, the methods are bound to a given instance,
+    when they are looked up. The bound method is referenced by the
+    attribute 'reference'.
+
+    Args:
+        cls: Class object
+        pattern: Only methods, which names satisfy the wildcard pattern given
+            by 'pattern' are registered. Default: None
+        key: Name of the attribute which is used as the key of the
+            registered methods. If key is None, then the method names are
+            used as key. Default: None
+        groupby: Name of attribute which value is used to group the
+            registered methods. Methods without this attribute are
+            registered, but not grouped. Default: None
+
+    """
+
+    _funcs: Dict[Any, Any]
+    _attrs: RecDict
+    _groups: DictOfRecDicts
+
+    def __init__(
+            self, cls: type, pattern: OptStr = None, key: OptStr = None,
+            groupby: OptStr = None) -> None:
+        self._funcs = {}
+        self._attrs = {}
+        self._groups = {}
+
+        # Get methods from static class inspection, which in difference to
+        # the inspection of instances does not evaluate properties
+        funcs = {}
+        for name in dir(cls):
+            func = inspect.getattr_static(cls, name)
+            if isinstance(func, classmethod):
+                funcs[name] = func
+            elif isinstance(func, Function):
+                funcs[name] = func
+        if pattern:
+            funcs = ndict.select(funcs, pattern)
+
+        for name, func in funcs.items():
+            attr = dict(getattr(func, '__func__', func).__dict__)
+            if key and key not in attr:
+                continue
+            doc = func.__doc__ or ''
+            about = doc.split('\n', 1)[0].strip(' .')
+            attr['about'] = attr.get('about', about)
+            attr.pop('reference', None)
+            k = str(attr[key]) if key else name
+            if k in self._attrs:
+                continue
+            self._funcs[k] = func
+            self._attrs[k] = attr
+            if groupby and groupby in attr:
+                self._groups.setdefault(attr[groupby], {})[k] = attr
+
+    def _bind(self, obj: object, key: Any, val: OptStr = None) -> Any:
+        attr = self._attrs[key]
+        if val == 'reference':
+            return self._funcs[key].__get__(obj, type(obj))
+        if val:
+            return attr.get(val, None)
+        attr = attr.copy()
+        attr['reference'] = self._funcs[key].__get__(obj, type(obj))
+        return attr
+
+    def get(
+            self, obj: object, key: Any, group: Any = None,
+            val: OptStr = None) -> Any:
+        """Get registered method.
+
+        Args:
+            obj: Instance of the class, to which the method is bound
+            key: Key of the method
+            group: If not None, only methods of the given group are
+                regarded. Default: None
+            val: Name of attribute which is returned. If val is None, then
+                all attributes of the method are returned. Default: None
+
+        Returns:
+            Dictionary with the attributes of the method, the value of a
+            given attribute or None if the method is not registered.
+
+        """
+        attrs = self._attrs if group is None else self._groups.get(group, {})
+        if key not in attrs:
+            return None
+        return self._bind(obj, key, val)
+
+    def select(
+            self, obj: object, group: Any = None,
+            val: OptStr = None) -> NestRecDict:
+        """Get registered methods.
+
+        Args:
+            obj: Instance of the class, to which the methods are bound
+            group: If not None, only methods of the given group are
+                returned. Default: None
+            val: Name of attribute which is used as the value for the
+                returned dictionary. If val is None, then all attributes of
+                the respective methods are returned. Default: None
+
+        Returns:
+            Dictionary with the registered methods.
+
+        """
+        attrs = self._attrs if group is None else self._groups.get(group, {})
+        return {key: self._bind(obj, key, val) for key in attrs}
+
+    def groups(self, obj: object, val: OptStr = None) -> DictOfRecDicts:
+        """Get registered methods grouped by their group.
+
+        Args:
+            obj: Instance of the class, to which the methods are bound
+            val: Name of attribute which is used as the value for the
+                returned dictionary. If val is None, then all attributes of
+                the respective methods are returned. Default: None
+
+        Returns:
+            Dictionary with groups as keys and dictionaries with the
+            registered methods of the respective group as values.
+
+        """
+        return {group: self.select(obj, group, val) for group in self._groups}
+
+class Dispatcher:
+    """Dispatcher of function families within a module.
+
+    The functions of a family are identified by a common prefix of their
+    names. They are registered with the first request of the family, such
+    that subsequent lookups only require a dictionary access. Together with
+    each function its parameter filter is registered, which maps the
+    arguments of a call to the parameters of the function like
+    :func:`get_parameters`.
+
+    Args:
+        module: Fully qualified name of the module, that implements the
+            functions
+        families: Dictionary, which maps the names of the function families
+            to the prefixes of the respective function names
+
+    """
+
+    _module: str
+    _prefixes: StrDict
+    _families: Dict[str, Dict[str, Tuple[Function, Callable]]]
+
+    def __init__(self, module: str, families: StrDict) -> None:
+        self._module = module
+        self._prefixes = families
+        self._families = {}
+
+    def _lookup(self, name: str, family: str) -> Tuple[Function, Callable]:
+        from nemoa.errors import NotInSequenceError
+
+        funcs = self._families.get(family)
+        if funcs is None:
+            if family not in self._prefixes:
+                raise NotInSequenceError(
+                    "argument 'family'", family, 'families')
+            prefix = self._prefixes[family]
+            members = get_members_dict(
+                get_module(self._module), classinfo=Function,
+                pattern=(prefix + '*'))
+            i = len(prefix)
+            funcs = {}
+            for each in members.values():
+                func = each['reference']
+                funcs[each['name'][i:]] = (func, _get_binder(func))
+            self._families[family] = funcs
+        entry = funcs.get(name.lower())
+        if entry is None:
+            raise NotInSequenceError(
+                "argument 'name'", name, f"{family} family")
+        return entry
+
+    def get(self, name: str, family: str) -> Function:
+        """Get function of a family by its name.
+
+        Args:
+            name: Name of the function within the family
+            family: Name of the function family
+
+        Returns:
+            Function, which is registered by the given name.
+
+        """
+        return self._lookup(name, family)[0]
+
+    def call(self, name: str, family: str, *args: Any, **kwds: Any) -> Any:
+        """Call function of a family by its name.
+
+        Args:
+            name: Name of the function within the family
+            family: Name of the function family
+            *args: Arguments, that are zipped into the parameters of the
+                function
+            **kwds: Keyword arguments, that are passed to the function, if
+                they are declared by the function or if the function allows
+                a variable number of keyword arguments
+
+        Returns:
+            Return value of the function.
+
+        """
+        func, bind = self._lookup(name, family)
+        return func(**bind(*args, **kwds))
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""Shared memory for numpy arrays."""
+
+__author__ = 'Patrick Michl'
+__email__ = 'frootlab@gmail.com'
+__license__ = 'GPLv3'
+__docformat__ = 'google'
+
+import importlib.util
+from typing import NamedTuple, TYPE_CHECKING
+import numpy as np
+from nemoa.types import Any, List, NpArray, Tuple
+
+#
+# Structural Types
+#
+
+class ArraySpec(NamedTuple):
+    """Reference to a numpy array in a shared memory block.
+
+    Array specifications are small and picklable, such that they can be
+    passed to other processes instead of the array data.
+
+    """
+
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+if TYPE_CHECKING:
+    from multiprocessing.shared_memory import SharedMemory
+
+Blocks = List['SharedMemory']
+
+#
+# Module Functions
+#
+
+def is_available() -> bool:
+    """Check if shared memory is supported by the Python interpreter.
+
+    Returns:
+        True if the module multiprocessing.shared_memory, which is provided
+        by Python 3.8 and later, can be imported, else False.
+
+    """
+    return importlib.util.find_spec('multiprocessing.shared_memory') \
+        is not None
+
+def _get_shared_memory() -> type:
+    try:
+        from multiprocessing.shared_memory import SharedMemory
+    except ImportError as err:
+        raise ImportError(
+            "requires module multiprocessing.shared_memory "
+            "(Python 3.8 or later)") from err
+    return SharedMemory
+
+def share(obj: Any) -> Tuple[Any, Blocks]:
+    """Copy numpy arrays within a nested structure to shared memory.
+
+    Args:
+        obj: Numpy array or arbitrary nested structure of dictionaries,
+            lists and tuples, which contains numpy arrays.
+
+    Returns:
+        Tuple, which contains the given structure with all numpy arrays
+        replaced by instances of the class :class:`ArraySpec` and the list of
+        the created shared memory blocks. The blocks have to be released
+        by :func:`release`, when they are not required anymore.
+
+    """
+    SharedMemory = _get_shared_memory()
+    blocks: Blocks = []
+
+    def create(arr: NpArray) -> ArraySpec:
+        arr = np.ascontiguousarray(arr)
+        block = SharedMemory(create=True, size=max(arr.nbytes, 1))
+        blocks.append(block)
+        view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=block.buf)
+        view[...] = arr
+        return ArraySpec(block.name, arr.shape, arr.dtype.str)
+
+    return _replace(obj, np.ndarray, create), blocks
+
+def attach(obj: Any) -> Tuple[Any, Blocks]:
+    """Attach to numpy arrays in shared memory within a nested structure.
+
+    Args:
+        obj: Nested structure, as returned by :func:`share`.
+
+    Returns:
+        Tuple, which contains the given structure with all instances of
+        the class :class:`ArraySpec` replaced by numpy arrays, that use the
+        shared memory as buffer, and the list of attached shared memory
+        blocks. The blocks have to be kept alive as long as the arrays are
+        used, and closed by :func:`release` afterwards.
+
+    """
+    SharedMemory = _get_shared_memory()
+    blocks: Blocks = []
+
+    def create(spec: ArraySpec) -> NpArray:
+        block = SharedMemory(name=spec.name)
+        blocks.append(block)
+        return np.ndarray(spec.shape, dtype=spec.dtype, buffer=block.buf)
+
+    return _replace(obj, ArraySpec, create), blocks
+
+def release(blocks: Blocks, unlink: bool = False) -> None:
+    """Close shared memory blocks.
+
+    Args:
+        blocks: List of shared memory blocks.
+        unlink: Boolean value, which determines if the shared memory blocks
+            are also destroyed. This should only be done by the process,
+            which created the blocks. Default: False
+
+    """
+    for block in blocks:
+        block.close()
+        if unlink:
+            block.unlink()
+
+def _replace(obj: Any, classinfo: type, func: Any) -> Any:
+    # ArraySpec is a tuple, and therefore has to be checked first
+    if isinstance(obj, classinfo):
+        return func(obj)
+    if isinstance(obj, dict):
+        return {key: _replace(val, classinfo, func)
+            for key, val in obj.items()}
+    if isinstance(obj, list):
+        return [_replace(val, classinfo, func) for val in obj]
+    if isinstance(obj, tuple):
+        return tuple(_replace(val, classinfo, func) for val in obj)
+    return obj
@@ -8,7 +8,7 @@ __docformat__ = 'google'
 
 import inspect
 from nemoa.base import entity, check
-from nemoa.types import Any, Module, OptModule, Function
+from nemoa.types import Any, Dict, Function, Module, OptModule
 
 def get_caller_module() -> Module:
     """Get reference to callers module."""
@@ -217,3 +217,26 @@ def crop_functions(prefix: str, ref: OptModule = None) -> list:
     # Create list of cropped function names
     i = len(prefix)
     return [each['name'][i:] for each in funcs.values()]
+
+def get_functions(prefix: str, ref: OptModule = None) -> Dict[str, Function]:
+    """Get dictionary with functions that satisfy a given prefix.
+
+    Args:
+        prefix: String
+        ref: Module reference. By default the current callers module is used.
+
+    Returns:
+        Dictionary, which maps the cropped function names to the respective
+        function references.
+
+    """
+    # Set default module to callers module
+    ref = ref or get_caller_module()
+
+    # Get functions of current callers module
+    funcs = entity.get_members_dict(
+        ref, classinfo=Function, pattern=(prefix + '*'))
+
+    # Create dictionary with cropped function names
+    i = len(prefix)
+    return {each['name'][i:]: each['reference'] for each in funcs.values()}
@@ -18,8 +18,8 @@ import warnings
 from pathlib import Path
 from nemoa.base import attrib, env
 from nemoa.errors import ExistsError, NotExistsError
-from nemoa.types import void, Any, AnyFunc, ClassVar, PathLike, StrList
-from nemoa.types import StrOrInt, OptPath, VoidFunc
+from nemoa.types import void, Any, AnyFunc, ClassVar, StrList
+from nemoa.types import StrOrInt, OptPath, VoidFunc, OptStr, OptPathLike
 
 #
 # Logger Class
@@ -32,7 +32,8 @@ class Logger(attrib.Container):
         name: String identifier of Logger, given as a period-separated
             hierarchical value like 'foo.bar.baz'. The name of a Logger also
             identifies respective parents and children by the name hierachy,
-            which equals the Python package hierarchy.
+            which equals the Python package hierarchy. If no name is given,
+            the name of the application is used.
         file: String or :term:`path-like object` that identifies a valid
             filename in the directory structure of the operating system. If they
             do not exist, the parent directories of the file are created. If no
@@ -54,9 +55,10 @@ class Logger(attrib.Container):
 
     _level_names: ClassVar[StrList] = [
         'NOTSET', 'DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']
-    _default_name: ClassVar[str] = env.get_var('name') or __name__
-    _default_file: ClassVar[Path] = Path(
-        env.get_dir('user_log_dir'), _default_name + '.log')
+    # The default name and logfile are retrieved from the environment with
+    # the first request, such that the environment is not probed at import
+    _default_name: ClassVar[OptStr] = None
+    _default_file: ClassVar[OptPath] = None
     _default_level: ClassVar[StrOrInt] = logging.INFO
 
     #
@@ -107,8 +109,8 @@ class Logger(attrib.Container):
     #
 
     def __init__(self,
-            name: str = _default_name,
-            file: PathLike = _default_file,
+            name: OptStr = None,
+            file: OptPathLike = None,
             level: StrOrInt = _default_level) -> None:
         """Initialize instance."""
         # Initialize Attribute Container
@@ -156,8 +158,9 @@ class Logger(attrib.Container):
     #
 
     def _start_logging(
-            self, name: str = _default_name, file: PathLike = _default_file,
+            self, name: OptStr = None, file: OptPathLike = None,
             level: StrOrInt = _default_level) -> bool:
+        name = name or self._get_default_name()
         logger = logging.getLogger(name) # Create new logger instance
         self._set_logger(logger) # Bind new logger instance to global variable
         self._set_level(level) # Set log level
@@ -193,6 +196,19 @@ class Logger(attrib.Container):
     def _get_name(self) -> str:
         return self.logger.name
 
+    def _get_default_name(self) -> str:
+        cls = self.__class__
+        if not cls._default_name:
+            cls._default_name = env.get_var('name') or __name__
+        return cls._default_name
+
+    def _get_default_file(self) -> Path:
+        cls = self.__class__
+        if not cls._default_file:
+            cls._default_file = Path(
+                env.get_dir('user_log_dir'), self._get_default_name() + '.log')
+        return cls._default_file
+
     def _set_name(self, name: str) -> None:
         self.logger.name = name
 
@@ -202,7 +218,7 @@ class Logger(attrib.Container):
                 return Path(handler.baseFilename)
         return None
 
-    def _set_file(self, filepath: PathLike = _default_file) -> None:
+    def _set_file(self, filepath: OptPathLike = None) -> None:
         # Locate valid logfile
         logfile = self._locate_logfile(filepath)
         if not isinstance(logfile, Path):
@@ -252,8 +268,9 @@ class Logger(attrib.Container):
             level = level.upper()
         getattr(self.logger, 'setLevel')(level)
 
-    def _locate_logfile(
-            self, filepath: PathLike = _default_file) -> OptPath:
+    def _locate_logfile(self, filepath: OptPathLike = None) -> OptPath:
+        filepath = filepath or self._get_default_file()
+
         # Get valid logfile from filepath
         if isinstance(filepath, (str, Path)):
             logfile = env.expand(filepath)
@@ -70,3 +70,102 @@ class TestCase(BaseTestCase):
                 samples = 10000)
             test = entity.has_base(dataset, 'Dataset')
             self.assertTrue(test)
+
+    def test_dataset_sampler(self):
+        import nemoa.dataset
+
+        dataset = nemoa.dataset.open('linear', workspace='testsuite')
+        sampler = dataset.get('sampler', size=10)
+
+        with self.subTest("size"):
+            self.assertEqual(sampler.get().shape[0], 10)
+
+        with self.subTest("epoch"):
+            rows = dataset.get('data').shape[0]
+            for i in range(rows // 10 + 1): sampler.get()
+            self.assertEqual(sampler.epoch, 1)
+
+        with self.subTest("no duplicates at end of epoch"):
+            table = sampler._tables[0]
+            table.update({'index': numpy.arange(5), 'count': 3,
+                'perm': numpy.arange(5), 'pos': 0})
+            for i in range(20):
+                self.assertEqual(len(set(sampler._get_rows(table))), 3)
+
+        with self.subTest("numpy integer size"):
+            sampler = dataset.get('sampler', size=numpy.int64(10))
+            self.assertEqual(sampler.get().shape[0], 10)
+
+        with self.subTest("rounding of fractions"):
+            import copy
+            config = dataset._config['table']
+            config['copy'] = copy.deepcopy(config['linear'])
+            config['linear']['fraction'] = config['copy']['fraction'] = .5
+            dataset._tables['copy'] = dataset._tables['linear']
+            sampler = dataset.get('sampler', size=5)
+            self.assertEqual(sampler.get().shape[0], 5)
+
+        with self.subTest("epoch of largest table"):
+            config['linear']['fraction'] = .8
+            config['copy']['fraction'] = .2
+            sampler = dataset.get('sampler', size=10)
+            for i in range(rows // 2): sampler.get()
+            self.assertEqual(sampler.epoch, 0)
+            sampler.get()
+            self.assertEqual(sampler.epoch, 1)
+
+    def test_dataset_storage(self):
+        import nemoa.dataset
+
+        dataset = nemoa.dataset.open('linear', workspace='testsuite')
+        data = dataset.get('data')
+        dataset._config['storage'] = 'matrix'
+
+        with self.subTest("array"):
+            self.assertTrue(numpy.allclose(dataset.get('data'), data))
+
+        with self.subTest("size"):
+            self.assertEqual(dataset.get('data', size=10).shape[0], 10)
+
+        with self.subTest("shared memory"):
+            table = dataset._tables['linear']
+            self.assertTrue(numpy.shares_memory(dataset.get('data'), table))
+
+        with self.subTest("read-only views"):
+            self.assertFalse(dataset.get('data').flags.writeable)
+            self.assertTrue(dataset.get('data', size=10).flags.writeable)
+
+        with self.subTest("labels"):
+            self.assertNotIn('label', dataset._tables['linear'].dtype.names)
+            self.assertEqual(dataset.get('data', output='recarray')['label']
+                .tolist(), dataset._get_matrix('linear')['label'].tolist())
+            self.assertEqual(dataset.get('tables', 'linear').size,
+                data.shape[0])
+
+        with self.subTest(dtype="float32"):
+            dataset = nemoa.dataset.open('linear', workspace='testsuite')
+            dataset._config['storage'] = 'matrix'
+            dataset._config['dtype'] = 'float32'
+            matrix = dataset.get('data')
+            self.assertEqual(matrix.dtype, numpy.float32)
+            self.assertTrue(numpy.allclose(matrix, data, atol=1e-6))
+            self.assertEqual(dataset._tables['linear']['i1'].dtype,
+                numpy.float32)
+            self.assertEqual(dataset.get('data', size=10).dtype,
+                numpy.float32)
+            self.assertEqual(dataset.get('data',
+                output=('array', 'rows'))[0].dtype, numpy.float32)
+
+    def test_dataset_dtype(self):
+        import nemoa.dataset
+
+        dataset = nemoa.dataset.open('linear', workspace='testsuite')
+
+        with self.subTest(output="array"):
+            data = dataset.get('data', dtype='float32')
+            self.assertEqual(data.dtype, numpy.float32)
+
+        with self.subTest(noise="gauss"):
+            data = dataset.get('data', size=10, dtype='float32',
+                noise=('gauss', 0.5))
+            self.assertEqual(data.dtype, numpy.float32)
@@ -66,7 +66,8 @@ class Dataset(nbase.ObjectIP):
 
     _config: Optional[dict] = None
     _tables: Optional[dict] = None
-    _default = { 'name': None }
+    _matrices: Optional[dict] = None
+    _default = { 'name': None, 'storage': 'recarray', 'dtype': None }
 
     _attr: Dict[str, int] = {
         'columns': 0b01, 'rows': 0b01
@@ -132,6 +133,9 @@ class Dataset(nbase.ObjectIP):
                 be converted!""" % (len(nodes_lost), nodes_count))
             log.debug(', '.join(nodes_lost))
 
+        # column names are converted within the record arrays
+        self._set_matrices_reset()
+
         # get columns from dataset files and convert to common format
         col_labels = {}
         for table in self._config['table']:
@@ -566,7 +570,8 @@ class Dataset(nbase.ObjectIP):
                     data_array, mapping)
 
             # create empty record array
-            num_rows = self._tables[table]['label'].size
+            row_labels = self._get_labels(table)
+            num_rows = row_labels.size
             col_names = ('label',) + tuple(target_columns)
             col_formats = ('<U12',) + tuple(['<f8' \
                 for x in target_columns])
@@ -574,7 +579,7 @@ class Dataset(nbase.ObjectIP):
                 dtype = list(zip(col_names, col_formats)))
 
             # set values in record array
-            new_rec_array['label'] = self._tables[table]['label']
+            new_rec_array['label'] = row_labels
             for colid, colname in \
                 enumerate(new_rec_array.dtype.names[1:]):
 
@@ -584,6 +589,7 @@ class Dataset(nbase.ObjectIP):
 
             # set record array
             self._tables[table] = new_rec_array
+            if self._matrices: self._matrices.pop(table, None)
 
         # create trivial column mapping
         colmapping = { col: col for col in target_columns }
@@ -609,6 +615,7 @@ class Dataset(nbase.ObjectIP):
         if key == 'colfilters': return self._get_colfilters()
         if key == 'data': return self._get_data(*args, **kwds)
         if key == 'rows': return self._get_rows(*args, **kwds)
+        if key == 'sampler': return self._get_sampler(*args, **kwds)
         if key == 'rowgroups': return self._get_rowgroups(*args, **kwds)
         if key == 'rowfilter': return self._get_rowfilter(*args, **kwds)
         if key == 'rowfilters': return self._get_rowfilters()
@@ -624,24 +631,14 @@ class Dataset(nbase.ObjectIP):
 
     def _get_algorithms(self, category = None, attribute = None, tree = False):
         """Get algorithms provided by dataset."""
-        # get dictionary with all methods
-        # with prefix '_get_' and attribute 'name'
-        methods = entity.get_methods(self, pattern = '_get_*', val = 'name')
-
-        # filter algorithms by given category
-        if category is not None:
-            for key, val in list(methods.items()):
-                if val.get('category', None) != category:
-                    del methods[key]
+        # get registry of all methods with prefix '_get_' and attribute
+        # 'name', which is created once per class
+        registry = entity.get_registry(self.__class__, pattern = '_get_*',
+            key = 'name', groupby = 'category')
 
         # create flat structure if category is given or tree is False
-        structured = {}
         if category or not tree:
-            for ukey, udata in methods.items():
-                if attribute: structured[udata['name']] = \
-                    udata[attribute]
-                else: structured[udata['name']] = udata
-            return structured
+            return registry.select(self, category, attribute)
 
         # create tree structure if category is not given
         categories = {
@@ -650,26 +647,20 @@ class Dataset(nbase.ObjectIP):
             ('dataset', 'columns', 'evaluation'): 'columns',
             ('dataset', 'rows', 'evaluation'): 'rows'
         }
-        for ukey, udata in methods.items():
-            if udata['category'] not in categories: continue
-            ckey = categories[udata['category']]
-            if ckey is None:
-                if attribute: structured[udata['name']] = \
-                    udata[attribute]
-                else: structured[udata['name']] = udata
-            else:
-                if ckey not in structured: structured[ckey] = {}
-                if attribute: structured[ckey][udata['name']] = \
-                    udata[attribute]
-                else: structured[ckey][udata['name']] = udata
+        structured = {}
+        for category, ckey in categories.items():
+            algorithms = registry.select(self, category, attribute)
+            if ckey is None: structured.update(algorithms)
+            elif algorithms: structured[ckey] = algorithms
 
         return structured
 
-    def _get_algorithm(self, algorithm = None, *args, **kwds):
+    def _get_algorithm(self, algorithm = None, category = None,
+        attribute = None):
         """Get algorithm."""
-        algorithms = self._get_algorithms(*args, **kwds)
-        if algorithm not in algorithms: return None
-        return algorithms[algorithm]
+        registry = entity.get_registry(self.__class__, pattern = '_get_*',
+            key = 'name', groupby = 'category')
+        return registry.get(self, algorithm, category, attribute)
 
     def _get_columns(self, filter = '*'):
         """Get external columns.
@@ -770,7 +761,7 @@ class Dataset(nbase.ObjectIP):
         """Get list of row names."""
         row_names = []
         for table in list(self._tables.keys()):
-            labels = self._tables[table]['label'].tolist()
+            labels = self._get_labels(table).tolist()
             row_names += ['%s:%s' % (table, name) for name in labels]
         return row_names
 
@@ -789,7 +780,7 @@ class Dataset(nbase.ObjectIP):
         return list(self._config['rowfilter'].keys())
 
     def _get_data(self, size = 0, rows = '*', cols = '*',
-        noise = (None, 0.), output = 'array'):
+        noise = (None, 0.), output = 'array', dtype = None, random = None):
         """Return a given number of stratified samples.
 
         Args:
@@ -822,20 +813,54 @@ class Dataset(nbase.ObjectIP):
                 'cols': list of column names
                 'rows': list of row names
                 default: 'array'
+            dtype (numpy dtype or str, optional): dtype of numeric
+                data arrays. Default: None keeps the dtype of the tables
+            random (optional): random number stream, which is used for
+                sampling and corruption of the data, e.g. an instance of
+                nemoa.math.rand.Stream. Default: None uses the global
+                random state of numpy
 
         """
 
+        if random is None: random = np.random
         if not isinstance(size, int) or size < 0:
             raise ValueError(
                 "could not get data: "
                 "argument 'size' is required to be of type 'int'.")
 
+        # get numeric data from float matrices
+        if output == 'array' and self._get_storage() == 'matrix':
+            blocks = []
+            for table in self._tables.keys():
+                rowsel = self._get_rowindex(table, rows)
+                if not rowsel.size: continue
+                if size > 0:
+                    fraction = self._config['table'][table]['fraction']
+                    rowsel = rowsel[random.randint(rowsel.size,
+                        size = int(round(fraction * (size + 1))))]
+                elif rowsel.size == self._tables[table].size:
+                    rowsel = slice(None)
+                blocks.append((table, rowsel))
+            if not blocks:
+                raise ValueError(
+                    "could not get data: "
+                    "no valid data sources found!")
+            perm = None
+            if size:
+                total = sum(rowsel.size for table, rowsel in blocks)
+                perm = random.permutation(total)[:size]
+            data = self._get_data_matrix(blocks, cols = cols, perm = perm)
+            return self._get_data_corrupt(
+                self._get_data_astype(data, dtype),
+                type = noise[0], factor = noise[1], random = random)
+
         # get stratified and filtered data
         src_stack = ()
         for table in self._tables.keys():
             if size > 0:
                 src_data = self._get_table(table = table,
-                    rows = rows, size = size + 1, labels = True)
+                    rows = rows, size = size + 1, labels = True,
+                    random = random)
             else:
                 src_data = self._get_table(table = table,
                     rows = rows, labels = True)
@@ -850,7 +875,7 @@ class Dataset(nbase.ObjectIP):
 
         # (optional) shuffle data and correct size
         if size:
-            np.random.shuffle(data)
+            random.shuffle(data)
             data = data[:size]
 
         # format data
@@ -872,8 +897,261 @@ class Dataset(nbase.ObjectIP):
                 "invalid argument for columns!")
 
         # Corrupt data (optional)
+        if output == 'array':
+            fmt_data = self._get_data_astype(fmt_data, dtype)
         return self._get_data_corrupt(fmt_data, \
-            type = noise[0], factor = noise[1])
+            type = noise[0], factor = noise[1], random = random)
+
+    def _get_sampler(self, size, rows = '*', cols = '*',
+        noise = (None, 0.), output = 'array', dtype = None, random = None):
+        """Return sampler of stratified minibatches.
+
+        Other than repeated calls of get('data'), the sampler draws the
+        rows of the tables without replacement and only reshuffles them
+        at the end of an epoch.
+
+        Args:
+            size (int): size of minibatches (number of samples)
+            rows (str, optional): name of row select filter
+                default: '*' selects all rows
+            cols (str, optional): name of column select filter
+                default: '*' selects all columns
+            noise (2-tuple, optional): noise model and noise strength
+                default: (None, 0.) does not corrupt data
+            output (str or tuple of str, optional): data return format
+                default: 'array'
+            dtype (numpy dtype or str, optional): dtype of numeric
+                data arrays. Default: None keeps the dtype of the tables
+            random (optional): random number stream, which is used for
+                sampling and corruption of the data. Default: None uses
+                the global random state of numpy
+
+        Returns:
+            Instance of class Sampler, which returns minibatches by its
+            method get().
+
+        """
+
+        from nemoa.dataset.commons.sampler import Sampler
+
+        return Sampler(self, size = size, rows = rows, cols = cols,
+            noise = noise, output = output, dtype = dtype, random = random)
+
+    def _get_storage(self):
+        """Get storage mode of numeric data.
+
+        Returns:
+            String describing the storage mode. In the default mode
+            'recarray', numeric data is retrieved from the record arrays
+            of the tables. In the mode 'matrix', numeric data is
+            retrieved from a contiguous float matrix per table, such that
+            column filters become index arrays.
+
+        """
+
+        return (self._config or {}).get('storage', 'recarray')
+
+    def _get_storage_dtype(self):
+        """Get dtype of the float matrices of the tables.
+
+        Returns:
+            Numpy dtype given by the dataset configuration 'dtype'.
+            Default: float64
+
+        """
+
+        return np.dtype((self._config or {}).get('dtype') or np.float64)
+
+    def _get_matrix(self, table):
+        """Get float matrix backing store of a table.
+
+        With the first request the numeric columns of the table are moved
+        into a C-contiguous float array and the row labels into a
+        separate label array. The record array of the table is then
+        replaced by a record view of the float array, which has no
+        'label' column, such that the record columns and the matrix share
+        their memory and changes by preprocessing apply to both.
+
+        Args:
+            table (str): name of table
+
+        Returns:
+            Dictionary with keys 'data', 'label' and 'colindex', where
+            'data' is the float matrix with the numeric columns of the
+            table, 'label' a numpy array with the row labels and
+            'colindex' a dictionary, which maps the column names of the
+            table to the column indices of the matrix.
+
+        """
+
+        if self._matrices is None: self._matrices = {}
+        if table in self._matrices: return self._matrices[table]
+
+        rec = self._tables[table]
+        names = [name for name in rec.dtype.names if name != 'label']
+        dtype = self._get_storage_dtype()
+
+        store = np.empty((rec.size, len(names)), dtype = dtype)
+        for cid, name in enumerate(names): store[:, cid] = rec[name]
+        layout = np.dtype({'names': names, 'formats': [dtype] * len(names)})
+        self._tables[table] = \
+            store.view(layout).reshape(rec.size).view(np.recarray)
+
+        matrix = {
+            'data': store, 'label': np.array(rec['label']),
+            'colindex': {name: cid for cid, name in enumerate(names)}}
+        self._matrices[table] = matrix
+
+        return matrix
+
+    def _get_labels(self, table):
+        """Get row labels of a table.
+
+        Args:
+            table (str): name of table
+
+        Returns:
+            Numpy array with the row labels of the table.
+
+        """
+
+        if self._matrices and table in self._matrices:
+            return self._matrices[table]['label']
+
+        return self._tables[table]['label']
+
+    def _get_records(self, table):
+        """Get record array of a table with row labels in column 'label'.
+
+        Args:
+            table (str): name of table
+
+        Returns:
+            Numpy recarray of the table. If the table is stored in a float
+            matrix, the record array is a copy, that is created from the
+            label array and the float matrix of the table.
+
+        """
+
+        if not self._matrices or table not in self._matrices:
+            return self._tables[table]
+
+        rec = self._tables[table]
+        labels = self._matrices[table]['label']
+        dtype = np.dtype([('label', labels.dtype)] \
+            + [(name, rec.dtype[name]) for name in rec.dtype.names])
+        records = np.recarray((rec.size, ), dtype = dtype)
+        records['label'] = labels
+        for name in rec.dtype.names: records[name] = rec[name]
+
+        return records
+
+    def _get_colindex(self, table, columns):
+        """Get column selection of the float matrix of a table.
+
+        Args:
+            table (str): name of table
+            columns (list of str): dataset column names
+
+        Returns:
+            Slice if the columns are consecutive in the matrix, which
+            allows to return views, else numpy array with column indices.
+
+        """
+
+        colindex = self._get_matrix(table)['colindex']
+        select = [colindex[col] for col in self._get_colnames(columns)]
+        if select and select == list(range(select[0], select[-1] + 1)):
+            return slice(select[0], select[-1] + 1)
+
+        return np.asarray(select, dtype = int)
+
+    def _get_rowindex(self, table, rows = '*'):
+        """Get indices of rows of a table, which pass a row filter.
+
+        Args:
+            table (str): name of table
+            rows (str or list of str, optional): name of row filter or
+                list of row names. Default value '*' selects all rows.
+
+        Returns:
+            Numpy array with row indices.
+
+        """
+
+        size = self._tables[table].size
+
+        if isinstance(rows, str):
+            if rows not in self._config['rowfilter']:
+                raise ValueError("invalid row filter '%s'!" % rows)
+            rowfilter = self._config['rowfilter'][rows]
+        elif isinstance(rows, list):
+            rowfilter = rows
+        else:
+            raise ValueError(
+                "could not get rows: "
+                "invalid argument for rows!")
+
+        if '*:*' in rowfilter or table + ':*' in rowfilter:
+            return np.arange(size)
+
+        selected = set(row.split(':')[1] for row in rowfilter
+            if row.split(':')[0] in [table, '*'])
+        labels = self._get_labels(table)
+
+        return np.asarray([rowid for rowid, row in enumerate(labels)
+            if row in selected], dtype = int)
+
+    def _get_data_matrix(self, blocks, cols = '*', perm = None):
+        """Get numeric data from float matrices of tables.
+
+        Args:
+            blocks (list of tuples): tuples (table, rows), where rows is
+                a numpy array of row indices or a slice
+            cols (str, list or tuple, optional): name of column filter,
+                list of columns or tuple of column filters
+                default: '*' selects all columns
+            perm (numpy ndarray or None, optional): indices, which are
+                used to reorder and to truncate the concatenated rows.
+                Default: None
+
+        Returns:
+            Numpy ndarray or tuple of numpy ndarrays. For a single table
+            with all rows and consecutive columns the array is a read-only
+            view of the float matrix.
+
+        """
+
+        def select(columns):
+            parts = []
+            for table, rowsel in blocks:
+                data = self._get_matrix(table)['data']
+                colsel = self._get_colindex(table, columns)
+                if isinstance(rowsel, slice) or isinstance(colsel, slice):
+                    parts.append(data[rowsel, colsel])
+                else:
+                    parts.append(data[np.ix_(rowsel, colsel)])
+            data = parts[0] if len(parts) == 1 else np.concatenate(parts)
+            if perm is not None: data = data[perm]
+            elif np.may_share_memory(data, store):
+
+                # protect the tables against changes of returned views
+                data = data.view()
+                data.flags.writeable = False
+            return data
+
+        store = self._get_matrix(blocks[0][0])['data']
+        if isinstance(cols, str):
+            return select(self._get_columns(cols))
+        if isinstance(cols, list):
+            return select(cols)
+        if isinstance(cols, tuple):
+            return tuple([select(self._get_columns(col_filter))
+                for col_filter in cols])
+
+        raise ValueError(
+            "could not get data: "
+            "invalid argument for columns!")
 
     def _get_data_format(self, data, cols = '*', output = 'array'):
         """Return data in given format.
@@ -937,8 +1215,8 @@ class Dataset(nbase.ObjectIP):
                 rettuple += (data[['label'] + ucolnames], )
             elif fmt_str == 'array':
                 # 2Do: do not create copy of data but view!
-                rettuple += (data[ucolnames].copy().view('<f8').reshape(
-                    data.size, len(ucolnames)), )
+                rettuple += (np.column_stack(
+                    [data[col] for col in ucolnames]), )
             elif fmt_str == 'cols':
                 rettuple += (ucolnames, )
             elif fmt_str == 'rows':
@@ -950,7 +1228,30 @@ class Dataset(nbase.ObjectIP):
             return rettuple[0]
         return rettuple
 
-    def _get_data_corrupt(self, data, type = None, factor = 0.5):
+    def _get_data_astype(self, data, dtype = None):
+        """Convert numeric data arrays to given dtype.
+
+        Args:
+            data (numpy ndarray or tuple): numpy array or tuple of numpy
+                arrays containing data
+            dtype (numpy dtype or str, optional): target dtype.
+                Default: None does not convert the data
+
+        Returns:
+            Numpy array or tuple of numpy arrays. Arrays, which already
+            have the target dtype, are not copied.
+
+        """
+
+        if dtype is None: return data
+        if isinstance(data, tuple):
+            return tuple([self._get_data_astype(table, dtype)
+                for table in data])
+
+        return data.astype(dtype, copy = False)
+
+    def _get_data_corrupt(self, data, type = None, factor = 0.5,
+        random = None):
         """Corrupt given data.
 
         Args:
@@ -968,6 +1269,9 @@ class Dataset(nbase.ObjectIP):
             factor (float, optional): strengt of the noise
                 The influence of the parameter depends on the
                 noise model
+            random (optional): random number stream, which is used to
+                draw the noise. Default: None uses the global random
+                state of numpy
 
         Returns:
             Numpy array with (partly) corrupted data. The shape is
@@ -976,41 +1280,42 @@ class Dataset(nbase.ObjectIP):
         """
 
         if isinstance(data, tuple):
-            return tuple([self._get_data_corrupt(table)
+            return tuple([self._get_data_corrupt(table, random = random)
                 for table in list(data)])
+        if random is None: random = np.random
 
         if not isinstance(type, str): return data
         if type.lower() == 'none': return data
 
         # gaussian noise model
         elif type.lower() == 'gauss':
-            noise = np.random.normal(
+            noise = random.normal(
                 size = data.shape, loc = 0., scale = factor)
-            return data + noise
+            return (data + noise).astype(data.dtype, copy = False)
 
         # bernoulli noise model
         elif type.lower() == 'bernoulli':
-            mask = np.random.binomial(
+            mask = random.binomial(
                 size = data.shape, n = 1, p = 1. - factor)
             return (data - mask).astype(bool).astype(int)
 
         # masking noise model
         elif type.lower() == 'mask':
-            mask = np.random.binomial(
+            mask = random.binomial(
                 size = data.shape, n = 1, p = 1. - factor)
-            return mask * data
+            return mask.astype(data.dtype) * data
 
         # salt & pepper noise model
         elif type.lower() == 'salt':
             amax = np.amax(data, axis = 0)
             amin = np.amin(data, axis = 0)
-            mask = np.random.binomial(
+            mask = random.binomial(
                 size = data.shape, n = 1, p = 1. - factor)
-            sp = np.random.binomial(
+            sp = random.binomial(
                 size = data.shape, n = 1, p = .5)
             noise = mask * (amax * sp + amin * (1. - sp))
 
-            return data + noise
+            return (data + noise).astype(data.dtype, copy = False)
 
         else: raise ValueError("""could not corrupt data:
             unkown noise model '%s'.""" % (type))
@@ -1050,7 +1355,7 @@ class Dataset(nbase.ObjectIP):
         return data_pca
 
     def _get_table(self, table = None, cols = '*', rows = '*',
-        size = 0, labels = False):
+        size = 0, labels = False, random = None):
         """Get data from tables.
 
         Args:
@@ -1065,6 +1370,9 @@ class Dataset(nbase.ObjectIP):
                 source.
             labels (bool, optional): if True, the returned table
                 contains a column 'label' which contains row labels.
+            random (optional): random number stream, which is used to
+                choose the samples. Default: None uses the global random
+                state of numpy
 
         Returns:
             Numpy recarray with data from a single dataset table.
@@ -1073,7 +1381,8 @@ class Dataset(nbase.ObjectIP):
 
         if table is None:
             import copy
-            return copy.deepcopy(self._tables)
+            return copy.deepcopy({name: self._get_records(name)
+                for name in self._tables})
 
         # check table name
         if not isinstance(table, str) \
@@ -1083,6 +1392,10 @@ class Dataset(nbase.ObjectIP):
                 "could not retrieve data: "
                 "invalid table name: '%s'." % table)
 
+        # get record array of table
+        records = self._get_records(table) if labels \
+            else self._tables[table]
+
         # get column names from column filter
         columns = self._get_columns(cols)
         colnames = self._get_colnames(columns)
@@ -1106,13 +1419,13 @@ class Dataset(nbase.ObjectIP):
 
             with np.warnings.catch_warnings():
                 np.warnings.filterwarnings('ignore')
-                table_colsel = self._tables[table][colnames]
+                table_colsel = records[colnames]
 
         else:
             if labels: datacols = colnames[1:]
             else: datacols = colnames
             redcols = sorted(set(datacols), key = datacols.index)
-            redrec = self._tables[table][redcols]
+            redrec = records[redcols]
             redfmt = [col[1] for col in redrec.dtype.descr]
             select = [redcols.index(col) for col in datacols]
             names = []
@@ -1123,14 +1436,14 @@ class Dataset(nbase.ObjectIP):
                 else: names.append('%s.%i' % (col, counter[col]))
             formats = [redfmt[cid] for cid in select]
             dtype = np.dtype({'names': names, 'formats': formats})
-            arr = redrec[redcols].view('<f8').reshape(
-                redrec.size, len(redcols))[:,select].copy().view(
+            arr = np.column_stack([redrec[col] for col in redcols]
+                )[:,select].copy().view(
                 type = np.recarray, dtype = dtype)
 
             if labels:
                 from nemoa.data import table as modtable
                 table_colsel = modtable.addcols(
-                    arr, self._tables[table], 'label')
+                    arr, records, 'label')
             else:
                 table_colsel = arr
 
@@ -1143,14 +1456,15 @@ class Dataset(nbase.ObjectIP):
                 if row.split(':')[0] in [source, '*']]
             rowsel = np.asarray([
                 rowid for rowid, row in enumerate(
-                self._tables[table]['label'])
+                self._get_labels(table))
                 if row in rowfilter_filtered])
             data = np.take(table_colsel, rowsel)
 
         # stratify and return data as numpy record array
         if size == 0 or size is None: return data
         fraction = self._config['table'][table]['fraction']
-        rowsel = np.random.randint(data.size,
+        if random is None: random = np.random
+        rowsel = random.randint(data.size,
             size = int(round(fraction * size)))
 
         return np.take(data, rowsel)
@@ -1164,7 +1478,8 @@ class Dataset(nbase.ObjectIP):
 
         if key is None:
             import copy
-            return copy.deepcopy(self._tables)
+            return copy.deepcopy({name: self._get_records(name)
+                for name in self._tables})
 
         if isinstance(key, str) and key in list(self._tables.keys()):
             return self._tables[key]
@@ -1299,6 +1614,7 @@ class Dataset(nbase.ObjectIP):
 
         # 2do: reconfigure!?
         self._tables = {}
+        self._matrices = {}
 
         return True
 
@@ -1316,9 +1632,24 @@ class Dataset(nbase.ObjectIP):
         if not tables:
             return True
 
+        self._set_matrices_reset()
         self._tables = {**self._tables, **tables}
         return True
 
+    def _set_matrices_reset(self):
+        """Restore record arrays of tables, that are stored in matrices.
+
+        Returns:
+            Bool which is True if and only if no error occured.
+
+        """
+
+        for table in list(self._matrices or {}):
+            self._tables[table] = self._get_records(table)
+            del self._matrices[table]
+
+        return True
+
     def evaluate(self, name = None, *args, **kwds):
         """Evaluate dataset."""
 
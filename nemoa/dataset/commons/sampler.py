@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""Stratified minibatch sampling."""
+
+__author__ = 'Patrick Michl'
+__email__ = 'frootlab@gmail.com'
+__license__ = 'GPLv3'
+
+import numbers
+import numpy as np
+
+class Sampler:
+    """Epoch based sampler of stratified minibatches.
+
+    The sampler is created once per training run. For each table of the
+    dataset it holds the indices of the rows, which pass the row filter,
+    and the number of rows per minibatch, given by the sampling fraction
+    of the table. The minibatches are sliced from a permutation of the row
+    indices, such that the rows of a table are drawn without replacement.
+    The permutation is only renewed at the end of an epoch, i.e. if all
+    rows of a table have been sampled. The attribute 'epoch' counts the
+    epochs of the table with the most minibatches per epoch, which is the
+    largest table with respect to its sampling fraction, such that within
+    an epoch all rows of all tables are sampled.
+
+    Args:
+        dataset: nemoa dataset instance
+        size (int): size of minibatches (number of samples)
+        rows (str, optional): name of row select filter
+            default: '*' selects all rows
+        cols (str, list or tuple, optional): name of column select filter,
+            list of columns or tuple of column select filters
+            default: '*' selects all columns
+        noise (2-tuple, optional): noise model and noise strength
+            default: (None, 0.) does not corrupt data
+        output (str or tuple of str, optional): data return format
+            default: 'array'
+        dtype (numpy dtype or str, optional): dtype of numeric data
+            arrays. Default: None keeps the dtype of the tables
+        random (optional): random number stream, which is used for the
+            permutations and the corruption of the data, e.g. an instance
+            of nemoa.math.rand.Stream. Default: None uses the global
+            random state of numpy
+
+    """
+
+    def __init__(self, dataset, size, rows = '*', cols = '*',
+        noise = (None, 0.), output = 'array', dtype = None, random = None):
+
+        if not isinstance(size, numbers.Integral) or size <= 0:
+            raise ValueError(
+                "could not create sampler: "
+                "argument 'size' is required to be a positive 'int'.")
+
+        self._dataset = dataset
+        self.size = int(size)
+        self.noise = noise
+        self.output = output
+        self.dtype = dtype
+        self.random = np.random if random is None else random
+
+        # get columns from column filters
+        if isinstance(cols, str):
+            self.cols = dataset._get_columns(cols)
+        elif isinstance(cols, list):
+            self.cols = cols
+        elif isinstance(cols, tuple):
+            self.cols = tuple([dataset._get_columns(col_filter)
+                for col_filter in cols])
+        else:
+            raise ValueError(
+                "could not create sampler: "
+                "invalid argument for columns!")
+
+        # get row indices and number of samples per table
+        self._tables = []
+        remainders = []
+        for table in dataset._tables.keys():
+            index = dataset._get_rowindex(table, rows)
+            if not index.size: continue
+            fraction = dataset._config['table'][table]['fraction']
+            count = min(int(round(fraction * size)), index.size)
+            if not count: continue
+            self._tables.append({
+                'name': table, 'index': index, 'count': count,
+                'perm': self.random.permutation(index), 'pos': 0})
+            remainders.append(fraction * size - count)
+
+        if not self._tables:
+            raise ValueError(
+                "could not create sampler: "
+                "no valid data sources found!")
+
+        # spread the rounding remainder over the tables, starting with the
+        # largest remainders, such that the minibatches have the given size
+        # as long as the tables contain enough rows
+        order = [self._tables[i] for i in np.argsort(remainders)[::-1]]
+        missing = size - sum(table['count'] for table in self._tables)
+        while missing > 0:
+            tables = [table for table in order
+                if table['count'] < table['index'].size][:missing]
+            if not tables: break
+            for table in tables: table['count'] += 1
+            missing -= len(tables)
+
+        # count epochs of the table with the most minibatches per epoch
+        self._epoch_table = max(self._tables,
+            key = lambda table: table['index'].size / table['count'])
+        self.epoch = 0
+
+    def _get_rows(self, table):
+        """Get indices of next rows of a table and renew permutation."""
+
+        count = table['count']
+        start = table['pos']
+        stop = start + count
+        perm = table['perm']
+
+        if stop <= perm.size:
+            table['pos'] = stop
+            return perm[start:stop]
+
+        # end of epoch: renew permutation of rows. The minibatch is
+        # completed by the first rows of the new permutation, which are
+        # not contained in the remaining rows of the previous permutation,
+        # such that the minibatch does not contain duplicates
+        head = perm[start:]
+        perm = self.random.permutation(table['index'])
+        need = count - head.size
+        fresh = np.flatnonzero(~np.isin(perm, head))[:need]
+        other = np.ones(perm.size, dtype = bool)
+        other[fresh] = False
+        table['perm'] = np.concatenate((perm[fresh], perm[other]))
+        table['pos'] = need
+        if table is self._epoch_table: self.epoch += 1
+
+        return np.concatenate((head, table['perm'][:need]))
+
+    def get(self):
+        """Get next minibatch.
+
+        Returns:
+            Minibatch of the dataset in the given output format,
+            optionally corrupted by the given noise model.
+
+        """
+
+        dataset = self._dataset
+
+        # get numeric data from float matrices
+        if self.output == 'array' and dataset._get_storage() == 'matrix':
+            blocks = [(table['name'], self._get_rows(table))
+                for table in self._tables]
+            total = sum(rows.size for name, rows in blocks)
+            perm = None
+            if len(blocks) > 1 or total > self.size:
+                perm = self.random.permutation(total)[:self.size]
+            data = dataset._get_data_matrix(blocks, cols = self.cols,
+                perm = perm)
+            return dataset._get_data_corrupt(
+                dataset._get_data_astype(data, self.dtype),
+                type = self.noise[0], factor = self.noise[1],
+                random = self.random)
+
+        # get stratified data
+        data = np.concatenate([
+            np.take(dataset._get_records(table['name']),
+                self._get_rows(table))
+            for table in self._tables])
+
+        # shuffle rows of different tables and correct size
+        if len(self._tables) > 1:
+            data = data[self.random.permutation(data.size)]
+        data = data[:self.size]
+
+        # format data
+        if isinstance(self.cols, tuple):
+            fmt_data = tuple([dataset._get_data_format(data,
+                cols = cols, output = self.output)
+                for cols in self.cols])
+        else:
+            fmt_data = dataset._get_data_format(data,
+                cols = self.cols, output = self.output)
+
+        # corrupt data (optional)
+        if self.output == 'array':
+            fmt_data = dataset._get_data_astype(fmt_data, self.dtype)
+        return dataset._get_data_corrupt(fmt_data,
+            type = self.noise[0], factor = self.noise[1],
+            random = self.random)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.get()
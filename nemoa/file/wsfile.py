@@ -68,13 +68,8 @@ class WsFile(attrib.Container):
     #
 
     _config_file: ClassVar[Path] = Path('workspace.ini')
-    _default_config: ClassVar[ConfigDict] = {
-        'dc': {
-            'creator': env.get_username(),
-            'date': datetime.datetime.now()}}
     _default_dir_layout: ClassVar[StrList] = [
         'dataset', 'network', 'system', 'model', 'script']
-    _default_encoding = env.get_encoding()
 
     #
     # Public Attributes and Attribute Groups
@@ -329,7 +324,7 @@ class WsFile(attrib.Container):
                     "characters 'b' AND 't'")
             return file
         return TextIOWrapper(
-            file, encoding=encoding or self._default_encoding,
+            file, encoding=encoding or env.get_encoding(),
             write_through=True)
 
     def close(self) -> None:
@@ -691,7 +686,11 @@ class WsFile(attrib.Container):
 
     def _create_new(self) -> None:
         # Initialize instance Variables, Buffer and buffered ZipFile
-        self._set_attr_values(self._default_config['dc'], group='dc')
+        # The default metadata is retrieved from the environment for each
+        # new workspace, instead of once at import
+        self._set_attr_values({
+            'creator': env.get_username(),
+            'date': datetime.datetime.now()}, group='dc')
         self._path = None
         self._changed = False
         self._pwd = None
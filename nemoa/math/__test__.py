@@ -8,7 +8,8 @@ __docformat__ = 'google'
 
 import networkx as nx
 import numpy as np
-from nemoa.math import curve, graph, matrix, meta, regression, vector
+from nemoa.math import (
+    curve, graph, matrix, meta, rand, regression, vector)
 from nemoa.test import ModuleTestCase, MathTestCase
 from nemoa.types import NaN
 
@@ -74,6 +75,14 @@ class TestCurve(MathTestCase, ModuleTestCase):
     def setUp(self) -> None:
         self.x = np.array([[0.0, 0.5], [1.0, -1.0]])
 
+    def test_get_function(self) -> None:
+        self.assertIs(curve.get_function('logistic'), curve.sigm_logistic)
+        self.assertIs(curve.get_function('Gauss', 'bell'), curve.bell_gauss)
+        with self.assertRaises(ValueError):
+            curve.get_function('unknown')
+        with self.assertRaises(ValueError):
+            curve.get_function('logistic', family='unknown')
+
     def test_sigmoids(self) -> None:
         funcs = curve.sigmoids()
         self.assertIsInstance(funcs, list)
@@ -165,6 +174,13 @@ class TestVector(MathTestCase, ModuleTestCase):
 
     module = 'nemoa.math.vector'
 
+    def test_get_function(self) -> None:
+        self.assertIs(vector.get_function('euclid'), vector.norm_euclid)
+        self.assertIs(
+            vector.get_function('euclid', 'distance'), vector.dist_euclid)
+        with self.assertRaises(ValueError):
+            vector.get_function('unknown')
+
     def test_norms(self) -> None:
         norms = vector.norms()
         self.assertIsInstance(norms, list)
@@ -251,6 +267,12 @@ class TestMatrix(MathTestCase, ModuleTestCase):
         d = matrix.as_dict(self.x, labels=self.labels)
         self.assertEqual(d, self.d)
 
+    def test_get_function(self) -> None:
+        self.assertIs(matrix.get_function('frobenius'), matrix.norm_frobenius)
+        self.assertIs(matrix.get_function('pq', 'distance'), matrix.dist_pq)
+        with self.assertRaises(ValueError):
+            matrix.get_function('unknown')
+
     def test_norms(self) -> None:
         norms = matrix.norms()
         self.assertIsInstance(norms, list)
@@ -299,6 +321,11 @@ class TestRegr(MathTestCase, ModuleTestCase):
         self.assertIsInstance(errors, list)
         self.assertTrue(errors)
 
+    def test_get_function(self) -> None:
+        self.assertIs(regression.get_function('mse'), regression.error_mse)
+        with self.assertRaises(ValueError):
+            regression.get_function('unknown')
+
     def test_error(self) -> None:
         for name in regression.errors():
             with self.subTest(name=name):
@@ -319,6 +346,34 @@ class TestRegr(MathTestCase, ModuleTestCase):
     def test_error_rmse(self) -> None:
         self.assertIsSemiMetric(regression.error_rmse)
 
+class TestRand(ModuleTestCase):
+    """Testcase for the module nemoa.math.rand."""
+
+    module = 'nemoa.math.rand'
+
+    def test_Stream(self) -> None:
+        # Streams with equal seeds are reproducible
+        a, b = rand.Stream(1, pool_size=8), rand.Stream(1, pool_size=8)
+        x, y = a.rand(2, 3), b.rand(2, 3)
+        self.assertEqual(x.shape, (2, 3))
+        self.assertTrue(np.all(x == y))
+        self.assertTrue(np.all((x >= 0.) & (x < 1.)))
+        self.assertEqual(a.normal(size=4).shape, (4, ))
+        self.assertEqual(a.normal(np.zeros((2, 3)), 1.).shape, (2, 3))
+        # Pooled variates are read-only
+        with self.assertRaises(ValueError):
+            x[0, 0] = 0.
+        # Spawned streams are reproducible and independent
+        c, d = a.spawn(2)
+        e, = rand.Stream(1, pool_size=8).spawn(1)
+        self.assertTrue(np.all(c.rand(4) == e.rand(4)))
+        self.assertFalse(np.all(c.rand(4) == d.rand(4)))
+        # States restore the generator and the remaining pools
+        state = a.get_state()
+        x = a.standard_normal(20)
+        a.set_state(state)
+        self.assertTrue(np.all(a.standard_normal(20) == x))
+
 class TestGraph(ModuleTestCase):
     """Testsuite for modules within the package 'nemoa.math.graph'."""
 
@@ -28,11 +28,35 @@ except ImportError as err:
         "requires package numpy: "
         "https://pypi.org/project/numpy") from err
 
-from nemoa.base import this
-from nemoa.types import Any, NpArray, NpArrayLike, StrList
+from nemoa.base import entity, this
+from nemoa.types import Any, Function, NpArray, NpArrayLike, StrList
 
 _SIGM_PREFIX = 'sigm_'
 _BELL_PREFIX = 'bell_'
+_FAMILIES = {'sigmoid': _SIGM_PREFIX, 'bell': _BELL_PREFIX}
+_DISPATCHER = entity.Dispatcher(__name__, _FAMILIES)
+
+#
+# Function Families
+#
+
+def get_function(name: str, family: str = 'sigmoid') -> Function:
+    """Get function of a curve family by its name.
+
+    The functions of a family are registered with the first request, such that
+    subsequent lookups only require a dictionary access. This allows hot loops
+    to bind the returned function once and to call it directly.
+
+    Args:
+        name: Name of the function within the family, e.g. 'logistic'
+        family: Name of the function family. Supported values are 'sigmoid'
+            and 'bell'. Default: 'sigmoid'
+
+    Returns:
+        Function, which implements the curve.
+
+    """
+    return _DISPATCHER.get(name, family)
 
 #
 # Sigmoidal shaped functions
@@ -70,8 +94,7 @@ def sigmoid(x: NpArrayLike, name: str = 'logistic', **kwds: Any) -> NpArray:
             "First argument 'x' is required to be array-like") from err
 
     # Evaluate function
-    fname = _SIGM_PREFIX + name.lower()
-    return this.call_attr(fname, x=x, **kwds)
+    return _DISPATCHER.call(name, 'sigmoid', x, **kwds)
 
 def sigm_logistic(x: NpArrayLike) -> NpArray:
     """Calculate standard logistic function.
@@ -217,8 +240,7 @@ def bell(x: NpArrayLike, name: str = 'gauss', **kwds: Any) -> NpArray:
             "First argument 'x' is required to be array-like") from err
 
     # Evaluate function
-    fname = _BELL_PREFIX + name.lower()
-    return this.call_attr(fname, x=x, **kwds)
+    return _DISPATCHER.call(name, 'bell', x, **kwds)
 
 def bell_gauss(x: NpArrayLike, mu: float = 0., sigma: float = 1.) -> NpArray:
     """Calculate Gauss function.
@@ -8,13 +8,37 @@ __docformat__ = 'google'
 
 import contextlib
 import numpy as np
-from nemoa.base import check, this
+from nemoa.base import check, entity, this
 from nemoa.math import vector
 from nemoa.types import Any, IntPair, NpArray, NpArrayLike, StrList
 from nemoa.types import StrPairDict, StrListPair, NaN, Number, OptNumber
+from nemoa.types import Function
 
 _NORM_PREFIX = 'norm_'
 _DIST_PREFIX = 'dist_'
+_FAMILIES = {'norm': _NORM_PREFIX, 'distance': _DIST_PREFIX}
+_DISPATCHER = entity.Dispatcher(__name__, _FAMILIES)
+
+#
+# Function Families
+#
+
+def get_function(name: str, family: str = 'norm') -> Function:
+    """Get matrix norm or matrix distance by its name.
+
+    The functions of a family are registered with the first request, such that
+    subsequent lookups only require a dictionary access.
+
+    Args:
+        name: Name of the function within the family, e.g. 'frobenius'
+        family: Name of the function family. Supported values are 'norm' and
+            'distance'. Default: 'norm'
+
+    Returns:
+        Function, which implements the matrix norm or distance.
+
+    """
+    return _DISPATCHER.get(name, family)
 
 #
 # Matrix Norms
@@ -77,8 +101,7 @@ def norm(
             "first and second axis have to be different")
 
     # Evaluate function
-    fname = _NORM_PREFIX + name.lower()
-    return this.call_attr(fname, x=x, axes=axes, **kwds)
+    return _DISPATCHER.call(name, 'norm', x=x, axes=axes, **kwds)
 
 def norm_pq(x: NpArray,
         p: float = 2., q: float = 2., axes: IntPair = (0, 1)) -> NpArray:
@@ -210,8 +233,7 @@ def distance(
             "first and second axis have to be different")
 
     # Evaluate function
-    fname = _DIST_PREFIX + name.lower()
-    return this.call_attr(fname, x=x, y=y, axes=axes, **kwds)
+    return _DISPATCHER.call(name, 'distance', x=x, y=y, axes=axes, **kwds)
 
 def dist_frobenius(x: NpArray, y: NpArray, axes: IntPair = (0, 1)) -> NpArray:
     """Calculate :term:`Frobenius distance` of two arrays along given axes.
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""Random number streams.
+
+This module provides random number streams, which hold a private random
+number generator instead of the global random state of numpy. Uniform and
+standard normal variates, which are frequently drawn in small portions, e.g.
+by the sampling steps of stochastic units, are generated in bulk and served
+from pools. Streams can be spawned into independent child streams for worker
+threads and processes, such that parallel runs are reproducible.
+
+The streams use the generator :class:`numpy.random.Generator` with the bit
+generator PCG64, if available (numpy 1.17 or later), and otherwise a private
+instance of :class:`numpy.random.RandomState`.
+
+"""
+
+__author__ = 'Patrick Michl'
+__email__ = 'frootlab@gmail.com'
+__license__ = 'GPLv3'
+__docformat__ = 'google'
+
+import numpy as np
+from nemoa.types import Any, Dict, List, NpArray, Optional, Tuple
+
+#
+# Structural Types
+#
+
+Size = Optional[Any] # None, int or tuple of ints
+State = Dict[str, Any]
+
+#
+# Module Functions
+#
+
+def _has_generator() -> bool:
+    return hasattr(np.random, 'Generator')
+
+def _get_seed(seed: Any) -> Any:
+    if seed is not None:
+        return seed
+    # Derive the seed from the global random state of numpy, such that
+    # numpy.random.seed() keeps runs reproducible
+    return int(np.random.randint(2 ** 32, dtype=np.uint64))
+
+def _get_size(size: Size) -> Tuple[int, ...]:
+    if size is None:
+        return ()
+    if isinstance(size, (int, np.integer)):
+        return (int(size), )
+    return tuple(int(dim) for dim in size)
+
+#
+# Classes
+#
+
+class Stream:
+    """Random number stream with pooled uniform and normal variates.
+
+    The methods of the stream follow the names and signatures of the module
+    :mod:`numpy.random`, such that the stream can be used in place of the
+    module.
+
+    Args:
+        seed: Integer seed or seed sequence of the stream. If None, the seed
+            is drawn from the global random state of numpy. Default: None
+        pool_size: Number of uniform and standard normal variates, which are
+            generated in bulk. Requests, which exceed the pool size, are
+            generated directly. Default: 65536
+
+    """
+
+    _gen: Any
+    _seed: Any
+    _spawner: Any
+    _pool_size: int
+    _pools: Dict[str, List[Any]]
+
+    def __init__(self, seed: Any = None, pool_size: int = 65536) -> None:
+        self._seed = _get_seed(seed)
+        if _has_generator():
+            if not isinstance(self._seed, np.random.SeedSequence):
+                self._seed = np.random.SeedSequence(self._seed)
+            self._gen = np.random.Generator(np.random.PCG64(self._seed))
+            self._spawner = None
+        else:
+            self._gen = np.random.RandomState(self._seed)
+            # Seeds of child streams are drawn from a separate generator
+            self._spawner = np.random.RandomState([self._seed, 1])
+        self._pool_size = max(int(pool_size), 1)
+        self._pools = {'uniform': [None, 0], 'normal': [None, 0]}
+
+    def _generate(self, name: str, count: int) -> NpArray:
+        if name == 'uniform':
+            if _has_generator():
+                return self._gen.random(count)
+            return self._gen.random_sample(count)
+        return self._gen.standard_normal(count)
+
+    def _draw(self, name: str, size: Size) -> NpArray:
+        shape = _get_size(size)
+        count = int(np.prod(shape, dtype=np.int64))
+        if count > self._pool_size:
+            return self._generate(name, count).reshape(shape)
+        pool = self._pools[name]
+        if pool[0] is None or pool[1] + count > pool[0].size:
+            # Pools are replaced and not refilled, since views of the
+            # previous pool may still be in use
+            pool[0] = self._generate(name, self._pool_size)
+            pool[0].flags.writeable = False
+            pool[1] = 0
+        start = pool[1]
+        pool[1] = start + count
+        return pool[0][start:start + count].reshape(shape)
+
+    def rand(self, *shape: int) -> NpArray:
+        """Draw uniform variates from the interval [0, 1).
+
+        Args:
+            *shape: Dimensions of the returned array
+
+        Returns:
+            Numpy ndarray of given shape with uniform variates. The array is
+            read-only and taken from the pool of the stream.
+
+        """
+        return self._draw('uniform', shape)
+
+    def random_sample(self, size: Size = None) -> NpArray:
+        """Draw uniform variates from the interval [0, 1).
+
+        Args:
+            size: Shape of the returned array. Default: None
+
+        Returns:
+            Numpy ndarray of given shape with uniform variates. The array is
+            read-only and taken from the pool of the stream.
+
+        """
+        return self._draw('uniform', size)
+
+    def standard_normal(self, size: Size = None) -> NpArray:
+        """Draw standard normal variates.
+
+        Args:
+            size: Shape of the returned array. Default: None
+
+        Returns:
+            Numpy ndarray of given shape with standard normal variates. The
+            array is read-only and taken from the pool of the stream.
+
+        """
+        return self._draw('normal', size)
+
+    def normal(
+            self, loc: Any = 0., scale: Any = 1.,
+            size: Size = None) -> NpArray:
+        """Draw normal variates.
+
+        Args:
+            loc: Mean of the distribution as float or array. Default: 0.
+            scale: Standard deviation of the distribution as float or array.
+                Default: 1.
+            size: Shape of the returned array. If None, the shape is given by
+                the broadcasted shapes of the mean and the standard
+                deviation. Default: None
+
+        Returns:
+            Numpy ndarray of given shape with normal variates.
+
+        """
+        if size is None:
+            size = np.broadcast(loc, scale).shape
+        return loc + scale * self._draw('normal', size)
+
+    def binomial(self, n: Any, p: Any, size: Size = None) -> NpArray:
+        """Draw binomial variates.
+
+        Args:
+            n: Number of trials
+            p: Probability of success
+            size: Shape of the returned array. Default: None
+
+        Returns:
+            Numpy ndarray of given shape with binomial variates.
+
+        """
+        return self._gen.binomial(n, p, size)
+
+    def randint(
+            self, low: int, high: Optional[int] = None,
+            size: Size = None) -> NpArray:
+        """Draw integers from the interval [low, high).
+
+        Args:
+            low: Lowest integer. If high is None, integers are drawn from
+                the interval [0, low).
+            high: Upper bound of the integers. Default: None
+            size: Shape of the returned array. Default: None
+
+        Returns:
+            Numpy ndarray of given shape with random integers.
+
+        """
+        if _has_generator():
+            return self._gen.integers(low, high, size)
+        return self._gen.randint(low, high, size)
+
+    def permutation(self, x: Any) -> NpArray:
+        """Randomly permute a sequence or return a permuted range.
+
+        Args:
+            x: Integer or array like
+
+        Returns:
+            Numpy ndarray with the permuted sequence.
+
+        """
+        return self._gen.permutation(x)
+
+    def shuffle(self, x: Any) -> None:
+        """Shuffle a sequence in place along its first axis.
+
+        Args:
+            x: Mutable sequence or numpy ndarray
+
+        """
+        self._gen.shuffle(x)
+
+    def spawn(self, n: int) -> List['Stream']:
+        """Spawn independent child streams.
+
+        The child streams only depend on the seed of the stream and the
+        number of previously spawned streams, such that for example worker
+        threads and processes can be given reproducible streams.
+
+        Args:
+            n: Number of child streams
+
+        Returns:
+            List of child streams.
+
+        """
+        if _has_generator():
+            seeds = self._seed.spawn(n)
+        else:
+            seeds = [int(seed) for seed in self._spawner.randint(
+                2 ** 32, size=n, dtype=np.uint64)]
+        return [Stream(seed, pool_size=self._pool_size) for seed in seeds]
+
+    def get_state(self) -> State:
+        """Get state of the stream.
+
+        Returns:
+            Dictionary with the state of the random number generator and the
+            remaining variates of the pools, which can be restored by
+            :meth:`set_state`.
+
+        """
+        if _has_generator():
+            gen = self._gen.bit_generator.state
+        else:
+            gen = self._gen.get_state()
+        pools = {}
+        for name, (pool, pos) in self._pools.items():
+            pools[name] = None if pool is None else pool[pos:].copy()
+        return {'generator': gen, 'pools': pools}
+
+    def set_state(self, state: State) -> None:
+        """Set state of the stream.
+
+        Args:
+            state: Dictionary with the state of the stream as returned by
+                :meth:`get_state`.
+
+        """
+        if _has_generator():
+            self._gen.bit_generator.state = state['generator']
+        else:
+            self._gen.set_state(state['generator'])
+        for name, pool in state['pools'].items():
+            if pool is not None:
+                pool = np.array(pool, dtype=np.float64)
+                pool.flags.writeable = False
+            self._pools[name] = [pool, 0]
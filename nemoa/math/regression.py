@@ -13,11 +13,13 @@ except ImportError as err:
         "requires package numpy: "
         "https://pypi.org/project/numpy") from err
 
-from nemoa.base import this
+from nemoa.base import entity, this
 from nemoa.math import vector
-from nemoa.types import Any, NpAxes, NpArray, NpArrayLike, StrList
+from nemoa.types import Any, Function, NpAxes, NpArray, NpArrayLike
+from nemoa.types import StrList
 
 _ERROR_PREFIX = 'error_'
+_DISPATCHER = entity.Dispatcher(__name__, {'error': _ERROR_PREFIX})
 
 #
 # Error statistics for the evaluation of Regression Errors and Residuals
@@ -33,6 +35,21 @@ def errors() -> StrList:
     """
     return this.crop_functions(prefix=_ERROR_PREFIX)
 
+def get_function(name: str) -> Function:
+    """Get :term:`discrepancy measure` by its name.
+
+    The discrepancy measures are registered with the first request, such that
+    subsequent lookups only require a dictionary access.
+
+    Args:
+        name: Name of discrepancy function, e.g. 'mse'
+
+    Returns:
+        Function, which implements the discrepancy measure.
+
+    """
+    return _DISPATCHER.get(name, 'error')
+
 def error(
         x: NpArrayLike, y: NpArrayLike, name: str, axes: NpAxes = 0,
         **kwds: Any) -> NpArray:
@@ -83,8 +100,7 @@ def error(
             "arrays 'x' and 'y' can not be broadcasted together")
 
     # Evaluate function
-    fname = _ERROR_PREFIX + name.lower()
-    return this.call_attr(fname, x=x, y=y, axes=axes, **kwds)
+    return _DISPATCHER.call(name, 'error', x=x, y=y, axes=axes, **kwds)
 
 def error_sad(x: NpArray, y: NpArray, axes: NpAxes = 0) -> NpArray:
     """Calculate :term:`Sum of Absolute Differences` along given axes.
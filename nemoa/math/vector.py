@@ -8,11 +8,35 @@ __docformat__ = 'google'
 
 import contextlib
 import numpy as np
-from nemoa.base import check, this
-from nemoa.types import Any, NpAxes, NpArray, NpArrayLike, StrList
+from nemoa.base import check, entity, this
+from nemoa.types import Any, Function, NpAxes, NpArray, NpArrayLike
+from nemoa.types import StrList
 
 _NORM_PREFIX = 'norm_'
 _DIST_PREFIX = 'dist_'
+_FAMILIES = {'norm': _NORM_PREFIX, 'distance': _DIST_PREFIX}
+_DISPATCHER = entity.Dispatcher(__name__, _FAMILIES)
+
+#
+# Function Families
+#
+
+def get_function(name: str, family: str = 'norm') -> Function:
+    """Get vector norm or vector distance by its name.
+
+    The functions of a family are registered with the first request, such that
+    subsequent lookups only require a dictionary access.
+
+    Args:
+        name: Name of the function within the family, e.g. 'euclid'
+        family: Name of the function family. Supported values are 'norm' and
+            'distance'. Default: 'norm'
+
+    Returns:
+        Function, which implements the vector norm or distance.
+
+    """
+    return _DISPATCHER.get(name, family)
 
 #
 # Vector Norms
@@ -75,8 +99,7 @@ def length(
     check.has_type("'axes'", axes, (int, tuple))
 
     # Evaluate function
-    fname = _NORM_PREFIX + norm.lower()
-    return this.call_attr(fname, x, axes=axes, **kwds)
+    return _DISPATCHER.call(norm, 'norm', x, axes=axes, **kwds)
 
 def norm_p(x: NpArray, p: float = 2., axes: NpAxes = 0) -> NpArray:
     r"""Calculate a :term:`p-Norm` of an array along given axes.
@@ -320,8 +343,7 @@ def distance(
             "arrays 'x' and 'y' can not be broadcasted together")
 
     # Evaluate function
-    fname = _DIST_PREFIX + name.lower()
-    return this.call_attr(fname, x, y, axes=axes, **kwds)
+    return _DISPATCHER.call(name, 'distance', x, y, axes=axes, **kwds)
 
 def dist_minkowski(
         x: NpArray, y: NpArray, p: float = 2., axes: NpAxes = 0) -> NpArray:
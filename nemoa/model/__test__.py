@@ -4,8 +4,9 @@ __author__ = 'Patrick Michl'
 __email__ = 'frootlab@gmail.com'
 __license__ = 'GPLv3'
 
+from unittest import skipIf, skipUnless
 import nemoa
-from nemoa.base import entity
+from nemoa.base import entity, shmem
 from nemoa.test import BaseTestCase
 
 class TestCase(BaseTestCase):
@@ -48,3 +49,802 @@ class TestCase(BaseTestCase):
             model.optimize()
             test = model.error < 0.5
             self.assertTrue(test)
+
+    def test_model_dtype(self):
+        import numpy
+
+        for system, network in [('dbn', 'deep'), ('ann', 'shallow')]:
+            model = nemoa.model.create(
+                dataset='linear', network=network, system=system)
+            system = model.system
+            system._config['params']['dtype'] = 'float32'
+            system._set_params_dtype()
+            system._set_params_create_units()
+            system._set_params_create_links()
+            model.optimize()
+
+            for layer in system._params['units']:
+                for key in ['bias', 'lvar']:
+                    if key not in layer: continue
+                    with self.subTest(system=system.type,
+                        layer=layer['layer'], param=key):
+                        self.assertEqual(layer[key].dtype, numpy.float32)
+            for link, params in system._params['links'].items():
+                for key in ['W', 'A']:
+                    if key not in params: continue
+                    with self.subTest(system=system.type,
+                        links=link, param=key):
+                        self.assertEqual(params[key].dtype, numpy.float32)
+
+    def test_model_knockout(self):
+        import numpy
+
+        model = nemoa.model.create(
+            dataset='linear', network='deep', system='dbn')
+        system = model.system
+        mapping = system._get_mapping()
+        cols = (mapping[0], mapping[-1])
+        data = model.dataset.get('data', cols=cols)
+
+        with self.subTest(measure='error'):
+            batched = system._get_knockout_values(data, mapping=mapping,
+                measure='error', budget=1)
+            for sid in range(data[0].shape[1]):
+                single = system._get_uniterror(data, mapping=mapping,
+                    block=[sid])
+                self.assertTrue(numpy.allclose(batched[sid], single))
+
+    def test_model_induction(self):
+        import numpy
+
+        model = nemoa.model.create(
+            dataset='linear', network='deep', system='dbn')
+        system = model.system
+        mapping = system._get_mapping()
+        cols = (mapping[0], mapping[-1])
+        sdata, tdata = model.dataset.get('data', cols=cols)
+        points, gauge = 5, 0.25
+
+        batched = system._get_induction_values((sdata, tdata),
+            mapping=mapping, points=points, gauge=gauge, budget=1)
+        r_ids = [int((i + 0.5) * int(float(sdata.shape[0]) / points))
+            for i in range(points)]
+        bound = int((1. - gauge) * sdata.shape[0])
+        for sid in range(sdata.shape[1]):
+            with self.subTest(source=sid):
+                values = numpy.take(numpy.sort(sdata[:, sid]), r_ids)
+                expect = []
+                for value in values:
+                    idata = sdata.copy()
+                    idata[:, sid] = value
+                    expect.append(system._get_unitexpect(idata, mapping))
+                dev = numpy.sort(numpy.std(expect, axis=0), axis=0)
+                single = dev[bound:].mean(axis=0) / tdata.std(axis=0)
+                self.assertTrue(numpy.allclose(batched[sid], single))
+
+    def test_model_coinduction(self):
+        import numpy
+
+        model = nemoa.model.create(
+            dataset='linear', network='deep', system='dbn')
+        system = model.system
+        mapping = system._get_mapping()
+        cols = (mapping[0], mapping[-1])
+        data = model.dataset.get('data', cols=cols)
+        kwds = {'mapping': mapping, 'points': 5, 'gauge': .1}
+
+        batched = system._get_coinduction(data, budget=1, **kwds)
+        ind = system._get_induction(data, **kwds)
+        for sid in range(data[0].shape[1]):
+            with self.subTest(source=sid):
+                sdata = data[0].copy()
+                sdata[:, sid] = 10.
+                indmp = system._get_induction((sdata, data[1]), **kwds)
+                single = numpy.sqrt(((indmp - ind) ** 2).sum(axis=1))
+                self.assertTrue(numpy.allclose(batched[:, sid], single))
+
+        with self.subTest(sources=[1]):
+            self.assertTrue(numpy.allclose(system._get_coinduction(
+                data, sources=[1], **kwds), batched[:, [1]]))
+
+    def test_model_relation_workers(self):
+        import numpy
+
+        model = nemoa.model.create(
+            dataset='linear', network='deep', system='dbn')
+        system = model.system
+        mapping = system._get_mapping()
+        cols = (mapping[0], mapping[-1])
+        data = model.dataset.get('data', cols=cols)
+
+        for func in ['knockout', 'induction', 'coinduction']:
+            with self.subTest(func=func):
+                kwds = {'measure': 'units_error'} \
+                    if func == 'knockout' else {}
+                shape = (data[0].shape[1], data[0].shape[1]) \
+                    if func == 'coinduction' \
+                    else (data[0].shape[1], data[1].shape[1])
+                single = system.evaluate(data, 'relations', func,
+                    format='array', **kwds)
+                sharded = system.evaluate(data, 'relations', func,
+                    format='array', workers=2, **kwds)
+                self.assertIsInstance(single, numpy.ndarray)
+                self.assertIsInstance(sharded, numpy.ndarray)
+                self.assertEqual(single.shape, shape)
+                self.assertTrue(numpy.all(numpy.isfinite(single)))
+                self.assertTrue(numpy.any(single != 0.))
+                self.assertTrue(numpy.allclose(single, sharded))
+
+    @skipUnless(shmem.is_available(), "requires shared memory")
+    def test_model_bprop_workers(self):
+        import numpy
+
+        model = nemoa.model.create(
+            dataset='linear', network='shallow', system='ann')
+        optimizer = nemoa.model.morphisms.new(model)
+        optimizer._set_config(None, bprop_workers=2)
+        optimizer._set_buffer_reset()
+        mapping = model.system._get_mapping()
+        data = model.dataset.get('data', cols=(mapping[0], mapping[-1]))
+
+        def get_serial_gradient():
+            pool = optimizer._buffer.pop('bprop_pool')
+            try:
+                return optimizer._bprop_get_gradient_data(data)
+            finally:
+                optimizer._buffer['bprop_pool'] = pool
+
+        def assertGradientEqual(single, sharded):
+            for cat in single:
+                for key in single[cat]:
+                    for pkey, val in single[cat][key].items():
+                        with self.subTest(param=(cat, key, pkey)):
+                            self.assertTrue(numpy.allclose(
+                                val, sharded[cat][key][pkey]))
+
+        self.assertTrue(optimizer._bprop_pool_start())
+        try:
+            with self.subTest(step='initial parameters'):
+                assertGradientEqual(get_serial_gradient(),
+                    optimizer._bprop_get_gradient_data(data))
+
+            # update parameters in shared memory
+            for i in range(3):
+                grad = optimizer._bprop_get_gradient_data(data)
+                optimizer._bprop_update(optimizer._bprop_get_updates(grad))
+
+            with self.subTest(step='updated parameters'):
+                assertGradientEqual(get_serial_gradient(),
+                    optimizer._bprop_get_gradient_data(data))
+        finally:
+            optimizer._bprop_pool_stop()
+
+    @skipIf(shmem.is_available(), "requires missing shared memory")
+    def test_model_bprop_workers_fallback(self):
+        model = nemoa.model.create(
+            dataset='linear', network='shallow', system='ann')
+        optimizer = nemoa.model.morphisms.new(model)
+        optimizer._set_config(None, bprop_workers=2)
+        optimizer._set_buffer_reset()
+        self.assertFalse(optimizer._bprop_pool_start())
+        self.assertNotIn('bprop_pool', optimizer._buffer)
+
+    def test_model_bprop_netin(self):
+        import numpy
+
+        model = nemoa.model.create(
+            dataset='linear', network='deep', system='dbn')
+        optimizer = nemoa.model.morphisms.new(model)
+        mapping = model.system._get_mapping()
+        data = model.dataset.get('data', cols=mapping[0])
+
+        netin = {}
+        cached = optimizer._bprop_forward(data, netin=netin)
+        values = optimizer._bprop_forward(data)
+        self.assertEqual(set(netin), set(mapping[1:]))
+        for layer in mapping:
+            with self.subTest(layer=layer):
+                self.assertTrue(
+                    numpy.allclose(cached[layer], values[layer]))
+
+    def test_model_rprop_updates(self):
+        import numpy
+
+        model = nemoa.model.create(
+            dataset='linear', network='shallow', system='ann')
+        optimizer = nemoa.model.morphisms.new(model)
+        optimizer._set_config(None, rprop_init_rate=.1,
+            rprop_accel=(.5, 1., 1.2), rprop_min_factor=.08,
+            rprop_max_factor=.11)
+        optimizer._set_buffer_reset()
+
+        grads = [numpy.array([[1., -1., 0., 1.]]),
+            numpy.array([[1., 1., -1., 0.]])]
+        expect = [numpy.array([[.11, -.11, 0., .11]]),
+            numpy.array([[.11, .08, -.1, 0.]])]
+        for grad, value in zip(grads, expect):
+            updates = optimizer._rprop_get_updates(
+                {'units': {'u': {'bias': grad}}, 'links': {}})
+            self.assertTrue(
+                numpy.allclose(updates['units']['u']['bias'], value))
+
+    def test_model_sparse_links(self):
+        import numpy
+        from nemoa.system.commons.links import Links
+
+        model = nemoa.model.create(
+            dataset='linear', network='deep', system='dbn')
+        system = model.system
+        optimizer = nemoa.model.morphisms.new(model)
+        mapping = system._get_mapping()
+        data = model.dataset.get('data', cols=(mapping[0], mapping[-1]))
+
+        dense = {
+            'values': optimizer._bprop_forward(data[0]),
+            'grad': optimizer._bprop_get_gradient_data(data),
+            'energy': system._get_links_energy(data[0], mapping=mapping[:2])}
+        system._config['params']['sparse'] = True
+        system._set_params_sparse()
+        for links in system._params['links'].values():
+            self.assertTrue(Links.issparse(links['W']))
+        sparse = {
+            'values': optimizer._bprop_forward(data[0]),
+            'grad': optimizer._bprop_get_gradient_data(data),
+            'energy': system._get_links_energy(data[0], mapping=mapping[:2])}
+
+        with self.subTest(energy='per link'):
+            rows, cols = Links.get_edges(system._params['links'][(0, 1)]['W'])
+            self.assertEqual(sparse['energy'].shape,
+                (data[0].shape[0], rows.size))
+            self.assertTrue(numpy.allclose(
+                dense['energy'][:, rows, cols], sparse['energy']))
+
+        for layer in mapping:
+            with self.subTest(layer=layer):
+                self.assertTrue(numpy.allclose(
+                    dense['values'][layer], sparse['values'][layer]))
+        for cat in dense['grad']:
+            for key in dense['grad'][cat]:
+                for pkey, val in dense['grad'][cat][key].items():
+                    with self.subTest(param=(cat, key, pkey)):
+                        self.assertTrue(numpy.allclose(val,
+                            Links.get_dense(sparse['grad'][cat][key][pkey])))
+
+    def test_model_tracker(self):
+        import time
+        import numpy
+        from nemoa.model.commons.tracker import Tracker
+
+        model = nemoa.model.create(
+            dataset='linear', network='shallow', system='ann')
+        optimizer = nemoa.model.morphisms.new(model)
+        optimizer._set_config(None, tracker_sample_size=20)
+        optimizer._set_buffer_reset()
+
+        with self.subTest(step='sample'):
+            data = optimizer._get_data_tracker()
+            self.assertEqual(data[0].shape[0], 20)
+            self.assertIs(optimizer._get_data_tracker(), data)
+
+        with self.subTest(step='async'):
+            expect = optimizer._get_objective_value()
+            params = model.system._params
+            tracker = Tracker(model)
+            self.assertTrue(tracker.put(.5, 'accuracy', params, data))
+            results = tracker.stop()
+            self.assertEqual(len(results), 1)
+            progress, value, snapshot = results[0]
+            self.assertEqual(progress, .5)
+            self.assertIsNot(snapshot, params)
+            self.assertTrue(numpy.allclose(snapshot['links'][(0, 1)]['W'],
+                params['links'][(0, 1)]['W']))
+            self.assertTrue(numpy.isclose(value, expect))
+
+        with self.subTest(step='snapshots'):
+            tracker = Tracker(model)
+            arrays = []
+            for i in range(3):
+                self.assertTrue(tracker.put(i, 'accuracy', params, data))
+                while tracker.busy(): time.sleep(.01)
+                arrays.append(tracker.get()[0][2]['links'][(0, 1)]['W'])
+            tracker.stop()
+            self.assertIsNot(arrays[0], arrays[1])
+            self.assertIs(arrays[0], arrays[2])
+
+    def test_model_snapshot(self):
+        import numpy
+        from nemoa.model.commons.tracker import Snapshot
+
+        model = nemoa.model.create(
+            dataset='linear', network='deep', system='dbn')
+        params = model.system._params
+        weights = params['links'][(0, 1)]['W']
+        expect = weights.copy()
+
+        snapshot = Snapshot()
+        snapshot.save(params)
+        saved = snapshot.params['links'][(0, 1)]['W']
+        weights += 1.
+        snapshot.save(params)
+        self.assertIs(snapshot.params['links'][(0, 1)]['W'], saved)
+        self.assertTrue(numpy.allclose(saved, expect + 1.))
+
+        weights -= 2.
+        self.assertTrue(snapshot.restore(params))
+        self.assertIs(params['links'][(0, 1)]['W'], weights)
+        self.assertTrue(numpy.allclose(weights, expect + 1.))
+
+    def test_model_series(self):
+        import os
+        import tempfile
+        import numpy
+        from nemoa.model.commons.tracker import Series
+
+        series = Series(('epoch', 'value'), capacity=2)
+        for epoch in range(5):
+            series.append(epoch, epoch / 2.)
+        series.append(value=2.5, epoch=5)
+        self.assertEqual(len(series), 6)
+        self.assertEqual(series.get().shape, (6, 2))
+        self.assertTrue(numpy.allclose(series.get('value'),
+            numpy.arange(6) / 2.))
+
+        with tempfile.TemporaryDirectory() as path:
+            with self.subTest(filetype='npz'):
+                npz = os.path.join(path, 'series.npz')
+                series.save(npz)
+                with numpy.load(npz) as data:
+                    self.assertTrue(numpy.allclose(
+                        data['epoch'], series.get('epoch')))
+            with self.subTest(filetype='csv'):
+                csv = os.path.join(path, 'series.csv')
+                series.save(csv)
+                data = numpy.loadtxt(csv, delimiter=',', skiprows=1)
+                self.assertTrue(numpy.allclose(data, series.get()))
+
+    def test_model_checkpoint(self):
+        import os
+        import tempfile
+        import numpy
+        from nemoa.model.commons import checkpoint
+
+        model = nemoa.model.create(
+            dataset='linear', network='shallow', system='ann')
+        mapping = model.system._get_mapping()
+        data = model.dataset.get('data', cols=(mapping[0], mapping[-1]))
+
+        with tempfile.TemporaryDirectory() as path:
+            path = os.path.join(path, 'checkpoint.npz')
+            optimizer = nemoa.model.morphisms.new(model)
+            optimizer._set_config(None, algorithm='bprop', updates=10,
+                checkpoint_path=path, checkpoint_update_interval=3,
+                tracker_obj_tracking_enable=False,
+                tracker_eval_enable=False)
+            optimizer._set_buffer_reset()
+            optimizer._buffer['key_events'] = False
+            for epoch in range(4):
+                optimizer.update()
+                grad = optimizer._bprop_get_gradient_data(data)
+                optimizer._bprop_update(optimizer._bprop_get_updates(grad))
+                if epoch == 2:
+                    weights = model.system._params['links'][(0, 1)]['W']
+                    weights = weights.copy()
+            state = checkpoint.load(path)
+            expect = numpy.random.rand()
+
+            resumed = nemoa.model.morphisms.new(model)
+            resumed._set_config(None)
+            resumed._set_buffer_reset()
+            resumed._set_checkpoint(state, updates=20)
+            self.assertEqual(resumed._buffer['epoch'], 3)
+            self.assertEqual(resumed._config['algorithm'], 'bprop')
+            self.assertEqual(resumed._config['updates'], 20)
+            self.assertTrue(numpy.allclose(
+                model.system._params['links'][(0, 1)]['W'], weights))
+            self.assertEqual(numpy.random.rand(), expect)
+
+    def test_model_resume(self):
+        import os
+        import shutil
+        import tempfile
+        import zipfile
+        import numpy
+        from nemoa.model.commons import checkpoint
+
+        model = nemoa.model.create(
+            dataset='linear', network='shallow', system='ann')
+
+        with tempfile.TemporaryDirectory() as path:
+            fpath = os.path.join(path, 'checkpoint.npz')
+            optimizer = nemoa.model.morphisms.new(model)
+
+            # keep the checkpoints of the running optimization
+            update_checkpoint = optimizer._update_checkpoint
+            def keep_checkpoint(*args, **kwds):
+                if not update_checkpoint(*args, **kwds): return False
+                epoch = optimizer._buffer['epoch']
+                shutil.copy(fpath, os.path.join(path, '%i.npz' % epoch))
+                return True
+            optimizer._update_checkpoint = keep_checkpoint
+
+            optimizer.optimize(algorithm='bprop', updates=10,
+                checkpoint_path=fpath, checkpoint_update_interval=5)
+            weights = model.system._params['links'][(0, 1)]['W'].copy()
+            interrupted = os.path.join(path, '5.npz')
+
+            with self.subTest(format='npz'):
+                with zipfile.ZipFile(fpath) as archive:
+                    self.assertIn('meta.npy', archive.namelist())
+                with numpy.load(fpath, allow_pickle=False) as archive:
+                    for key in archive.files:
+                        self.assertFalse(archive[key].dtype.hasobject)
+                self.assertEqual(
+                    checkpoint.load(interrupted)['buffer']['epoch'], 5)
+                self.assertEqual(
+                    checkpoint.load(fpath)['buffer']['epoch'], 10)
+
+            with self.subTest(step='resume'):
+                resumed = nemoa.model.morphisms.new(model)
+                resumed.optimize(resume=interrupted)
+                self.assertEqual(resumed._buffer['epoch'], 10)
+                self.assertTrue(numpy.allclose(
+                    model.system._params['links'][(0, 1)]['W'], weights))
+
+            with self.subTest(step='resume finished'):
+                model.system._params['links'][(0, 1)]['W'] *= 0.
+                resumed = nemoa.model.morphisms.new(model)
+                resumed.optimize(resume=fpath)
+                self.assertEqual(resumed._buffer['epoch'], 10)
+                self.assertTrue(numpy.allclose(
+                    model.system._params['links'][(0, 1)]['W'], weights))
+
+        with tempfile.TemporaryDirectory() as path:
+            model = nemoa.model.create(
+                dataset='linear', network='deep', system='dbn')
+            fpath = os.path.join(path, 'dbn.npz')
+            model.optimize(checkpoint_path=fpath,
+                checkpoint_update_interval=100)
+            with self.subTest(step='dbn'):
+                self.assertEqual(sorted(os.listdir(path)),
+                    ['dbn.layer0.npz', 'dbn.layer1.npz', 'dbn.npz'])
+                for name in os.listdir(path):
+                    state = checkpoint.load(os.path.join(path, name))
+                    self.assertFalse(state['buffer']['continue'])
+
+            with self.subTest(step='resume dbn'):
+                layer0 = os.path.join(path, 'dbn.layer0.npz')
+                mtime = os.stat(layer0).st_mtime_ns
+                os.remove(fpath)
+                os.remove(os.path.join(path, 'dbn.layer1.npz'))
+                model = nemoa.model.create(
+                    dataset='linear', network='deep', system='dbn')
+                optimizer = nemoa.model.morphisms.new(model)
+                optimizer.optimize(resume=fpath,
+                    checkpoint_update_interval=100)
+                self.assertEqual(sorted(os.listdir(path)),
+                    ['dbn.layer0.npz', 'dbn.layer1.npz', 'dbn.npz'])
+                self.assertEqual(os.stat(layer0).st_mtime_ns, mtime)
+                self.assertTrue(model.error < 0.5)
+
+    def test_model_stopping(self):
+        import numpy
+
+        model = nemoa.model.create(
+            dataset='linear', network='shallow', system='ann')
+        optimizer = nemoa.model.morphisms.new(model)
+
+        with self.subTest(criterion='objective'):
+            optimizer._set_config(None, tracker_obj_function='accuracy',
+                stop_obj_patience=2, stop_obj_min_improvement=.1)
+            optimizer._set_buffer_reset()
+            for value in [.5, .52, .6, .61]:
+                optimizer._update_stopping(value)
+                self.assertTrue(optimizer._buffer['continue'])
+            optimizer._update_stopping(.62)
+            self.assertFalse(optimizer._buffer['continue'])
+
+        with self.subTest(criterion='gradient'):
+            optimizer._set_config(None, stop_grad_min_norm=1.)
+            optimizer._set_buffer_reset()
+            grad = {'links': {('i', 'o'): {'W': numpy.full((2, 2), .6)}}}
+            optimizer._update_gradient_norm(grad)
+            self.assertTrue(optimizer._buffer['continue'])
+            grad['links'][('i', 'o')]['W'] /= 2.
+            optimizer._update_gradient_norm(grad)
+            self.assertFalse(optimizer._buffer['continue'])
+
+        with self.subTest(criterion='gradient', algorithm='cd'):
+            # the parameter updates of contrastive divergency are scaled
+            # by the update rate, which does not change the criterion
+            model, data = self.get_rbm_model()
+            optimizer = nemoa.model.morphisms.new(model)
+            optimizer._set_config(None, algorithm='cd', update_rate=.01,
+                stop_grad_min_norm=1., ignore_units=['visible', 'hidden'],
+                acc_vmra_enable=False)
+            optimizer._set_buffer_reset()
+            grad = numpy.full((6, 3), .6 / numpy.sqrt(4.5))
+            optimizer._cdiv_delta_links = lambda sampling: {
+                'W': optimizer._config['update_rate'] * grad}
+            optimizer._cdiv_update(data)
+            self.assertTrue(optimizer._buffer['continue'])
+            grad /= 2.
+            optimizer._cdiv_update(data)
+            self.assertFalse(optimizer._buffer['continue'])
+
+    def test_model_update_rules(self):
+        import numpy
+
+        model = nemoa.model.create(
+            dataset='linear', network='shallow', system='ann')
+        optimizer = nemoa.model.morphisms.new(model)
+
+        expect = {
+            'sgd': [[.1, -.2], [.1, -.2]],
+            'momentum': [[.1, -.2], [.19, -.38]],
+            'nesterov': [[.19, -.38], [.271, -.542]],
+            'rmsprop': [[3.162, -3.162], [2.237, -2.237]],
+            'adam': [[.1, -.1], [.1, -.1]]}
+        for rule, values in expect.items():
+            with self.subTest(rule=rule):
+                optimizer._set_config(None, algorithm='bprop',
+                    update_rule=rule, update_rule_momentum=.9)
+                optimizer._set_buffer_reset()
+                for value in values:
+                    grad = {'links': {('i', 'o'): {
+                        'W': numpy.array([1., -2.])}}}
+                    updates = optimizer._bprop_get_updates(grad)
+                    self.assertTrue(numpy.allclose(
+                        updates['links'][('i', 'o')]['W'], value,
+                        atol=1e-3))
+                    self.assertEqual(
+                        grad['links'][('i', 'o')]['W'].tolist(), [1., -2.])
+
+        with self.subTest(rule='adam', scaled=True):
+            # scaled updates are normalized like unscaled gradients
+            optimizer._set_config(None, algorithm='bprop', update_rule='adam')
+            optimizer._set_buffer_reset()
+            grad = {'links': {('i', 'o'): {'W': numpy.array([.1, -.2])}}}
+            updates = optimizer._get_updates_rule(grad, scaled=True)
+            self.assertTrue(numpy.allclose(
+                updates['links'][('i', 'o')]['W'], [.1, -.1], atol=1e-3))
+
+        with self.subTest(rule='momentum', algorithm='rprop'):
+            # the update rule does not feed back into the state of rprop
+            optimizer._set_config(None, algorithm='rprop',
+                update_rule='momentum', update_rule_momentum=.9)
+            optimizer._set_buffer_reset()
+            grad = {'units': {}, 'links': {('i', 'o'): {
+                'W': numpy.array([1., -2.])}}}
+            velocity = 0.
+            for i in range(3):
+                updates = optimizer._rprop_get_updates(grad)
+                state = optimizer._buffer['rprop']
+                step = state['step']['links'][('i', 'o')]['W']
+                self.assertTrue(numpy.allclose(
+                    state['update']['links'][('i', 'o')]['W'],
+                    step * [1., -1.]))
+                velocity = .9 * velocity + step * [1., -1.]
+                self.assertTrue(numpy.allclose(
+                    updates['links'][('i', 'o')]['W'], velocity))
+
+    def test_model_workspace(self):
+        import numpy
+
+        model = nemoa.model.create(
+            dataset='linear', network='deep', system='dbn')
+        system = model.system
+        mapping = system._get_mapping()
+        data = model.dataset.get('data', cols=mapping[0])[:50]
+
+        # reference forward pass without workspace
+        expect = data
+        for id in range(len(mapping) - 1):
+            units = system._units[mapping[id + 1]]
+            source = system._units[mapping[id]].params
+            weights = units.weights(source)
+            if source['class'] == 'gauss':
+                expect = units.expect_from_gauss_layer(
+                    expect, source, weights)
+            else:
+                expect = units.expect_from_sigmoid_layer(
+                    expect, source, weights)
+
+        with self.subTest(out=None):
+            value = system._get_unitexpect(data, mapping)
+            self.assertTrue(numpy.allclose(value, expect))
+        with self.subTest(out='array'):
+            out = numpy.empty_like(expect)
+            value = system._get_unitexpect(data, mapping, out=out)
+            self.assertIs(value, out)
+            self.assertTrue(numpy.allclose(out, expect))
+        with self.subTest(reuse=True):
+            arena = system._get_workspace(data, mapping)
+            system._get_unitvalues(data, mapping)
+            system._get_unitsamples(data, mapping)
+            self.assertIs(system._get_workspace(data, mapping), arena)
+            value = system._get_unitexpect(data, mapping)
+            self.assertTrue(numpy.allclose(value, expect))
+            self.assertFalse(any(value is step['out'] for step in arena))
+        with self.subTest(source='first step'):
+            self.assertEqual([step['source'] is None for step in arena],
+                [False] + [True] * (len(arena) - 1))
+        with self.subTest(limit='bytes'):
+            nbytes = sum(array.nbytes for step in arena
+                for array in step.values() if array is not None)
+            system._workspace_limit = 2 * nbytes
+            system._workspace.clear()
+            for size in [50, 40, 30]:
+                system._get_workspace(data[:size], mapping)
+            kept = sorted(key[1] for key in system._workspace)
+            self.assertEqual(kept, [30, 40])
+            system._workspace_limit = nbytes // 4
+            system._get_workspace(data[:20], mapping)
+            self.assertNotIn((tuple(mapping), 20, data.dtype.str),
+                system._workspace)
+
+    def test_model_units_cache(self):
+        import numpy
+
+        model = nemoa.model.create(
+            dataset='linear', network='deep', system='dbn')
+        system = model.system
+        mapping = system._get_mapping()
+        visible = system._units[mapping[0]]
+        hidden = system._units[mapping[1]]
+
+        with self.subTest(cached='sdev'):
+            sdev = visible.sdev()
+            self.assertIs(visible.sdev(), sdev)
+            self.assertTrue(numpy.allclose(
+                sdev, numpy.sqrt(numpy.exp(visible.params['lvar']))))
+            self.assertIs(hidden.source_sdev(visible.params), sdev)
+            visible.update({'lvar': numpy.ones_like(sdev)})
+            self.assertIsNot(visible.sdev(), sdev)
+            self.assertTrue(numpy.allclose(
+                visible.sdev(), sdev * numpy.sqrt(numpy.e)))
+        with self.subTest(cached='weights'):
+            weights = visible.weights(hidden.params)
+            self.assertTrue(numpy.all(
+                weights == system._params['links'][(0, 1)]['W'].T))
+        with self.subTest(cached='adjweights'):
+            links = system._params['links'][(0, 1)]
+            adjweights = hidden.adjweights(visible.params)
+            self.assertIs(hidden.adjweights(visible.params), adjweights)
+            links['W'] += 1.
+            hidden.touch()
+            self.assertTrue(numpy.allclose(
+                hidden.adjweights(visible.params), links['A'] * links['W']))
+
+    def get_rbm_model(self):
+        # create a gauss rbm on the visible units of the ann testsuite model
+        # in the same way as the layerwise pretraining of dbns
+        ann = nemoa.model.create(
+            dataset='linear', network='shallow', system='ann')
+        units = ann.system._params['units']
+        nodes = units[0]['id'] + units[-1]['id']
+        system = nemoa.system.new(config={'name': 'rbm', 'type': 'rbm.GRBM'})
+        network = nemoa.network.create('factor', name='rbm',
+            visible_nodes=nodes, visible_type='gauss',
+            hidden_nodes=['h1', 'h2', 'h3'], hidden_type='sigmoid')
+        system.configure(network)
+        ann.dataset.set('colfilter', visible=nodes)
+        model = nemoa.model.new(config={'type': 'base.Model', 'name': 'rbm'},
+            dataset=ann.dataset, network=network, system=system)
+        data = model.dataset.get('data', cols=('visible', 'visible'))[0]
+        return model, data[:20]
+
+    def test_model_pcd_sampling(self):
+        import numpy
+
+        model, data = self.get_rbm_model()
+        optimizer = nemoa.model.morphisms.new(model)
+        optimizer._set_config(None, algorithm='pcd', update_pcd_particles=7)
+        optimizer._set_buffer_reset()
+
+        with self.subTest(particles='init'):
+            vdata, hdata, vmodel, hmodel = optimizer._pcd_sampling(data)
+            self.assertEqual(hdata.shape, (20, 3))
+            self.assertEqual(vmodel.shape, (7, 6))
+            self.assertEqual(hmodel.shape, (7, 3))
+            self.assertEqual(optimizer.read('pcd')['particles'].shape, (7, 6))
+
+        with self.subTest(particles='persistent'):
+            particles = numpy.zeros((5, 6))
+            optimizer.write('pcd', particles=particles)
+            vdata, hdata, vmodel, hmodel = optimizer._pcd_sampling(data)
+            self.assertEqual(vmodel.shape, (5, 6))
+            stored = optimizer.read('pcd')['particles']
+            self.assertEqual(stored.shape, (5, 6))
+            self.assertIsNot(stored, particles)
+            optimizer._pcd_sampling(data)
+            self.assertIsNot(optimizer.read('pcd')['particles'], stored)
+            self.assertEqual(optimizer.read('pcd')['particles'].shape, (5, 6))
+
+        with self.subTest(steps=0):
+            optimizer._set_config(None, algorithm='pcd',
+                update_cd_sampling_steps=0)
+            with self.assertRaises(ValueError):
+                optimizer._pcd_sampling(data)
+
+    def test_model_pt_sampling(self):
+        import numpy
+
+        model, data = self.get_rbm_model()
+        optimizer = nemoa.model.morphisms.new(model)
+        optimizer._set_config(None, algorithm='pt', update_pt_replicas=4,
+            update_pt_particles=5)
+        optimizer._set_buffer_reset()
+
+        with self.subTest(replicas='shape'):
+            vdata, hdata, vmodel, hmodel = optimizer._ptmp_sampling(data)
+            self.assertEqual(optimizer.read('pt')['replicas'].shape,
+                (4, 5, 6))
+            self.assertEqual(vmodel.shape, (5, 6))
+            self.assertEqual(hmodel.shape, (5, 3))
+
+        with self.subTest(replicas='swap'):
+            # with epoch 0 the pairs (0, 1) and (2, 3) are proposed, where
+            # the energies accept the first and reject the second swap
+            ids = numpy.arange(4.).reshape((4, 1, 1))
+            vchain = ids * numpy.ones((4, 5, 6))
+            hchain = ids * numpy.ones((4, 5, 3))
+            beta = numpy.linspace(1., .1, 4).reshape((4, 1, 1))
+            energy = numpy.array([1000., 0., 0., 1000.])[:, numpy.newaxis]
+            optimizer._ptmp_energy = lambda v, h: energy * numpy.ones((4, 5))
+            vchain, hchain = optimizer._ptmp_swap(vchain, hchain, beta)
+            self.assertTrue(numpy.all(vchain[:, :, 0].T == [1, 0, 2, 3]))
+            self.assertTrue(numpy.all(hchain[:, :, 0].T == [1, 0, 2, 3]))
+
+    def test_model_prefetch(self):
+        import itertools
+        import numpy
+        from nemoa.math import rand
+        from nemoa.model.commons.prefetch import Prefetcher
+
+        with self.subTest(prefetch='batches'):
+            counter = itertools.count()
+            prefetcher = Prefetcher(lambda: next(counter), depth=2)
+            self.assertEqual([prefetcher.get() for i in range(5)],
+                [0, 1, 2, 3, 4])
+            self.assertTrue(prefetcher.stop())
+            self.assertFalse(prefetcher._thread.is_alive())
+
+        with self.subTest(prefetch='error'):
+            def func():
+                raise RuntimeError('prefetch')
+            prefetcher = Prefetcher(func, depth=2)
+            for i in range(2):
+                with self.assertRaises(RuntimeError):
+                    prefetcher.get()
+            self.assertTrue(prefetcher.stop())
+            self.assertFalse(prefetcher._thread.is_alive())
+
+        with self.subTest(prefetch='optimizer'):
+            model = nemoa.model.create(
+                dataset='linear', network='shallow', system='ann')
+            optimizer = nemoa.model.morphisms.new(model)
+            self.assertEqual(optimizer._default['prefetch_depth'], 2)
+            batches = {}
+            for depth in [0, 2]:
+                optimizer._set_config(None, algorithm='bprop',
+                    prefetch_depth=depth, minibatch_size=10,
+                    minibatch_update_interval=1)
+                optimizer._set_buffer_reset()
+                optimizer._buffer['data_random'] = rand.Stream(1)
+                batches[depth] = []
+                try:
+                    for epoch in range(3):
+                        optimizer._buffer['epoch'] = epoch
+                        data = optimizer._get_data_training()
+                        self.assertEqual([len(d) for d in data], [10, 10])
+                        batches[depth].append(data)
+                    self.assertEqual(optimizer._buffer['prefetcher'] is None,
+                        depth == 0)
+                finally:
+                    optimizer._get_data_prefetch_stop()
+                self.assertIsNone(optimizer._buffer['prefetcher'])
+
+            # prefetching does not change the sequence of minibatches
+            for data, prefetched in zip(batches[0], batches[2]):
+                for array, parray in zip(data, prefetched):
+                    self.assertTrue(numpy.all(array == parray))
@@ -32,6 +32,7 @@ __license__ = 'GPLv3'
 import numpy
 
 from nemoa.math import curve, meta
+from nemoa.system.commons.links import Links
 
 #
 # (1) Sampler for Bayesian Networks
@@ -437,6 +438,14 @@ def knockout(model, data, mapping = None, **kwds):
 
     if not default: return None
 
+    # calculate unit values with knockout in stacked batches
+    knockout = model.system._get_knockout_values(data, mapping = mapping,
+        measure = measure)
+    if knockout is not None:
+        for out_id, out_unit in enumerate(out_labels):
+            R[:, out_id] = knockout[:, out_id] - default[out_unit]
+        return R
+
     # calculate unit values with knockout
     for in_id, in_unit in enumerate(in_labels):
 
@@ -484,8 +493,8 @@ def connectionweight(model, data, mapping = None, **kwds):
 
     # calculate product of weight matrices
     for i in range(1, len(mapping))[::-1]:
-        weights = model.system._units[mapping[i - 1]].links(
-            {'layer': mapping[i]})['W']
+        weights = Links.get_dense(model.system._units[mapping[i - 1]].links(
+            {'layer': mapping[i]})['W'])
         if i == len(mapping) - 1: wsp = weights.copy()
         else: wsp = numpy.dot(wsp.copy(), weights)
 
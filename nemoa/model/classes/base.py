@@ -226,7 +226,8 @@ class Model(nbase.ObjectIP):
         else: statistics = 0
         cols = self.system.get('layers', visible = True)
         data = self.dataset.get('data',
-            size = statistics, cols = tuple(cols))
+            size = statistics, cols = tuple(cols),
+            dtype = self.system._get_dtype())
         if preprocessing:
             self.dataset.set('copy', dataset_backup)
 
@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+
+__author__ = 'Patrick Michl'
+__email__ = 'frootlab@gmail.com'
+__license__ = 'GPLv3'
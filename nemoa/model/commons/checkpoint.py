@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""Checkpoints of optimizations in numpy zipped archives."""
+
+__author__ = 'Patrick Michl'
+__email__ = 'frootlab@gmail.com'
+__license__ = 'GPLv3'
+
+import json
+import os
+import tempfile
+import numpy
+from nemoa.model.commons.tracker import Series, Snapshot
+
+def _encode(obj, arrays):
+    """Encode nested checkpoint structure for JSON.
+
+    Numpy arrays and scalars and the arrays of sparse matrices are moved
+    to the given dictionary and replaced by references to their keys,
+    such that they can be stored as native arrays of a numpy zipped
+    archive. Dictionaries are encoded as lists of key value pairs, since
+    their keys are not restricted to strings.
+
+    """
+
+    def add(arr):
+        key = 'array_%i' % len(arrays)
+        arrays[key] = arr
+        return key
+
+    if isinstance(obj, numpy.ndarray):
+        if obj.dtype.hasobject: raise ValueError(
+            "could not encode checkpoint: "
+            "numpy arrays of objects are not supported")
+        return {'array': add(obj)}
+    if isinstance(obj, numpy.generic):
+        return {'scalar': add(numpy.asarray(obj))}
+    if hasattr(obj, 'tocsr'):
+        obj = obj.tocsr()
+        return {'sparse': [add(obj.data), add(obj.indices),
+            add(obj.indptr)], 'shape': list(obj.shape)}
+    if isinstance(obj, Series):
+        return {'series': list(obj.columns), 'data': add(obj.get())}
+    if isinstance(obj, Snapshot):
+        return {'snapshot': _encode(obj.params, arrays)}
+    if isinstance(obj, dict):
+        return {'dict': [[_encode(key, arrays),
+            _encode(val, arrays)] for key, val in obj.items()]}
+    if isinstance(obj, tuple):
+        return {'tuple': [_encode(val, arrays) for val in obj]}
+    if isinstance(obj, list):
+        return [_encode(val, arrays) for val in obj]
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return obj
+
+    raise ValueError(
+        "could not encode checkpoint: "
+        "unsupported type '%s'" % type(obj).__name__)
+
+def _decode(obj, arrays):
+    """Decode nested checkpoint structure, as encoded for JSON."""
+
+    if isinstance(obj, list):
+        return [_decode(val, arrays) for val in obj]
+    if not isinstance(obj, dict): return obj
+    if 'array' in obj: return arrays[obj['array']]
+    if 'scalar' in obj: return arrays[obj['scalar']][()]
+    if 'sparse' in obj:
+        import scipy.sparse
+        data, indices, indptr = [arrays[key] for key in obj['sparse']]
+        return scipy.sparse.csr_matrix((data, indices, indptr),
+            shape = tuple(obj['shape']))
+    if 'series' in obj:
+        data = arrays[obj['data']]
+        series = Series(obj['series'], dtype = data.dtype,
+            capacity = data.shape[0])
+        for row in data: series.append(*row)
+        return series
+    if 'snapshot' in obj:
+        snapshot = Snapshot()
+        snapshot.params = _decode(obj['snapshot'], arrays)
+        return snapshot
+    if 'tuple' in obj:
+        return tuple(_decode(val, arrays) for val in obj['tuple'])
+
+    return {_decode(key, arrays): _decode(val, arrays)
+        for key, val in obj['dict']}
+
+def save(path, checkpoint):
+    """Write checkpoint atomically to numpy zipped archive.
+
+    The arrays of the checkpoint are stored as native arrays of the
+    archive and the remaining structure as JSON string, such that the
+    checkpoint can be read without unpickling. The checkpoint is written
+    to a temporary file in the directory of the given path, which then
+    replaces the file of a previous checkpoint, such that an interrupted
+    write never corrupts the last checkpoint.
+
+    """
+
+    path = str(path)
+    dirname = os.path.dirname(os.path.abspath(path))
+    if not os.path.exists(dirname): os.makedirs(dirname)
+
+    fd, tmp = tempfile.mkstemp(suffix = '.npz', dir = dirname)
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            arrays = {}
+            meta = json.dumps(_encode(checkpoint, arrays))
+            numpy.savez(file, meta = numpy.array(meta), **arrays)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+    return True
+
+def load(path):
+    """Read checkpoint from numpy zipped archive."""
+
+    with numpy.load(path, allow_pickle = False) as archive:
+        arrays = {key: archive[key] for key in archive.files}
+
+    return _decode(json.loads(str(arrays.pop('meta'))), arrays)
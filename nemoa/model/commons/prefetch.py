@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""Prefetching of training data in background threads."""
+
+__author__ = 'Patrick Michl'
+__email__ = 'frootlab@gmail.com'
+__license__ = 'GPLv3'
+
+import queue
+import threading
+from nemoa.base import thread
+
+class Prefetcher:
+    """Background producer of training data.
+
+    The given function is repeatedly called by a worker thread, which
+    fills a bounded queue with its results. This overlaps the preparation
+    of minibatches with the parameter updates of the optimizer. With a
+    queue depth of two, the next minibatch is prepared while the current
+    one is consumed (double buffering).
+
+    """
+
+    def __init__(self, func, depth = 2):
+        self._func = func
+        self._error = None
+        self._queue = queue.Queue(maxsize = max(int(depth), 1))
+        self._stop = threading.Event()
+        self._thread = thread.create(self._produce)
+
+    def _produce(self):
+        while not self._stop.is_set():
+            try:
+                item = (self._func(), None)
+            except Exception as err:
+                item = (None, err)
+            while not self._stop.is_set():
+                try:
+                    self._queue.put(item, timeout = .1)
+                    break
+                except queue.Full:
+                    continue
+            if item[1] is not None: break
+
+    def get(self):
+        """Get next prefetched item.
+
+        If the function raised an error, the worker thread has exited and
+        the error is raised again by this and every following call.
+
+        """
+
+        if self._error is not None: raise self._error
+        data, err = self._queue.get()
+        if err is not None:
+            self._error = err
+            raise err
+
+        return data
+
+    def stop(self):
+        """Stop worker thread."""
+
+        self._stop.set()
+        self._thread.join()
+
+        return True
@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""Tracking of objective functions and system parameters."""
+
+__author__ = 'Patrick Michl'
+__email__ = 'frootlab@gmail.com'
+__license__ = 'GPLv3'
+
+import copy
+import queue
+import threading
+import numpy
+import nemoa
+from nemoa.base import thread
+
+class Tracker:
+    """Background evaluation of objective functions.
+
+    The objective function is evaluated by a worker thread on snapshots
+    of the system parameters, which are set to a private copy of the
+    system. This prevents the evaluation from stalling the optimization.
+    At most one evaluation is pending at any time, such that further
+    requests are dropped while the worker thread is busy. The parameters
+    are copied to two preallocated snapshots, which are used alternately,
+    such that the snapshot of a finished evaluation remains valid until
+    the next but one request.
+
+    """
+
+    def __init__(self, model):
+        import nemoa.model.evaluation
+
+        system = nemoa.system.new(**model.system.get('copy'))
+        self._model = nemoa.model.new(
+            config = {'type': 'base.Model', 'name': model.name},
+            dataset = model.dataset, network = model.network,
+            system = system)
+        self._evaluation = nemoa.model.evaluation.new(self._model)
+        self._snapshots = (Snapshot(), Snapshot())
+        self._count = 0
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._thread = thread.create(self._consume)
+
+    def _consume(self):
+        while True:
+            request = self._requests.get()
+            if request is None: break
+            progress, name, params, data = request
+            try:
+                self._model.system.set('copy', params = params)
+                value = self._evaluation.evaluate(name, data = data)
+                self._results.put((progress, value, params, None))
+            except Exception as err:
+                self._results.put((progress, None, params, err))
+            self._idle.set()
+
+    def busy(self):
+        """Return True if an evaluation is pending."""
+
+        return not self._idle.is_set()
+
+    def put(self, progress, name, params, data):
+        """Request evaluation of objective function.
+
+        Args:
+            progress (float): optimization progress of the snapshot
+            name (str): name of objective function
+            params (dict): system parameters, which are copied to a
+                snapshot
+            data (tuple): data for evaluation
+
+        Returns:
+            True if the evaluation has been scheduled and False if the
+            worker thread is busy.
+
+        """
+
+        if self.busy(): return False
+        snapshot = self._snapshots[self._count % 2]
+        snapshot.save(params)
+        self._count += 1
+        self._idle.clear()
+        self._requests.put((progress, name, snapshot.params, data))
+
+        return True
+
+    def get(self):
+        """Get list of finished evaluations.
+
+        Returns:
+            List of tuples (progress, value, params), which contain the
+            optimization progress, the value of the objective function
+            and the evaluated snapshot of the system parameters. The
+            snapshot is reused by the next but one request.
+
+        """
+
+        results = []
+        while True:
+            try:
+                progress, value, params, err = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if err is not None: raise err
+            results.append((progress, value, params))
+
+        return results
+
+    def stop(self):
+        """Stop worker thread after pending evaluation.
+
+        Returns:
+            List of finished evaluations, as returned by :meth:`get`.
+
+        """
+
+        self._requests.put(None)
+        self._thread.join()
+
+        return self.get()
+
+class Series:
+    """Time series of tracked values.
+
+    The values are stored in the rows of a preallocated array, which
+    doubles its capacity when it is full. Appending values is therefore
+    amortized O(1) and the tracked values are available as views of the
+    array without copying.
+
+    Args:
+        columns (tuple of str): names of the tracked values
+        dtype (numpy dtype or str, optional): dtype of the tracked values
+            default: 'float64'
+        capacity (int, optional): initial number of rows
+            default: 256
+
+    """
+
+    def __init__(self, columns, dtype = 'float64', capacity = 256):
+        self.columns = tuple(columns)
+        self._data = numpy.empty((max(int(capacity), 1),
+            len(self.columns)), dtype = dtype)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, *args, **kwds):
+        """Append tracked values.
+
+        The values are given by positional arguments in the order of the
+        columns or by keyword arguments with the names of the columns.
+
+        """
+
+        if not args: args = tuple(kwds[key] for key in self.columns)
+        if self._size == self._data.shape[0]:
+            data = numpy.empty((2 * self._size, self._data.shape[1]),
+                dtype = self._data.dtype)
+            data[:self._size] = self._data
+            self._data = data
+        self._data[self._size] = args
+        self._size += 1
+
+        return True
+
+    def get(self, key = None):
+        """Get view of tracked values.
+
+        Args:
+            key (str, optional): name of column. Default: None returns
+                all columns
+
+        Returns:
+            Numpy array of shape (rows, columns) or for a given column
+            of shape (rows, ).
+
+        """
+
+        data = self._data[:self._size]
+        if key is None: return data
+        if key not in self.columns: raise KeyError(f"unknown key '{key}'")
+
+        return data[:, self.columns.index(key)]
+
+    def save(self, path):
+        """Export tracked values to file.
+
+        Args:
+            path (str): path of file. With the file extension '.csv' the
+                values are written as comma separated values with the
+                column names as header, else as numpy NPZ archive with
+                one array per column.
+
+        """
+
+        if str(path).lower().endswith('.csv'):
+            numpy.savetxt(path, self.get(), delimiter = ',',
+                header = ','.join(self.columns), comments = '')
+        else:
+            numpy.savez(path, **{key: self.get(key)
+                for key in self.columns})
+
+        return True
+
+class Snapshot:
+    """Preallocated copy of system parameters.
+
+    The first snapshot creates a deep copy of the parameters. Further
+    snapshots copy the parameter arrays into the preallocated arrays of
+    the copy, which avoids the repeated allocation of the complete
+    parameter tree, e.g. when tracking the optimum of the objective
+    function. The snapshot is restored in place, such that references
+    to the parameter arrays remain valid.
+
+    """
+
+    def __init__(self):
+        self.params = None
+
+    def save(self, params):
+        """Copy parameters to snapshot."""
+
+        if self.params is None or not _copyto(self.params, params):
+            self.params = copy.deepcopy(params)
+
+        return True
+
+    def restore(self, params):
+        """Copy snapshot to parameters.
+
+        Returns:
+            True if the parameters could be restored in place and False
+            if the structure of the parameters differs from the snapshot.
+
+        """
+
+        if self.params is None: return False
+
+        return _copyto(params, self.params)
+
+def _copyto(tgt, src):
+    """Copy nested parameter structure into preallocated structure.
+
+    Returns:
+        True if the structures are equal, apart from the values of the
+        numpy arrays and sparse matrices, else False. In the latter case
+        the target structure may be partially updated.
+
+    """
+
+    if isinstance(src, numpy.ndarray):
+        if not isinstance(tgt, numpy.ndarray) or tgt.shape != src.shape \
+            or tgt.dtype != src.dtype: return False
+        numpy.copyto(tgt, src)
+        return True
+    if hasattr(src, 'tocsr'):
+        if type(tgt) is not type(src) or tgt.shape != src.shape \
+            or tgt.nnz != src.nnz \
+            or not numpy.array_equal(tgt.indptr, src.indptr) \
+            or not numpy.array_equal(tgt.indices, src.indices):
+            return False
+        numpy.copyto(tgt.data, src.data)
+        return True
+    if isinstance(src, dict):
+        if not isinstance(tgt, dict) or tgt.keys() != src.keys():
+            return False
+        return all(_copyto(tgt[key], src[key]) for key in src)
+    if isinstance(src, (list, tuple)):
+        if type(tgt) is not type(src) or len(tgt) != len(src):
+            return False
+        return all(_copyto(t, s) for t, s in zip(tgt, src))
+
+    return tgt == src
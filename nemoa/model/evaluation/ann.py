@@ -20,6 +20,7 @@ import nemoa
 
 from nemoa.model.evaluation.base import Evaluation
 from nemoa.math import curve, meta
+from nemoa.system.commons.links import Links
 
 class ANN(Evaluation):
 
@@ -453,8 +454,8 @@ class ANN(Evaluation):
 
         # calculate product of weight matrices
         for i in range(1, len(mapping))[::-1]:
-            weights = self.model.system._units[mapping[i - 1]].links(
-                {'layer': mapping[i]})['W']
+            weights = Links.get_dense(self.model.system._units[
+                mapping[i - 1]].links({'layer': mapping[i]})['W'])
             if i == len(mapping) - 1: wsp = weights.copy()
             else: wsp = numpy.dot(wsp.copy(), weights)
 
@@ -508,6 +509,14 @@ class ANN(Evaluation):
 
         if not default: return None
 
+        # calculate unit values with knockout in stacked batches
+        knockout = self.model.system._get_knockout_values(data,
+            mapping = mapping, measure = measure)
+        if knockout is not None:
+            for out_id, out_unit in enumerate(out_labels):
+                R[:, out_id] = knockout[:, out_id] - default[out_unit]
+            return R
+
         # calculate unit values with knockout
         for in_id, in_unit in enumerate(in_labels):
 
@@ -536,62 +545,8 @@ class ANN(Evaluation):
     def coinduction(self, data, *args, **kwds):
         """Coinduced deviation from source to target units."""
 
-        # 2do: Open Problem:
-        #       Normalization of CoInduction
-        # Ideas:
-        #       - Combine CoInduction with common distribution
-        #         of induced values
-        #       - Take a closer look to extreme Values
-
-        # 2do: Proove:
-        # CoInduction <=> Common distribution in 'deep' latent variables
-
-        # algorithmic default parameters
-        gauge = 0.1 # setting gauge lower than induction default
-                    # to increase sensitivity
-
-        mapping = self.model.system._get_mapping()
-        srcunits = self.model.system._get_units(layer = mapping[0])
-        tgtunits = self.model.system._get_units(layer = mapping[-1])
-
-        # prepare cooperation matrix
-        coop = numpy.zeros((len(srcunits), len(srcunits)))
-
-        # create keawords for induction measurement
-
-        if 'gauge' not in kwds: kwds['gauge'] = gauge
-
-        # calculate induction without manipulation
-        ind = self._get_induction(data, *args, **kwds)
-        norm = numpy.sqrt((ind ** 2).sum(axis = 1))
-
-        # calculate induction with manipulation
-        for sid, sunit in enumerate(srcunits):
-
-            # manipulate source unit values and calculate induction
-            datamp = [numpy.copy(data[0]), data[1]]
-            datamp[0][:, sid] = 10.0
-            indmp = self._get_induction(datamp, *args, **kwds)
-
-            print(('manipulation of', sunit))
-            vals = [-2., -1., -0.5, 0., 0.5, 1., 2.]
-            maniparr = numpy.zeros(shape = (len(vals), data[0].shape[1]))
-            for vid, val in enumerate(vals):
-                datamod = [numpy.copy(data[0]), data[1]]
-                datamod[0][:, sid] = val #+ datamod[0][:, sid].mean()
-                indmod = self._get_induction(datamod, *args, **kwds)
-                maniparr[vid, :] = numpy.sqrt(((indmod - ind) ** 2).sum(axis = 1))
-            manipvar = maniparr.var(axis = 0)
-            #manipvar /= numpy.amax(manipvar)
-            manipnorm = numpy.amax(manipvar)
-            # 2do
-            print((manipvar * 1000.))
-            print((manipvar / manipnorm))
-
-            coop[:,sid] = \
-                numpy.sqrt(((indmp - ind) ** 2).sum(axis = 1))
-
-        return coop
+        # calculate coinduced deviations in stacked batches
+        return self.model.system._get_coinduction(data, *args, **kwds)
 
     @meta.custom(
         name     = 'induction',
@@ -639,36 +594,10 @@ class ANN(Evaluation):
         if not mapping: mapping = self.model.system._get_mapping()
         iunits = self.model.system._get_units(layer = mapping[0])
         ounits = self.model.system._get_units(layer = mapping[-1])
-        R = numpy.zeros((len(iunits), len(ounits)))
-
-        # get indices of representatives
-        rids = [int((i + 0.5) * int(float(data[0].shape[0])
-            / points)) for i in range(points)]
-
-        for iid, iunit in enumerate(iunits):
-            icurve = amplify * numpy.take(
-                numpy.sort(data[0][:, iid]), rids)
-
-            # create output matrix for each output
-            C = {ounit: numpy.zeros((data[0].shape[0], points)) \
-                for ounit in ounits}
-            for pid in range(points):
-                idata  = data[0].copy()
-                idata[:, iid] = icurve[pid]
-                oexpect = self.unitexpect(idata, mapping = mapping)
-                for tid, ounit in enumerate(ounits):
-                    C[ounit][:, pid] = oexpect[:, tid]
-
-            # calculate mean of standard deviations of outputs
-            for oid, ounit in enumerate(ounits):
-
-                # calculate norm by mean over part of data
-                bound = int((1. - gauge) * data[0].shape[0])
-                subset = numpy.sort(C[ounit].std(axis = 1))[bound:]
-                norm = subset.mean() / data[1][:, oid].std()
 
-                # calculate influence
-                R[iid, oid] = norm
+        # calculate induced deviations in stacked batches
+        R = self.model.system._get_induction_values(data, mapping = mapping,
+            points = points, amplify = amplify, gauge = gauge)
 
         # amplify contrast of induction
         A = R.copy()
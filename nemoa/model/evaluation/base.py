@@ -18,6 +18,7 @@ class Evaluation:
     def __init__(self, model = None, *args, **kwds):
         """Configure evaluation to given nemoa model instance."""
 
+        self._buffer = {}
         if model: self._set_model(model)
 
     def get(self, key, *args, **kwds):
@@ -42,23 +43,22 @@ class Evaluation:
     def _get_algorithms(self, category=None, attribute=None):
         """Get evaluation algorithms."""
 
-        if 'algorithms' not in self._buffer:
-            self._buffer['algorithms'] = {}
-        algorithms = self._buffer['algorithms'].get(attribute, None)
-        if not algorithms:
-            algorithms = entity.get_methods(
-                self, key='name', val=attribute, groupby='category')
-            self._buffer['algorithms'][attribute] = algorithms
+        registry = entity.get_registry(
+            self.__class__, key='name', groupby='category')
         if category:
-            if category not in algorithms:
-                return {}
-            algorithms = algorithms[category]
+            return registry.select(self, category, attribute)
 
-        return algorithms
+        return registry.groups(self, attribute)
 
-    def _get_algorithm(self, name, *args, **kwds):
+    def _get_algorithm(self, name, category=None, attribute=None):
         """Get evaluation algorithm."""
-        return self._get_algorithms(*args, **kwds).get(name, None)
+
+        if not category:
+            return self._get_algorithms(attribute=attribute).get(name, None)
+        registry = entity.get_registry(
+            self.__class__, key='name', groupby='category')
+
+        return registry.get(self, name, category, attribute)
 
     def _get_data(self):
         """Get data for evaluation.
@@ -77,7 +77,7 @@ class Evaluation:
             dataset = self.model.dataset
             mapping = system._get_mapping()
             cols = (mapping[0], mapping[-1])
-            data = dataset.get('data', cols=cols)
+            data = dataset.get('data', cols=cols, dtype=system._get_dtype())
             if data:
                 self._buffer['data'] = data
 
@@ -7,7 +7,11 @@ __license__ = 'GPLv3'
 
 import nemoa.model.morphisms.base
 import numpy
+from concurrent.futures import ProcessPoolExecutor
+from nemoa.base import shmem
+from nemoa.core import ui
 from nemoa.math import meta
+from nemoa.system.commons.links import Links
 
 class ANN(nemoa.model.morphisms.base.Optimizer):
 
@@ -17,11 +21,17 @@ class ANN(nemoa.model.morphisms.base.Optimizer):
         'noise_enable': False,
         'minibatch_size': 100,
         'minibatch_update_interval': 10,
+        'prefetch_depth': 2,
         'schedule': None,
         'visible': None,
         'hidden': None,
         'adjacency_enable': False,
         'bprop_rate': .1,
+        'bprop_workers': None,
+        'update_rule': 'sgd',
+        'update_rule_momentum': .9,
+        'update_rule_decay': .999,
+        'update_rule_epsilon': 1e-8,
         'rprop_accel': (.5, 1., 1.2),
         'rprop_init_rate': .001,
         'rprop_min_factor': .000001,
@@ -36,6 +46,14 @@ class ANN(nemoa.model.morphisms.base.Optimizer):
         'tracker_eval_enable': True,
         'tracker_eval_function': 'accuracy',
         'tracker_eval_time_interval': 10.,
+        'tracker_sample_size': 0,
+        'tracker_async': False,
+        'checkpoint_path': None,
+        'checkpoint_update_interval': 0,
+        'checkpoint_time_interval': 0.,
+        'stop_obj_patience': 0,
+        'stop_obj_min_improvement': 0.,
+        'stop_grad_min_norm': 0.,
         'ignore_units': [] }
 
     @meta.custom(
@@ -48,26 +66,50 @@ class ANN(nemoa.model.morphisms.base.Optimizer):
     def _bprop(self):
         """Optimize parameters using backpropagation of error."""
 
-        while self.update():
-            # get training data (sample from stratified minibatches)
-            data = self._get_data_training()
-            # forward pass (compute estimations from given input)
-            values = self._bprop_forward(data[0])
-            # backward pass (compute deltas to given output)
-            deltas = self._bprop_backward(data[1], values)
-            # compute parameter updates
-            updates = self._bprop_get_updates(values, deltas)
-            # update parameters
-            self._bprop_update(updates)
+        self._bprop_pool_start()
+        try:
+            while self.update():
+                # get training data (sample from stratified minibatches)
+                data = self._get_data_training()
+                # compute gradient by forward and backward pass
+                grad = self._bprop_get_gradient_data(data)
+                # (optional) stop optimization on small gradient
+                self._update_gradient_norm(grad)
+                # compute parameter updates
+                updates = self._bprop_get_updates(grad)
+                # update parameters
+                self._bprop_update(updates)
+        finally:
+            self._bprop_pool_stop()
 
         return True
 
-    def _bprop_forward(self, data):
+    def _get_rate(self):
+        """Get current update rate of backpropagation."""
+
+        if self._config.get('algorithm', None) == 'bprop':
+            return float(self._config.get('bprop_rate', .1))
+
+        # the step sizes of rprop are adapted per parameter
+        if self._config.get('algorithm', None) == 'rprop':
+            return numpy.nan
+
+        return super()._get_rate()
+
+    def _bprop_forward(self, data, netin = None):
         """Backpropagation of error forward pass.
 
         Compute expectation values for all layers, from given data
         on input layer using current system parameters.
 
+        Args:
+            data: numpy array containing the data of the input layer
+            netin: optional dictionary, which is used as a cache for the
+                net inputs (pre-activations) of the layers. If given, the
+                dictionary is filled with the layer names as keys and the
+                net inputs of the layers as values, such that they can be
+                reused by the backward pass.
+
         Returns:
             Dictionary with layers names as keys and expectation values
             of (the units of) the layers as values, stored in numpy
@@ -75,20 +117,35 @@ class ANN(nemoa.model.morphisms.base.Optimizer):
 
         """
 
-        mapping = self.model.system._get_mapping()
+        system = self.model.system
+        mapping = system._get_mapping()
         values = {}
         for lid, layer in enumerate(mapping):
             if lid == 0:
                 values[layer] = data
                 continue
-            values[layer] = self.model.system._get_unitexpect(
-                values[mapping[lid - 1]], mapping[lid - 1:lid + 1])
+            if netin is None:
+                values[layer] = system._get_unitexpect(
+                    values[mapping[lid - 1]], mapping[lid - 1:lid + 1])
+                continue
+            units = system._units[layer]
+            netin[layer] = units.netin(values[mapping[lid - 1]],
+                system._units[mapping[lid - 1]].params)
+            values[layer] = units.activation(netin[layer])
 
         return values
 
-    def _bprop_backward(self, tgtdata, values):
+    def _bprop_backward(self, tgtdata, values, netin = None):
         """Backpropagation of error backward pass.
 
+        Args:
+            tgtdata: numpy array containing the data of the output layer
+            values: dictionary with expectation values of the layers, as
+                returned by the forward pass
+            netin: optional dictionary with net inputs of the layers,
+                as cached by the forward pass. Default: None recomputes
+                the net inputs of the hidden layers
+
         Returns:
             Weight delta from backpropagation of error.
 
@@ -104,11 +161,12 @@ class ANN(nemoa.model.morphisms.base.Optimizer):
             if id == len(layers) - 2:
                 delta[(src, tgt)] = values[tgt] - tgtdata
                 continue
-            srcdata = system._units[tgt].params['bias'] \
-                + numpy.dot(values[src],
+            if netin and tgt in netin: srcdata = netin[tgt]
+            else: srcdata = system._units[tgt].params['bias'] \
+                + Links.dot(values[src],
                 system._params['links'][(id, id + 1)]['W'])
             grad = system._units[tgt].grad(srcdata)
-            delta[(src, tgt)] = numpy.dot(delta[(tgt, layers[id + 2])],
+            delta[(src, tgt)] = Links.dot(delta[(tgt, layers[id + 2])],
                 system._params['links'][(id + 1, id + 2)]['W'].T) * grad
 
         return delta
@@ -117,38 +175,166 @@ class ANN(nemoa.model.morphisms.base.Optimizer):
         """Update parameters from dictionary."""
 
         system = self.model.system
-
         layers = system._get_mapping()
         for id, layer in enumerate(layers[:-1]):
             src = layer
             tgt = layers[id + 1]
-            system._params['links'][(id, id + 1)]['W'] += \
-                updates['links'][(src, tgt)]['W']
+            Links.add(system._params['links'][(id, id + 1)]['W'],
+                updates['links'][(src, tgt)]['W'])
+            system._units[src].touch()
             system._units[tgt].update(updates['units'][tgt])
 
         return True
 
-    def _bprop_get_updates(self, out, delta):
-        """Compute parameter update directions from weight deltas."""
+    def _bprop_get_updates(self, grad):
+        """Compute parameter update directions from gradient."""
 
-        system = self.model.system
+        # the update rule scales the gradient by the rate 'bprop_rate'
+        return self._get_updates_rule(grad)
 
-        rate = self._config.get('bprop_rate', .1)
+    def _bprop_get_gradient(self, out, delta):
+        """Compute parameter gradient from weight deltas."""
 
+        system = self.model.system
         layers = system._get_mapping()
-        links = {}
-        units = {}
+
+        # compute gradient from delta rule
+        grad = {'units': {}, 'links': {}}
         for id, src in enumerate(layers[:-1]):
             tgt = layers[id + 1]
-            updu = system._units[tgt].get_updates_delta(delta[src, tgt])
-            updl = nemoa.system.commons.links.Links.get_updates_delta(
-                out[src], delta[src, tgt])
-            units[tgt] = {key: rate * updu[key]
-                for key in updu.keys()}
-            links[(src, tgt)] = {key: rate * updl[key]
-                for key in updl.keys()}
+            grad['units'][tgt] = \
+                system._units[tgt].get_updates_delta(delta[src, tgt])
+            grad['links'][(src, tgt)] = Links.get_updates_delta(
+                out[src], delta[src, tgt],
+                system._params['links'][(id, id + 1)]['W'])
 
-        return { 'units': units, 'links': links }
+        return grad
+
+    def _bprop_get_gradient_data(self, data):
+        """Compute parameter gradient from training data.
+
+        If a pool of worker processes has been started, the training
+        data is split into shards of samples, whose gradients are
+        computed by the worker processes and reduced to the gradient
+        of the training data. Otherwise the gradient is computed in the
+        current process.
+
+        Args:
+            data: 2-tuple with numpy arrays: input data and output data
+
+        Returns:
+            Dictionary with the gradients of the unit and link parameters.
+
+        """
+
+        pool = self._buffer.get('bprop_pool', None)
+        if not pool:
+            # forward pass (compute estimations from given input)
+            netin = {}
+            values = self._bprop_forward(data[0], netin = netin)
+            # backward pass (compute deltas to given output)
+            deltas = self._bprop_backward(data[1], values, netin = netin)
+            return self._bprop_get_gradient(values, deltas)
+
+        # compute gradients of shards in worker processes. The versions
+        # of the unit layers are passed to the workers, which invalidate
+        # the cached values of their unit layers, when the parameters in
+        # shared memory have been changed
+        shards = numpy.array_split(numpy.arange(data[0].shape[0]),
+            min(pool['workers'], data[0].shape[0]))
+        versions = {layer: units.version
+            for layer, units in self.model.system._units.items()}
+        tasks = [pool['executor'].submit(_get_bprop_shard,
+            data[0][ids], data[1][ids], versions) for ids in shards]
+
+        # reduce gradients of shards, weighted by the number of samples
+        grad = None
+        for ids, task in zip(shards, tasks):
+            part = task.result()
+            weight = float(ids.size) / data[0].shape[0]
+            if grad is None:
+                grad = {cat: {key: {pkey: weight * val
+                    for pkey, val in upd.items()}
+                    for key, upd in part[cat].items()} for cat in part}
+                continue
+            for cat in part:
+                for key, upd in part[cat].items():
+                    for pkey, val in upd.items():
+                        grad[cat][key][pkey] += weight * val
+
+        return grad
+
+    def _bprop_pool_start(self):
+        """Start worker processes for data parallel gradients.
+
+        The number of worker processes is given by the configuration
+        key 'bprop_workers'. The parameter arrays of the units and links
+        are moved to shared memory, such that the worker processes read
+        the current parameters, which are updated in place by
+        _bprop_update(), without copying them per minibatch.
+
+        Returns:
+            Bool which is True if worker processes have been started.
+
+        """
+
+        workers = self._config.get('bprop_workers', None)
+        if not workers or workers < 2: return False
+
+        if not shmem.is_available():
+            ui.warning("worker processes require shared memory: "
+                "using single process.")
+            return False
+
+        system = self.model.system
+        if any(Links.issparse(links.get('W'))
+            for links in system._params['links'].values()):
+            ui.warning("worker processes are not supported "
+                "for sparse links: using single process.")
+            return False
+        copy = system.get('copy')
+        shared, blocks = shmem.share(copy['params'])
+        params, attached = shmem.attach(shared)
+
+        # bind parameter arrays of the system to shared memory
+        bound = []
+        for lid, layer in enumerate(system._params['units']):
+            for key in ['bias', 'lvar']:
+                if key not in layer: continue
+                layer[key] = params['units'][lid][key]
+                bound.append((layer, key, layer[key]))
+        for lid, link in system._params['links'].items():
+            for key in ['W', 'A']:
+                if key not in link: continue
+                link[key] = params['links'][lid][key]
+                bound.append((link, key, link[key]))
+
+        executor = ProcessPoolExecutor(max_workers = workers,
+            initializer = _init_bprop_worker,
+            initargs = (type(self), self._config, copy['config'], shared))
+        self._buffer['bprop_pool'] = {
+            'workers': workers, 'executor': executor, 'bound': bound,
+            'blocks': blocks, 'attached': attached}
+
+        return True
+
+    def _bprop_pool_stop(self):
+        """Stop worker processes and release shared memory."""
+
+        pool = self._buffer.pop('bprop_pool', None)
+        if not pool: return True
+
+        pool['executor'].shutdown()
+
+        # copy parameter arrays, which are still bound to shared memory
+        for parent, key, array in pool['bound']:
+            if parent.get(key) is array: parent[key] = array.copy()
+        pool['bound'] = None
+
+        shmem.release(pool['attached'])
+        shmem.release(pool['blocks'], unlink = True)
+
+        return True
 
     @meta.custom(
         name     = 'rprop',
@@ -166,37 +352,41 @@ class ANN(nemoa.model.morphisms.base.Optimizer):
 
         """
 
-        while self.update():
-            data = self._get_data_training()
-            # forward pass (compute estimations from given input)
-            values = self._bprop_forward(data[0])
-            # backward pass (compute deltas to given output)
-            deltas = self._bprop_backward(data[1], values)
-            # compute parameter updates
-            updates = self._rprop_get_updates(values, deltas)
-            # update parameters
-            self._bprop_update(updates)
+        self._bprop_pool_start()
+        try:
+            while self.update():
+                data = self._get_data_training()
+                # compute gradient by forward and backward pass
+                grad = self._bprop_get_gradient_data(data)
+                # (optional) stop optimization on small gradient
+                self._update_gradient_norm(grad)
+                # compute parameter updates
+                updates = self._rprop_get_updates(grad)
+                # update parameters
+                self._bprop_update(updates)
+        finally:
+            self._bprop_pool_stop()
 
         return True
 
-    def _rprop_get_updates(self, out, delta):
-        """ """
-
-        def _get_dict(dict, val): return {key: val * numpy.ones(
-            shape = dict[key].shape) for key in list(dict.keys())}
-
-        def _get_update(prevGrad, prev_update, grad, accel, min_factor,
-            max_factor):
-            update = {}
-            for key in list(grad.keys()):
-                sign = numpy.sign(grad[key])
-                a = numpy.sign(prevGrad[key]) * sign
-                magnitude = numpy.maximum(numpy.minimum(
-                    prev_update[key] \
-                    * (accel[0] * (a == -1) + accel[1] * (a == 0)
-                    + accel[2] * (a == 1)), max_factor), min_factor)
-                update[key] = magnitude * sign
-            return update
+    def _rprop_get_updates(self, grad):
+        """Compute parameter updates using resiliant backpropagation.
+
+        The state of the algorithm, which comprises the previous
+        gradients, the step sizes and the updates of all parameters, is
+        preallocated on the first call and updated in place by the
+        following calls, such that no arrays are allocated per update.
+
+        Args:
+            grad: dictionary with the gradients of the unit and link
+                parameters
+
+        Returns:
+            Dictionary with the updates of the unit and link parameters,
+            which are transformed by the update rule. The numpy arrays
+            are reused by the following calls.
+
+        """
 
         # RProp parameters
         accel = self._config.get('rprop_accel', (.5, 1., 1.2))
@@ -204,54 +394,89 @@ class ANN(nemoa.model.morphisms.base.Optimizer):
         min_factor = self._config.get('rprop_min_factor', .000001)
         max_factor = self._config.get('rprop_max_factor', 50.)
 
-        system = self.model.system
-        layers = system._get_mapping()
-
-        # compute gradient from delta rule
-        grad = {'units': {}, 'links': {}}
-        for id, src in enumerate(layers[:-1]):
-            tgt = layers[id + 1]
-            grad['units'][tgt] = \
-                system._units[tgt].get_updates_delta(delta[src, tgt])
-            grad['links'][(src, tgt)] = \
-                nemoa.system.commons.links.Links.get_updates_delta(
-                out[src], delta[src, tgt])
-
-        # get previous gradients and updates
-        prev = self.read('rprop')
-        if not prev:
-            prev = {
-                'gradient': grad,
-                'update': {'units': {}, 'links': {}}}
-            for id, src in enumerate(layers[:-1]):
-                tgt = layers[id + 1]
-                prev['update']['units'][tgt] = \
-                    _get_dict(grad['units'][tgt], init_rate)
-                prev['update']['links'][(src, tgt)] = \
-                    _get_dict(grad['links'][(src, tgt)], init_rate)
-        prev_gradient = prev['gradient']
-        prev_update = prev['update']
-
-        # compute updates
-        update = {'units': {}, 'links': {}}
-        for id, src in enumerate(layers[:-1]):
-            tgt = layers[id + 1]
-
-            # calculate current rates for units
-            update['units'][tgt] = _get_update(
-                prev_gradient['units'][tgt],
-                prev_update['units'][tgt],
-                grad['units'][tgt],
-                accel, min_factor, max_factor)
-
-            # calculate current rates for links
-            update['links'][(src, tgt)] = _get_update(
-                prev_gradient['links'][(src, tgt)],
-                prev_update['links'][(src, tgt)],
-                grad['links'][(src, tgt)],
-                accel, min_factor, max_factor)
-
-        # save updates to store
-        self.write('rprop', gradient = grad, update = update)
-
-        return update
+        # the acceleration factor is a quadratic polynomial in the sign
+        # of the product of the previous and the current gradient
+        coeff = (accel[1], (accel[2] - accel[0]) / 2.,
+            (accel[2] + accel[0]) / 2. - accel[1])
+
+        # the values of sparse parameters are given by their data arrays
+        def _get_values(val):
+            return val.data if Links.issparse(val) else val
+
+        # preallocate state of rprop with the first gradient
+        state = self._buffer.get('rprop', None)
+        if not state:
+            state = {name: {cat: {key: {pkey: val.copy()
+                for pkey, val in params.items()}
+                for key, params in grad[cat].items()}
+                for cat in grad} for name in ['gradient', 'step', 'update']}
+            for cat in grad:
+                for key, params in grad[cat].items():
+                    for pkey in params:
+                        _get_values(state['step'][cat][key][pkey]).fill(
+                            init_rate)
+            self._buffer['rprop'] = state
+
+        # compute updates in place
+        for cat in grad:
+            for key, params in grad[cat].items():
+                for pkey, val in params.items():
+                    val = _get_values(val)
+                    prev = _get_values(state['gradient'][cat][key][pkey])
+                    step = _get_values(state['step'][cat][key][pkey])
+                    update = _get_values(state['update'][cat][key][pkey])
+
+                    # accelerate step sizes by sign of gradient products
+                    numpy.multiply(prev, val, out = prev)
+                    numpy.sign(prev, out = prev)
+                    numpy.multiply(prev, prev, out = update)
+                    update *= coeff[2]
+                    update += coeff[0]
+                    prev *= coeff[1]
+                    update += prev
+                    step *= update
+                    numpy.clip(step, min_factor, max_factor, out = step)
+
+                    # update in direction of gradient
+                    numpy.sign(val, out = update)
+                    update *= step
+                    prev[...] = val
+
+        # the update rule does not modify the state of rprop
+        return self._get_updates_rule(state['update'], scaled = True)
+
+_worker = {}
+
+def _init_bprop_worker(cls, config, sysconfig, shared):
+    """Create optimizer for system parameters in shared memory."""
+    import types
+    from multiprocessing import util
+    params, blocks = shmem.attach(shared)
+    system = nemoa.system.new(config = sysconfig, params = params)
+    optimizer = cls()
+    optimizer._config = config
+    optimizer.model = types.SimpleNamespace(system = system)
+    _worker['blocks'] = blocks
+    _worker['optimizer'] = optimizer
+
+    # release shared memory when the worker process is shut down
+    util.Finalize(None, _release_bprop_worker, exitpriority = 10)
+
+def _release_bprop_worker():
+    """Delete optimizer of worker process and close shared memory."""
+    import gc
+    blocks = _worker.pop('blocks', [])
+    _worker.clear()
+    gc.collect()
+    shmem.release(blocks)
+
+def _get_bprop_shard(sdata, tdata, versions):
+    """Compute parameter gradient for a shard of training data."""
+    optimizer = _worker['optimizer']
+    if _worker.get('versions') != versions:
+        for units in optimizer.model.system._units.values(): units.touch()
+        _worker['versions'] = versions
+    netin = {}
+    values = optimizer._bprop_forward(sdata, netin = netin)
+    deltas = optimizer._bprop_backward(tdata, values, netin = netin)
+    return optimizer._bprop_get_gradient(values, deltas)
@@ -4,17 +4,28 @@ __author__ = 'Patrick Michl'
 __email__ = 'frootlab@gmail.com'
 __license__ = 'GPLv3'
 
+import os
 import time
 import numpy
 import nemoa
 from nemoa.base import entity
 from nemoa.core import ui
+from nemoa.model.commons import checkpoint
+from nemoa.model.commons.prefetch import Prefetcher
+from nemoa.model.commons.tracker import Series, Snapshot, Tracker
 
 class Optimizer:
 
     _config = None
     _buffer = {}
 
+    # buffer entries, which only refer to the running optimization
+    _checkpoint_ignore = ['bprop_pool', 'cdiv_sampling',
+        'checkpoint_epoch', 'checkpoint_prev_time', 'data_random',
+        'eval_prev_time', 'estim_start_time', 'evaluation_algorithm',
+        'key_events', 'key_events_started', 'objective_algorithm',
+        'prefetcher', 'sampler', 'tracker', 'training_data']
+
     def __init__(self, model = None, *args, **kwds):
         """Configure tracker to given nemoa system instance."""
         if model: self._set_model(model)
@@ -40,20 +51,18 @@ class Optimizer:
 
     def _get_algorithms(self, category = None, attribute = None):
         """Get optimization algorithms."""
-        algorithms = self._buffer['algorithms'].get(attribute, None)
-        if not algorithms:
-            algorithms = entity.get_methods(self, key = 'name', val = attribute,
-                groupby = 'category')
-            self._buffer['algorithms'][attribute] = algorithms
-        if category:
-            if category not in algorithms: return {}
-            algorithms = algorithms[category]
-
-        return algorithms
-
-    def _get_algorithm(self, key, *args, **kwds):
+        registry = entity.get_registry(self.__class__, key = 'name',
+            groupby = 'category')
+        if category: return registry.select(self, category, attribute)
+        return registry.groups(self, attribute)
+
+    def _get_algorithm(self, key, category = None, attribute = None):
         """Get algorithm provided by transformation."""
-        return self._get_algorithms(*args, **kwds).get(key, None)
+        if not category:
+            return self._get_algorithms(attribute = attribute).get(key, None)
+        registry = entity.get_registry(self.__class__, key = 'name',
+            groupby = 'category')
+        return registry.get(self, key, category, attribute)
 
     def _get_data(self, key, *args, **kwds):
         """Get data for training or evaluation.
@@ -69,6 +78,8 @@ class Optimizer:
 
         if key == 'training':
             return self._get_data_training(*args, **kwds)
+        if key == 'tracker':
+            return self._get_data_tracker(*args, **kwds)
 
         raise KeyError(f"unknown key '{key}'")
 
@@ -88,7 +99,8 @@ class Optimizer:
         """ """
 
         algorithm = self._get_evaluation_algorithm('name')
-        return self.evaluation.evaluate(algorithm)
+        return self.evaluation.evaluate(algorithm,
+            data = self._get_data_tracker())
 
     def _get_objective_algorithm(self, key = None):
         """ """
@@ -106,7 +118,8 @@ class Optimizer:
         """ """
 
         algorithm = self._get_objective_algorithm('name')
-        return self.evaluation.evaluate(algorithm)
+        return self.evaluation.evaluate(algorithm,
+            data = self._get_data_tracker())
 
     def _get_data_training(self, *args, **kwds):
         """Get training data.
@@ -121,27 +134,131 @@ class Optimizer:
         epoch = self._get_epoch()
         interval = self._config.get('minibatch_update_interval', 1)
 
-        # get training data from dataset
+        # get training data from dataset or from prefetching queue
         if not data or epoch % interval == 0:
-            system = self.model.system
-            dataset = self.model.dataset
-            mapping = system._get_mapping()
-            cols = (mapping[0], mapping[-1])
-            size = self._config.get('minibatch_size', 0)
-            if 'noise_enable' in self._config:
-                ntype = self._config.get('noise_type', None)
-                nfactor = self._config.get('noise_factor', 0.)
-                noise = (ntype, nfactor)
+            depth = self._config.get('prefetch_depth', 0)
+            if depth:
+                prefetcher = self._buffer.get('prefetcher', None)
+                if not prefetcher:
+                    prefetcher = Prefetcher(
+                        self._get_data_minibatch, depth = depth)
+                    self._buffer['prefetcher'] = prefetcher
+                data = prefetcher.get()
             else:
-                noise = (None, 0.)
-
-            data = dataset.get('data', cols = cols,
-                size = size, noise = noise)
+                data = self._get_data_minibatch()
 
             if data: self._buffer['training_data'] = data
 
         return data or None
 
+    def _get_data_minibatch(self):
+        """Get new minibatch of training data from dataset.
+
+        Returns:
+            Tuple of numpy arrays containing a (corrupted) stratified
+            sample of the training data.
+
+        """
+
+        system = self.model.system
+        dataset = self.model.dataset
+        mapping = system._get_mapping()
+        cols = (mapping[0], mapping[-1])
+        size = self._config.get('minibatch_size', 0)
+        if 'noise_enable' in self._config:
+            ntype = self._config.get('noise_type', None)
+            nfactor = self._config.get('noise_factor', 0.)
+            noise = (ntype, nfactor)
+        else:
+            noise = (None, 0.)
+
+        dtype = system._get_dtype()
+
+        random = self._get_data_random()
+
+        # without minibatches the complete dataset is used
+        if not size:
+            return dataset.get('data', cols = cols, noise = noise,
+                dtype = dtype, random = random)
+
+        # the sampler is created once per optimization
+        sampler = self._buffer.get('sampler', None)
+        if not sampler:
+            sampler = dataset.get('sampler', cols = cols, size = size,
+                noise = noise, dtype = dtype, random = random)
+            self._buffer['sampler'] = sampler
+
+        return sampler.get()
+
+    def _get_data_random(self):
+        """Get random number stream for the training data.
+
+        The stream is spawned from the random number stream of the system
+        once per optimization. Thereby the minibatches can be prepared by
+        a worker thread, without sharing a stream with the sampling of
+        the units.
+
+        """
+
+        random = self._buffer.get('data_random', None)
+        if random is None:
+            random = self.model.system._get_random().spawn(1)[0]
+            self._buffer['data_random'] = random
+
+        return random
+
+    def _get_data_tracker(self):
+        """Get data for tracking of objective and evaluation functions.
+
+        With a 'tracker_sample_size' greater than zero, a stratified
+        sample of the given size is drawn once per optimization and
+        cached, such that the costs of tracking do not depend on the
+        size of the dataset.
+
+        Returns:
+            Tuple of numpy arrays containing the tracking data.
+
+        """
+
+        size = self._config.get('tracker_sample_size', 0)
+        if not size: return self.evaluation._get_data()
+
+        data = self._buffer.get('tracker_data', None)
+        if not data:
+            system = self.model.system
+            mapping = system._get_mapping()
+            sampler = self.model.dataset.get('sampler',
+                cols = (mapping[0], mapping[-1]), size = size,
+                dtype = system._get_dtype(),
+                random = system._get_random())
+            data = sampler.get()
+            self._buffer['tracker_data'] = data
+
+        return data
+
+    def _get_tracker_stop(self):
+        """Stop background evaluation of objective function.
+
+        Returns:
+            List of finished evaluations, as returned by Tracker.stop().
+
+        """
+
+        tracker = self._buffer.get('tracker', None)
+        self._buffer['tracker'] = None
+        if not tracker: return []
+
+        return tracker.stop()
+
+    def _get_data_prefetch_stop(self):
+        """Stop prefetching of training data."""
+
+        prefetcher = self._buffer.get('prefetcher', None)
+        if prefetcher: prefetcher.stop()
+        self._buffer['prefetcher'] = None
+
+        return True
+
     def _get_epoch(self):
         """Get current training epoch.
 
@@ -181,6 +298,152 @@ class Optimizer:
         """Get model instance."""
         return self._buffer.get('model', None)
 
+    def _get_rate(self):
+        """Get current update rate.
+
+        Returns:
+            Float containing the update rate of the optimization
+            algorithm or NaN, if the algorithm has no global update rate.
+
+        """
+
+        return float(self._config.get('update_rate', numpy.nan))
+
+    def _get_updates_rule(self, grad, scaled = False):
+        """Get parameter updates from gradient by update rule.
+
+        The update rule is given by the configuration 'update_rule':
+        'sgd' scales the gradient by the update rate. 'momentum' and
+        'nesterov' accumulate the gradient with the factor
+        'update_rule_momentum' and scale the accumulated gradient by the
+        update rate. 'rmsprop' and 'adam' normalize the gradient by the
+        root of its moving average of squares with the decay
+        'update_rule_decay' and scale it by the update rate. 'adam'
+        additionally uses the momentum of the gradient. The state of the
+        update rules and the parameter updates are preallocated with the
+        first gradient and reused by the following calls.
+
+        Args:
+            grad (dict): nested dictionaries with numpy arrays or sparse
+                matrices, which contain the gradient. The arrays are not
+                modified.
+            scaled (bool): If True, the gradient already is scaled by the
+                update rate or by step sizes, like the updates of
+                contrastive divergency or rprop. Default: False
+
+        Returns:
+            Dictionary with parameter updates. The numpy arrays of the
+            updates are reused by the following calls, if the update rule
+            is not 'sgd'.
+
+        """
+
+        rule = (self._config.get('update_rule', None) or 'sgd').lower()
+        if rule not in ['sgd', 'momentum', 'nesterov', 'rmsprop', 'adam']:
+            raise ValueError("could not update parameters: "
+                "unknown update rule '%s'" % rule)
+
+        rate = self._get_rate()
+        if numpy.isnan(rate): rate = 1.
+        if rule == 'sgd' and (scaled or rate == 1.): return grad
+
+        mu = self._config.get('update_rule_momentum', .9)
+        rho = self._config.get('update_rule_decay', .999)
+        eps = self._config.get('update_rule_epsilon', 1e-8)
+
+        # the values of sparse parameters are given by their data arrays
+        def get_values(val):
+            return val.data if hasattr(val, 'tocsr') else val
+
+        def get_updates(obj, path = ()):
+            if isinstance(obj, dict):
+                return {key: get_updates(val, path + (key, ))
+                    for key, val in obj.items()}
+            if not isinstance(get_values(obj), numpy.ndarray): return obj
+            if rule == 'sgd': return rate * obj
+            return get_update(get_values(obj), path, obj)
+
+        if rule == 'sgd': return get_updates(grad)
+
+        # preallocate state of update rule with the first gradient
+        state = self._buffer.get('update_rule', None)
+        if not state:
+            state = {'step': 0, 'update': {}, 'velocity': {}, 'square': {}}
+            self._buffer['update_rule'] = state
+        state['step'] += 1
+        step = state['step']
+
+        def get_update(val, path, obj):
+            # the updates are computed in a separate buffer, such that
+            # the gradient, which may be the state of another algorithm,
+            # is not modified
+            out = state['update'].get(path, None)
+            if out is None: out = state['update'][path] = obj.copy()
+            upd = get_values(out)
+            if scaled: numpy.divide(val, rate, out = upd)
+            else: upd[...] = val
+
+            if rule != 'rmsprop':
+                vel = state['velocity'].get(path, None)
+                if vel is None:
+                    vel = state['velocity'][path] = numpy.zeros_like(upd)
+            if rule in ['rmsprop', 'adam']:
+                sqr = state['square'].get(path, None)
+                if sqr is None:
+                    sqr = state['square'][path] = numpy.zeros_like(upd)
+                sqr *= rho
+                sqr += (1. - rho) * upd * upd
+
+            if rule == 'momentum':
+                vel *= mu
+                vel += upd
+                numpy.multiply(vel, rate, out = upd)
+            elif rule == 'nesterov':
+                vel *= mu
+                vel += upd
+                upd += mu * vel
+                upd *= rate
+            elif rule == 'rmsprop':
+                denom = numpy.sqrt(sqr)
+                denom += eps
+                numpy.divide(upd, denom, out = upd)
+                upd *= rate
+            elif rule == 'adam':
+                vel *= mu
+                vel += (1. - mu) * upd
+                numpy.divide(sqr, 1. - rho ** step, out = upd)
+                numpy.sqrt(upd, out = upd)
+                upd += eps
+                numpy.divide(vel, upd, out = upd)
+                upd *= rate / (1. - mu ** step)
+
+            return out
+
+        return get_updates(grad)
+
+    def _get_checkpoint(self):
+        """Get state of optimization.
+
+        Returns:
+            Dictionary with the configuration of the optimization, the
+            system parameters, the buffered state of the optimization,
+            the states of the random number generator of numpy and of the
+            random number stream of the system and the runtime of the
+            optimization.
+
+        """
+
+        buffer = {key: val for key, val in self._buffer.items()
+            if key not in self._checkpoint_ignore}
+
+        return {
+            'config': self._config,
+            'params': self.model.system._params,
+            'buffer': buffer,
+            'random': {'numpy': numpy.random.get_state(),
+                'system': self.model.system._get_random().get_state()},
+            'runtime': time.time() - self._buffer['estim_start_time'] }
+
     def _get_compatibility(self, model):
         """Test compatibility of transformation with model instance.
 
@@ -213,14 +476,35 @@ class Optimizer:
 
         return self.model.system._config['schedules'].get(key, {})
 
-    def optimize(self, config = None, **kwds):
-        """ """
+    def optimize(self, config = None, resume = None, **kwds):
+        """Optimize model.
+
+        Args:
+            config (dict or str, optional): configuration or name of
+                optimization schedule. Default: None uses the default
+                schedule of the system
+            resume (str, optional): path of a checkpoint, which has been
+                written by the configured 'checkpoint_path'. If given,
+                the optimization is resumed at the epoch of the checkpoint
+                with its system parameters and configuration, which is
+                updated by the keyword arguments. Meta algorithms, which
+                support checkpoints, resume their wrapped optimizations
+                from the checkpoints, that are derived from this path.
+            **kwds: configuration of optimization
+
+        """
 
         if not self._set_config(config, **kwds): return None
         if not self._set_buffer_reset(): return None
 
+        # get configuration of resumed optimization
+        state = None
+        if resume and os.path.exists(resume):
+            state = checkpoint.load(resume)
+        current = {**state['config'], **kwds} if state else self._config
+
         # get name of optimization algorithm
-        name = self._config.get('algorithm', None)
+        name = current.get('algorithm', None)
         if not name:
             raise ValueError("""could not optimize '%s'
                 (%s): no optimization algorithm has been set."""
@@ -233,6 +517,25 @@ class Optimizer:
                 unsupported optimization algorithm '%s'."""
                 % (self.model.name, name)) or None
 
+        # resume optimization before it is started
+        if resume and algorithm.get('type', None) != 'algorithm':
+            if not algorithm.get('resume', False):
+                raise ValueError("""could not resume optimization of '%s':
+                    meta algorithm '%s' does not support checkpoints."""
+                    % (self.model.name, name)) or None
+            self._config['checkpoint_path'] = resume
+            self._config['checkpoint_resume'] = True
+        elif resume:
+            if not state:
+                raise ValueError("""could not resume optimization of '%s':
+                    checkpoint '%s' does not exist."""
+                    % (self.model.name, resume)) or None
+            if not self._set_checkpoint(state, **kwds): return None
+
+            # finished optimizations only restore their parameters
+            if not self._buffer['continue']:
+                return self.model.network.initialize(self.model.system)
+
         # start optimization
         if algorithm.get('type', None) == 'algorithm':
             ui.info("optimize '%s' (%s) using %s."
@@ -248,7 +551,11 @@ class Optimizer:
         transformation = algorithm.get('reference', None)
         if not transformation: return None
 
-        retval = transformation()
+        try:
+            retval = transformation()
+        finally:
+            self._get_data_prefetch_stop()
+            self._get_tracker_stop()
         retval &= self.model.network.initialize(self.model.system)
 
         return retval
@@ -303,6 +610,35 @@ class Optimizer:
 
         return True
 
+    def _set_checkpoint(self, checkpoint, **kwds):
+        """Set state of optimization.
+
+        Args:
+            checkpoint (dict): state of optimization, as returned by
+                _get_checkpoint()
+            **kwds: configuration, which updates the configuration of
+                the checkpoint
+
+        """
+
+        self._config = {**checkpoint['config'], **kwds}
+        self.model.system.set('copy', params = checkpoint['params'])
+        self._buffer.update(checkpoint['buffer'])
+        self._buffer['checkpoint_epoch'] = self._buffer['epoch']
+        random = checkpoint['random']
+        if isinstance(random, dict):
+            numpy.random.set_state(random['numpy'])
+            self.model.system._get_random().set_state(random['system'])
+        else: numpy.random.set_state(random)
+
+        # continue runtime of optimization
+        now = time.time()
+        self._buffer['estim_start_time'] = now - checkpoint['runtime']
+        self._buffer['eval_prev_time'] = now
+        self._buffer['checkpoint_prev_time'] = now
+
+        return True
+
     def _set_buffer(self, key, value = None):
 
         if key == 'reset': return self._set_buffer_reset()
@@ -317,22 +653,36 @@ class Optimizer:
 
         now = time.time()
 
+        # stop prefetching and tracking of previous optimization
+        prefetcher = self._buffer.get('prefetcher', None)
+        if prefetcher: prefetcher.stop()
+        tracker = self._buffer.get('tracker', None)
+        if tracker: tracker.stop()
+
         self._buffer = {
             'epoch': 0,
             'evaluation_data': None,
             'training_data': None,
-            'optimum': {},
+            'prefetcher': None,
+            'sampler': None,
+            'tracker': None,
+            'tracker_data': None,
+            'optimum': Snapshot(),
             'continue': True,
-            'obj_values': None,
+            'obj_values': Series(
+                ('epoch', 'progress', 'value', 'rate', 'time')),
             'obj_opt_value': None,
+            'stop_best_value': None,
+            'stop_wait': 0,
             'key_events': True,
             'key_events_started': False,
             'eval_prev_time': now,
-            'eval_values': None,
+            'eval_values': Series(('epoch', 'progress', 'value', 'time')),
             'estim_started': False,
             'estim_start_time': now,
-            'store': {},
-            'algorithms': {} }
+            'checkpoint_epoch': 0,
+            'checkpoint_prev_time': now,
+            'store': {} }
 
         return True
 
@@ -365,6 +715,8 @@ class Optimizer:
     def update(self):
         """Update epoch and check termination criterions."""
 
+        self._update_checkpoint()
+
         self._buffer['epoch'] += 1
         if self._buffer['epoch'] == self._config['updates']:
             self._buffer['continue'] = False
@@ -377,9 +729,44 @@ class Optimizer:
 
         if not self._buffer['continue']:
             nemoa.set('shell', 'buffmode', 'line')
+            self._update_checkpoint(final = True)
 
         return self._buffer['continue']
 
+    def _update_checkpoint(self, final = False):
+        """Write checkpoint of optimization.
+
+        Checkpoints are written to the configured 'checkpoint_path' every
+        'checkpoint_update_interval' updates or after a time interval of
+        'checkpoint_time_interval' seconds. The checkpoint is written
+        before the epoch is updated, such that it contains the number of
+        finished updates.
+
+        Args:
+            final (bool, optional): if True, the checkpoint of the finished
+                optimization is written regardless of the intervals.
+                Default: False
+
+        """
+
+        path = self._config.get('checkpoint_path', None)
+        if not path: return False
+
+        epoch = self._buffer['epoch']
+        if epoch == self._buffer['checkpoint_epoch']: return False
+
+        now = time.time()
+        interval = self._config.get('checkpoint_update_interval', 0)
+        period = self._config.get('checkpoint_time_interval', 0)
+        due = (interval and epoch % interval == 0) or (period
+            and now - self._buffer['checkpoint_prev_time'] > period)
+        if not final and not due: return False
+
+        self._buffer['checkpoint_epoch'] = epoch
+        self._buffer['checkpoint_prev_time'] = now
+
+        return checkpoint.save(path, self._get_checkpoint())
+
     def _update_keypress(self):
         """Check Keyboard."""
 
@@ -415,14 +802,53 @@ class Optimizer:
                 % self._config['tracker_obj_update_interval'] == 0):
                 return True
 
+        # (optional) evaluate objective function in background thread
+        if self._buffer['continue'] \
+            and self._config.get('tracker_async', False):
+            tracker = self._buffer.get('tracker', None)
+            if not tracker:
+                tracker = Tracker(self.model)
+                self._buffer['tracker'] = tracker
+            for result in tracker.get():
+                self._update_objective_value(*result)
+            if self._buffer['continue'] and not tracker.busy():
+                tracker.put(self._get_progress(),
+                    self._get_objective_algorithm('name'),
+                    self.model.system._params, self._get_data_tracker())
+            return True
+
         # calculate objective function and add value to array
         value = self._get_objective_value()
         progr = self._get_progress()
-        if not isinstance(self._buffer['obj_values'], numpy.ndarray):
-            self._buffer['obj_values'] = numpy.array([[progr, value]])
-        else: self._buffer['obj_values'] = \
-            numpy.vstack((self._buffer['obj_values'], \
-            numpy.array([[progr, value]])))
+        if not self._buffer.get('tracker', None):
+            return self._update_objective_value(progr, value)
+
+        # on last update add pending evaluations before the final value,
+        # which may restore an optimum of the pending evaluations
+        params = self.model.system.get('copy', 'params')
+        for result in self._get_tracker_stop():
+            self._update_objective_value(*result)
+
+        return self._update_objective_value(progr, value, params)
+
+    def _update_objective_value(self, progr, value, params = None):
+        """Add value of objective function and check for new optimum.
+
+        Args:
+            progr (float): optimization progress of the evaluation
+            value (float): value of objective function
+            params (dict, optional): evaluated system parameters.
+                Default: None uses the current parameters
+
+        """
+
+        self._buffer['obj_values'].append(
+            progr * self._config['updates'], progr, value,
+            self._get_rate(),
+            time.time() - self._buffer['estim_start_time'])
+
+        # (optional) stop optimization without further improvement
+        self._update_stopping(value)
 
         # (optional) check for new optimum
         if self._config['tracker_obj_keep_optimum']:
@@ -430,9 +856,8 @@ class Optimizer:
             # init optimum with first value
             if self._buffer['obj_opt_value'] is None:
                 self._buffer['obj_opt_value'] = value
-                self._buffer['optimum'] = \
-                    {'params': self.model.system.get(
-                    'copy', 'params')}
+                self._buffer['optimum'].save(
+                    params or self.model.system._params)
                 return True
 
             # allways check last optimum
@@ -457,13 +882,99 @@ class Optimizer:
 
             if new_optimum:
                 self._buffer['obj_opt_value'] = value
-                self._buffer['optimum'] = { 'params':
-                    self.model.system.get('copy', 'params') }
+                self._buffer['optimum'].save(
+                    params or self.model.system._params)
 
             # set system parameters to optimum on last update
             if not self._buffer['continue']:
+                optimum = self._buffer['optimum']
+                if optimum.restore(self.model.system._params):
+                    for units in self.model.system._units.values():
+                        units.touch()
+                    return True
                 return self.model.system.set('copy',
-                    **self._buffer['optimum'])
+                    params = copy.deepcopy(optimum.params))
+
+        return True
+
+    def _update_stopping(self, value):
+        """Check stopping criterion of objective function.
+
+        The optimization is stopped, if the objective function did not
+        improve by more than a relative amount of 'stop_obj_min_improvement'
+        within the last 'stop_obj_patience' values. A patience of zero
+        disables the criterion. The optimum of the objective function is
+        then restored on the last update, if 'tracker_obj_keep_optimum'
+        is enabled.
+
+        Args:
+            value (float): value of objective function
+
+        """
+
+        patience = self._config.get('stop_obj_patience', 0)
+        if not patience or not self._buffer['continue']: return False
+
+        best = self._buffer['stop_best_value']
+        if best is None:
+            self._buffer['stop_best_value'] = value
+            return False
+
+        threshold = self._config.get('stop_obj_min_improvement', 0.) \
+            * abs(best)
+        if self._get_objective_algorithm('optimum') == 'min':
+            improved = value < best - threshold
+        else: improved = value > best + threshold
+
+        if improved:
+            self._buffer['stop_best_value'] = value
+            self._buffer['stop_wait'] = 0
+            return False
+
+        self._buffer['stop_wait'] += 1
+        if self._buffer['stop_wait'] < patience: return False
+
+        ui.info('stopping optimization: no improvement of objective '
+            'function within %i evaluations.' % patience)
+        self._buffer['continue'] = False
+
+        return True
+
+    def _update_gradient_norm(self, grad, rate = 1.):
+        """Check stopping criterion of gradient norm.
+
+        The optimization is stopped, if the euclidean norm of the
+        gradient falls below 'stop_grad_min_norm'. A minimum norm of zero
+        disables the criterion. The norm is computed from the unscaled
+        gradient, such that the criterion does not depend on the update
+        rate of the algorithm.
+
+        Args:
+            grad: nested dictionaries or lists with numpy arrays or sparse
+                matrices, containing the gradient or the parameter updates
+            rate (float): update rate, by which the parameter updates
+                have been scaled. Default: 1.
+
+        """
+
+        floor = self._config.get('stop_grad_min_norm', 0.)
+        if not floor or not self._buffer['continue']: return False
+
+        def squares(obj):
+            if isinstance(obj, dict): obj = list(obj.values())
+            if isinstance(obj, (list, tuple)):
+                return sum(squares(val) for val in obj)
+            if hasattr(obj, 'tocsr'): obj = obj.data
+            if isinstance(obj, numpy.ndarray):
+                return float(numpy.vdot(obj, obj))
+            return 0.
+
+        norm = numpy.sqrt(squares(grad)) / abs(rate)
+        if norm >= floor: return False
+
+        ui.info('stopping optimization: gradient norm %.3g is below '
+            '%.3g.' % (norm, floor))
+        self._buffer['continue'] = False
 
         return True
 
@@ -488,15 +999,9 @@ class Optimizer:
             # update time of last evaluation
             self._buffer['eval_prev_time'] = now
 
-            # add evaluation to array
-            if not isinstance(self._buffer['eval_values'],
-                numpy.ndarray):
-                self._buffer['eval_values'] = \
-                    numpy.array([[progress, value]])
-            else:
-                self._buffer['eval_values'] = \
-                    numpy.vstack((self._buffer['eval_values'], \
-                    numpy.array([[progress, value]])))
+            # add evaluation to time series
+            self._buffer['eval_values'].append(self._buffer['epoch'],
+                progress, value, now - self._buffer['estim_start_time'])
 
             return ui.info('finished %.1f%%: %s = %s' % (
                 progress * 100., func['name'], func['formater'](value)))
@@ -10,6 +10,7 @@ __author__ = 'Patrick Michl'
 __email__ = 'frootlab@gmail.com'
 __license__ = 'GPLv3'
 
+import os
 import nemoa.model.morphisms.ann
 
 from nemoa.core import ui
@@ -33,6 +34,7 @@ class DBN(nemoa.model.morphisms.ann.ANN):
         longname = 'deep belief network optimization',
         category = 'optimization',
         type     = 'metaalgorithm',
+        resume   = True,
         syscheck = lambda net: net._is_compatible_dbn()
     )
     def _dbn(self):
@@ -40,10 +42,11 @@ class DBN(nemoa.model.morphisms.ann.ANN):
 
         retval = True
 
+        checkpoint = self._get_checkpoint_config()
         if retval and self._config['pretraining']:
-            retval &= self.optimize(algorithm = 'pretraining')
+            retval &= self.optimize(algorithm = 'pretraining', **checkpoint)
         if retval and self._config['finetuning']:
-            retval &= self.optimize(algorithm = 'finetuning')
+            retval &= self.optimize(algorithm = 'finetuning', **checkpoint)
 
         return retval
 
@@ -52,6 +55,7 @@ class DBN(nemoa.model.morphisms.ann.ANN):
         longname = 'deep belief network pretraining',
         category = 'optimization',
         type     = 'metaalgorithm',
+        resume   = True,
         syscheck = None)
 
     def _dbn_pretraining(self):
@@ -103,6 +107,9 @@ class DBN(nemoa.model.morphisms.ann.ANN):
             # create subsystem
             subsystem = nemoa.system.new(config = {
                 'name': name, 'type': systype,
+                'params': {
+                    'sparse': system._get_sparse(),
+                    'dtype': system._get_dtype().name },
                 'init': { 'ignore_units': ['visible'] if lid else [] }})
 
             # create subnetwork and configure subsystem with network
@@ -147,11 +154,14 @@ class DBN(nemoa.model.morphisms.ann.ANN):
             # optimize model
             schedule = self._get_schedule(self._config.get(
                 'schedule_%s' % systype.lower(), 'default'))
+            checkpoint = self._get_checkpoint_config('layer%i' % lid)
+            resume = self._get_checkpoint_resume(checkpoint)
 
             if systype in schedule:
-                model.optimize(schedule[systype])
+                model.optimize(schedule[systype], resume = resume,
+                    **checkpoint)
             else:
-                model.optimize()
+                model.optimize(resume = resume, **checkpoint)
 
             if not lid: rbmparams['units'].append(
                 model.system.get('layer', 'visible'))
@@ -215,6 +225,9 @@ class DBN(nemoa.model.morphisms.ann.ANN):
         system._remove_units(mapping[0], outputs)
         system._remove_units(mapping[-1], inputs)
 
+        # restore storage format of transposed link parameters
+        system._set_params_sparse()
+
         return True
 
     @meta.custom(
@@ -222,6 +235,7 @@ class DBN(nemoa.model.morphisms.ann.ANN):
         longname = 'deep belief network finetuning',
         category = 'optimization',
         type     = 'metaalgorithm',
+        resume   = True,
         syscheck = None)
 
     def _dbn_finetuning(self):
@@ -244,4 +258,52 @@ class DBN(nemoa.model.morphisms.ann.ANN):
             raise Warning("""could not finetune model:
                 recursion detected.""")
 
-        return self.optimize(config = config)
+        checkpoint = self._get_checkpoint_config()
+
+        return self.optimize(config = config,
+            resume = self._get_checkpoint_resume(checkpoint), **checkpoint)
+
+    def _get_checkpoint_config(self, suffix = None):
+        """Get checkpoint configuration for wrapped optimizations.
+
+        Args:
+            suffix (str, optional): suffix, which is inserted before the
+                file extension of the checkpoint path, such that wrapped
+                optimizations do not overwrite each other's checkpoints.
+                Default: None keeps the checkpoint path
+
+        Returns:
+            Dictionary with the checkpoint keys of the configuration.
+
+        """
+
+        config = {key: val for key, val in self._config.items()
+            if key.startswith('checkpoint_')}
+        path = config.get('checkpoint_path', None)
+        if path and suffix:
+            root, ext = os.path.splitext(str(path))
+            config['checkpoint_path'] = '%s.%s%s' % (root, suffix, ext)
+
+        return config
+
+    def _get_checkpoint_resume(self, config):
+        """Get checkpoint, which is resumed by a wrapped optimization.
+
+        Args:
+            config (dict): checkpoint configuration of the wrapped
+                optimization, as returned by _get_checkpoint_config()
+
+        Returns:
+            Checkpoint path of the wrapped optimization, if the resumption
+            of the optimization has been requested and the checkpoint
+            exists, else None. Wrapped optimizations, which have been
+            finished, thereby only restore their parameters, such that
+            they are skipped.
+
+        """
+
+        if not self._config.get('checkpoint_resume', False): return None
+        path = config.get('checkpoint_path', None)
+        if not path or not os.path.exists(path): return None
+
+        return path
@@ -10,7 +10,8 @@ import numpy
 import nemoa.model.morphisms.ann
 
 from nemoa.core import ui
-from nemoa.math import meta
+from nemoa.math import curve, meta
+from nemoa.system.commons.links import Links
 
 class RBM(nemoa.model.morphisms.ann.ANN):
     """Restricted Boltzmann Machine (RBM) Optimizer.
@@ -32,16 +33,25 @@ class RBM(nemoa.model.morphisms.ann.ANN):
         'updates': 100000,
         'minibatch_size': 100,
         'minibatch_update_interval': 10,
+        'prefetch_depth': 2,
         'con_module': '',
         'denoising': '',
         'acc_module': 'vmra',
         'gen_module': 'rasa',
         'update_cd_sampling_steps': 1,
         'update_cd_sampling_iterations': 1,
+        'update_pcd_particles': 100,
+        'update_pt_replicas': 10,
+        'update_pt_particles': 100,
+        'update_pt_min_beta': 0.1,
         'update_rate': 0.1,
         'update_factor_weights': 1.,
         'update_factor_hbias': 0.1,
         'update_factor_vbias': 0.1,
+        'update_rule': 'sgd',
+        'update_rule_momentum': .9,
+        'update_rule_decay': .999,
+        'update_rule_epsilon': 1e-8,
         'gen_rasa_enable': False,
         'gen_rasa_init_temperature': 0.1,
         'gen_rasa_min_temperature': 0.01,
@@ -71,6 +81,14 @@ class RBM(nemoa.model.morphisms.ann.ANN):
         'tracker_eval_enable': True,
         'tracker_eval_function': 'accuracy',
         'tracker_eval_time_interval': 10.,
+        'tracker_sample_size': 0,
+        'tracker_async': False,
+        'checkpoint_path': None,
+        'checkpoint_update_interval': 0,
+        'checkpoint_time_interval': 0.,
+        'stop_obj_patience': 0,
+        'stop_obj_min_improvement': 0.,
+        'stop_grad_min_norm': 0.,
         'ignore_units': [] }
 
     @meta.custom(
@@ -136,8 +154,9 @@ class RBM(nemoa.model.morphisms.ann.ANN):
             if found:
                 ui.info('using generalization: %s' % (about))
 
-        # init rasa
-        self.write('sa', init_rate=config['update_rate'])
+        # init rasa (keep state of resumed optimization)
+        if not self.read('sa'):
+            self.write('sa', init_rate=config['update_rate'])
 
         while self.update():
             # get training data (sample from stratified minibatches)
@@ -147,6 +166,60 @@ class RBM(nemoa.model.morphisms.ann.ANN):
 
         return True
 
+    @meta.custom(
+        name     = 'pcd',
+        longname = 'persistent contrastive divergency',
+        category = 'optimization',
+        type     = 'algorithm',
+        syscheck = None)
+
+    def _pcd(self):
+        """Persistent Contrastive Divergency parameter optimization.
+
+        Persistent Contrastive Divergency (1) differs from Contrastive
+        Divergency in the negative phase: Instead of restarting the
+        Gibbs chains from the data in each update, a pool of fantasy
+        particles is kept in the buffer and continued over all
+        updates. The number of particles is given by the configuration
+        parameter 'update_pcd_particles'.
+
+        Reference:
+            (1) "Training Restricted Boltzmann Machines using
+                Approximations to the Likelihood Gradient", Tijmen
+                Tieleman, ICML 2008
+
+        """
+
+        return self._cdiv()
+
+    @meta.custom(
+        name     = 'pt',
+        longname = 'parallel tempering',
+        category = 'optimization',
+        type     = 'algorithm',
+        syscheck = None)
+
+    def _ptmp(self):
+        """Parallel Tempering parameter optimization.
+
+        Parallel Tempering (1) samples the negative phase from persistent
+        Gibbs chains, which are run in parallel at different temperatures.
+        Neighbouring replicas exchange their states with the Metropolis
+        acceptance probability, such that the chains at high temperatures
+        allow the chains at low temperatures to escape local modes. The
+        number of replicas and their minimal inverse temperature are given
+        by the configuration parameters 'update_pt_replicas' and
+        'update_pt_min_beta'.
+
+        Reference:
+            (1) "Parallel Tempering for Training of Restricted Boltzmann
+                Machines", Guillaume Desjardins, Aaron Courville, Yoshua
+                Bengio, Pascal Vincent and Olivier Delalleau, AISTATS 2010
+
+        """
+
+        return self._cdiv()
+
     def _cdiv_update(self, data):
         """Update system parameters."""
 
@@ -165,11 +238,31 @@ class RBM(nemoa.model.morphisms.ann.ANN):
                 self._cdiv_update_rate_vmra()
 
         # get updates of system parameters
-        sampling = self._cdiv_sampling(data)
+        if config['algorithm'] == 'pcd':
+            sampling = self._pcd_sampling(data)
+        elif config['algorithm'] == 'pt':
+            sampling = self._ptmp_sampling(data)
+        else:
+            sampling = self._cdiv_sampling(data)
         if updatev: deltav = self._cdiv_delta_visible(sampling)
         if updateh: deltah = self._cdiv_delta_hidden(sampling)
         if updatel: deltal = self._cdiv_delta_links(sampling)
 
+        # (optional) stop optimization on small gradient, where the
+        # parameter updates are scaled by the update rate
+        self._update_gradient_norm([deltav if updatev else None,
+            deltah if updateh else None, deltal if updatel else None],
+            rate = config['update_rate'])
+
+        # (optional) apply update rule to the scaled parameter updates
+        updates = self._get_updates_rule({
+            'visible': deltav if updatev else {},
+            'hidden': deltah if updateh else {},
+            'links': deltal if updatel else {}}, scaled = True)
+        deltav = updates['visible']
+        deltah = updates['hidden']
+        deltal = updates['links']
+
         # update system parameters
         if updatev: system._units['visible'].update(deltav)
         if updateh: system._units['hidden'].update(deltah)
@@ -184,7 +277,9 @@ class RBM(nemoa.model.morphisms.ann.ANN):
         config = self._config
 
         store = self.read('vmra') or {}
-        var = numpy.var(system._params['links'][(0, 1)]['W'])
+        w = system._params['links'][(0, 1)]['W']
+        if Links.issparse(w): var = w.power(2).mean() - w.mean() ** 2
+        else: var = numpy.var(w)
         if 'wvar' not in store: wvar = numpy.array([var])
         else: wvar = numpy.append([var], store['wvar'])
 
@@ -229,16 +324,26 @@ class RBM(nemoa.model.morphisms.ann.ANN):
         k = config['update_cd_sampling_steps']
         m = config['update_cd_sampling_iterations']
 
-        hdata = system._get_unitexpect(data, ('visible', 'hidden'))
+        # the arrays of the sampling are reused by subsequent updates
+        # with minibatches of equal shape and dtype
+        key = (data.shape, data.dtype.str)
+        store = self._buffer.get('cdiv_sampling') or {}
+        if store.get('key') != key: store = {}
+
+        hdata = system._get_unitexpect(data, ('visible', 'hidden'),
+            out = store.get('hdata'))
         if k == 1 and m == 1:
             vmodel = system._get_unitsamples(hdata,
-                ('hidden', 'visible'), expect_last = True)
+                ('hidden', 'visible'), expect_last = True,
+                out = store.get('vmodel'))
             hmodel = system._get_unitexpect(vmodel,
-                ('visible', 'hidden'))
+                ('visible', 'hidden'), out = store.get('hmodel'))
+            self._buffer['cdiv_sampling'] = {'key': key, 'hdata': hdata,
+                'vmodel': vmodel, 'hmodel': hmodel}
             return data, hdata, vmodel, hmodel
 
-        vmodel = numpy.zeros(shape = data.shape)
-        hmodel = numpy.zeros(shape = hdata.shape)
+        vmodel = numpy.zeros(shape = data.shape, dtype = data.dtype)
+        hmodel = numpy.zeros(shape = hdata.shape, dtype = hdata.dtype)
         for i in range(m):
             for j in range(k):
 
@@ -270,6 +375,201 @@ class RBM(nemoa.model.morphisms.ann.ANN):
 
         return data, hdata, vmodel, hmodel
 
+    def _pcd_sampling(self, data):
+        """Persistent contrastive divergency sampling.
+
+        Args:
+            data: numpy array containing input data of visible units
+            (k steps)
+
+        Returns:
+            tuple (vData, hData, vModel, hModel)
+            containing numpy arrays:
+                vdata: input data of visible units
+                hdata: expected values of hidden units for vData
+                vmodel: expected values of visible units after $k$
+                    sampling steps of the persistent fantasy particles
+                hmodel: expected values of hidden units for vmodel
+
+        """
+
+        system = self.model.system
+        config = self._config
+
+        k = config['update_cd_sampling_steps']
+        if k < 1: raise ValueError("could not sample fantasy particles: "
+            "at least one sampling step is required")
+
+        # initialize fantasy particles with samples from the data
+        store = self.read('pcd') or {}
+        vchain = store.get('particles', None)
+        if vchain is None:
+            size = config['update_pcd_particles'] or data.shape[0]
+            rows = system._get_random().randint(
+                data.shape[0], size = size)
+            vchain = data[rows]
+
+        # continue gibbs chains of fantasy particles
+        for j in range(k):
+            hsample = system._get_unitsamples(vchain,
+                ('visible', 'hidden'))
+            vmodel = system._get_unitexpect(hsample,
+                ('hidden', 'visible'))
+            vchain = system._get_unitsamples(vmodel, ('visible', ))
+        self.write('pcd', particles = vchain)
+
+        hdata = system._get_unitexpect(data, ('visible', 'hidden'))
+        hmodel = system._get_unitexpect(vmodel, ('visible', 'hidden'))
+
+        return data, hdata, vmodel, hmodel
+
+    def _ptmp_sampling(self, data):
+        """Parallel tempering sampling.
+
+        The replicas are stored as a single numpy array of shape (replicas,
+        particles, visible units), such that the Gibbs steps and the swap
+        proposals of all replicas are calculated at once.
+
+        Args:
+            data: numpy array containing input data of visible units
+            (k steps)
+
+        Returns:
+            tuple (vData, hData, vModel, hModel)
+            containing numpy arrays:
+                vdata: input data of visible units
+                hdata: expected values of hidden units for vData
+                vmodel: expected values of visible units after $k$
+                    sampling steps of the replica at unit temperature
+                hmodel: expected values of hidden units for vmodel
+
+        """
+
+        system = self.model.system
+        config = self._config
+
+        k = config['update_cd_sampling_steps']
+        if k < 1: raise ValueError("could not sample replicas: "
+            "at least one sampling step is required")
+
+        # initialize replicas with samples from the data
+        store = self.read('pt') or {}
+        vchain = store.get('replicas', None)
+        if vchain is None:
+            m = config['update_pt_replicas']
+            size = config['update_pt_particles'] or data.shape[0]
+            rows = system._get_random().randint(
+                data.shape[0], size = (m, size))
+            vchain = data[rows]
+
+        # inverse temperatures of replicas, shaped for broadcasting
+        m = vchain.shape[0]
+        beta = numpy.linspace(1., config['update_pt_min_beta'], m)
+        beta = beta.reshape((m, 1, 1)).astype(vchain.dtype)
+
+        # continue gibbs chains of all replicas
+        for j in range(k):
+            hchain = self._ptmp_sample_hidden(vchain, beta)
+            vexpect = self._ptmp_expect_visible(hchain, beta)
+            vchain = self._ptmp_sample_visible(vexpect, beta)
+
+        # exchange joint states of neighbouring replicas
+        if m > 1: vchain, hchain = self._ptmp_swap(vchain, hchain, beta)
+        self.write('pt', replicas = vchain)
+
+        # the expected values of the model are calculated from the state of
+        # the replica at unit temperature, which may have been swapped
+        vmodel = self._ptmp_expect_visible(hchain[0], beta[0])
+        hdata = system._get_unitexpect(data, ('visible', 'hidden'))
+        hmodel = system._get_unitexpect(vmodel, ('visible', 'hidden'))
+
+        return data, hdata, vmodel, hmodel
+
+    def _ptmp_swap(self, vchain, hchain, beta):
+        """Swap joint states of neighbouring replicas.
+
+        Swaps are proposed alternating between even and odd pairs of
+        neighbouring replicas in subsequent updates and accepted by the
+        Metropolis criterion.
+
+        Args:
+            vchain: numpy array of shape (replicas, particles, visible
+                units) containing the states of the visible units
+            hchain: numpy array of shape (replicas, particles, hidden
+                units) containing the states of the hidden units
+            beta: numpy array of shape (replicas, 1, 1) containing the
+                inverse temperatures of the replicas
+
+        Returns:
+            tuple (vchain, hchain) containing the swapped states.
+
+        """
+
+        system = self.model.system
+        m = vchain.shape[0]
+
+        energy = self._ptmp_energy(vchain, hchain)
+        lower = numpy.arange(self._get_epoch() % 2, m - 1, 2)
+        upper = lower + 1
+        loga = (beta[lower, :, 0] - beta[upper, :, 0]) \
+            * (energy[lower] - energy[upper])
+        rand = system._get_random().rand(*loga.shape)
+        swap = (numpy.log(rand) < loga)[:, :, numpy.newaxis]
+        for chain in [vchain, hchain]:
+            clower, cupper = chain[lower], chain[upper]
+            chain[lower] = numpy.where(swap, cupper, clower)
+            chain[upper] = numpy.where(swap, clower, cupper)
+
+        return vchain, hchain
+
+    def _ptmp_sample_hidden(self, vdata, beta):
+        """Sample hidden units of replicas at given inverse temperatures."""
+
+        system = self.model.system
+        w = system._params['links'][(0, 1)]['W']
+        b = system._units['hidden'].params['bias']
+        logistic = curve.get_function('logistic')
+        hexpect = logistic(beta * (b + Links.dot(vdata, w)))
+
+        rand = system._get_random().rand(*hexpect.shape)
+
+        return (hexpect > rand).astype(hexpect.dtype)
+
+    def _ptmp_expect_visible(self, hdata, beta):
+        """Expected values of visible units of replicas."""
+
+        system = self.model.system
+        w = system._units['visible'].weights(system._units['hidden'].params)
+        b = system._units['visible'].params['bias']
+        logistic = curve.get_function('logistic')
+
+        return logistic(beta * (b + Links.dot(hdata, w)))
+
+    def _ptmp_sample_visible(self, vexpect, beta):
+        """Sample visible units of replicas from expected values."""
+
+        system = self.model.system
+        rand = system._get_random().rand(*vexpect.shape)
+
+        return (vexpect > rand).astype(vexpect.dtype)
+
+    def _ptmp_energy(self, vdata, hdata):
+        """Energies of replica states.
+
+        Returns:
+            Numpy array of shape (replicas, particles) containing the
+            energies of the joint states of visible and hidden units.
+
+        """
+
+        system = self.model.system
+        w = system._params['links'][(0, 1)]['W']
+        evis = system._units['visible'].energy(vdata).sum(axis = 2)
+        ehid = system._units['hidden'].energy(hdata).sum(axis = 2)
+        elnk = - numpy.sum(Links.dot(vdata, w) * hdata, axis = 2)
+
+        return evis + ehid + elnk
+
     def _cdiv_delta_visible(self, sampling):
         """ """
 
@@ -277,7 +577,7 @@ class RBM(nemoa.model.morphisms.ann.ANN):
         config = self._config
 
         deltas = []
-        if config['algorithm'] == 'cd':
+        if config['algorithm'] in ['cd', 'pcd', 'pt']:
             deltas.append(self._cdiv_delta_visible_cd(*sampling))
         if config['con_klpt_enable']:
             deltas.append(self._cdiv_delta_visible_klpt(*sampling))
@@ -301,7 +601,8 @@ class RBM(nemoa.model.morphisms.ann.ANN):
 
         r = config['update_rate'] * config['update_factor_vbias']
         v = len(system._units['visible'].params['id'])
-        d = numpy.mean(vdata - vmodel, axis = 0).reshape((1, v))
+        d = (numpy.mean(vdata, axis = 0)
+            - numpy.mean(vmodel, axis = 0)).reshape((1, v))
 
         return { 'bias': r * d }
 
@@ -324,7 +625,7 @@ class RBM(nemoa.model.morphisms.ann.ANN):
             * config['update_factor_vbias']
 
         shape = (1, len(system._units['visible'].params['id']))
-        vb = numpy.random.normal(0., 1., shape)
+        vb = system._get_random().normal(0., 1., shape)
 
         return { 'bias': r * t * vb }
 
@@ -335,7 +636,7 @@ class RBM(nemoa.model.morphisms.ann.ANN):
         config = self._config
 
         deltas = []
-        if config['algorithm'] == 'cd':
+        if config['algorithm'] in ['cd', 'pcd', 'pt']:
             deltas.append(self._cdiv_delta_hidden_cd(*sampling))
         if config['con_klpt_enable']:
             deltas.append(self._cdiv_delta_hidden_klpt(*sampling))
@@ -360,7 +661,8 @@ class RBM(nemoa.model.morphisms.ann.ANN):
 
         r = config['update_rate'] * config['update_factor_hbias']
         h = len(system._units['hidden'].params['id'])
-        d = numpy.mean(hdata - hmodel, axis = 0).reshape((1, h))
+        d = (numpy.mean(hdata, axis = 0)
+            - numpy.mean(hmodel, axis = 0)).reshape((1, h))
 
         return { 'bias': r * d }
 
@@ -403,7 +705,7 @@ class RBM(nemoa.model.morphisms.ann.ANN):
             * config['update_factor_hbias']
 
         shape = (1, len(system._units['hidden'].params['id']))
-        hb = numpy.random.normal(0., 1., shape)
+        hb = system._get_random().normal(0., 1., shape)
 
         return { 'bias': r * t * hb }
 
@@ -414,7 +716,7 @@ class RBM(nemoa.model.morphisms.ann.ANN):
         config = self._config
 
         deltas = []
-        if config['algorithm'] == 'cd':
+        if config['algorithm'] in ['cd', 'pcd', 'pt']:
             deltas.append(self._cdiv_delta_links_cd(*sampling))
         if config['con_klpt_enable']:
             deltas.append(self._cdiv_delta_links_klpt(*sampling))
@@ -437,10 +739,15 @@ class RBM(nemoa.model.morphisms.ann.ANN):
         config = self._config
 
         r = config['update_rate'] * config['update_factor_weights']
-        d = numpy.dot(vdata.T, hdata) / float(vdata.size)
-        m = numpy.dot(vmodel.T, hmodel) / float(vdata.size)
+        w = system._params['links'][(0, 1)]['W']
 
-        return { 'W': r * (d - m) }
+        # difference of data and model term as a single product, which is
+        # restricted to the links for sparse weights
+        v = numpy.concatenate([vdata / float(vdata.size),
+            - vmodel / float(vmodel.size)])
+        h = numpy.concatenate([hdata, hmodel])
+
+        return { 'W': r * Links.outer(v, h, w) }
 
     def _cdiv_delta_links_klpt(self, vdata, hdata, vmodel,
         hmodel, **kwds):
@@ -462,7 +769,7 @@ class RBM(nemoa.model.morphisms.ann.ANN):
             * config['update_factor_weights']
 
         shape = system._params['links'][(0, 1)]['W'].shape
-        weights = numpy.random.normal(0., 1., shape)
+        weights = system._get_random().normal(0., 1., shape)
 
         return { 'W': r * t * weights }
 
@@ -489,8 +796,10 @@ class RBM(nemoa.model.morphisms.ann.ANN):
         system = self.model.system
         links = system._params['links'][(0, 1)]
 
-        if 'W' in updates: links['W'] += updates['W']
+        if 'W' in updates: Links.add(links['W'], updates['W'])
         if 'A' in updates: links['A'] = updates['A']
+        system._units['visible'].touch()
+        system._units['hidden'].touch()
 
         return True
 
@@ -518,10 +827,19 @@ class GRBM(RBM):
         'update_factor_hbias': 0.1,
         'update_factor_vbias': 0.1,
         'update_factor_vlvar': 0.01,
+        'update_rule': 'sgd',
+        'update_rule_momentum': .9,
+        'update_rule_decay': .999,
+        'update_rule_epsilon': 1e-8,
         'update_cd_sampling_steps': 1,
         'update_cd_sampling_iterations': 1,
+        'update_pcd_particles': 100,
+        'update_pt_replicas': 10,
+        'update_pt_particles': 100,
+        'update_pt_min_beta': 0.1,
         'minibatch_size': 100,
         'minibatch_update_interval': 1,
+        'prefetch_depth': 2,
         'con_module': '',
         'denoising': 'noise',
         'acc_module': 'vmra',
@@ -552,6 +870,14 @@ class GRBM(RBM):
         'tracker_eval_enable': True,
         'tracker_eval_function': 'accuracy',
         'tracker_eval_time_interval': 10.,
+        'tracker_sample_size': 0,
+        'tracker_async': False,
+        'checkpoint_path': None,
+        'checkpoint_update_interval': 0,
+        'checkpoint_time_interval': 0.,
+        'stop_obj_patience': 0,
+        'stop_obj_min_improvement': 0.,
+        'stop_grad_min_norm': 0.,
         'ignore_units': [] }
 
     def _cdiv_delta_visible_cd(self, vdata, hdata, vmodel,
@@ -568,14 +894,15 @@ class GRBM(RBM):
         config = self._config
 
         v = len(system._units['visible'].params['id'])
-        w = system._params['links'][(0, 1)]['W']
-        var = numpy.exp(system._units['visible'].params['lvar'])
+        w = system._units['visible'].weights(system._units['hidden'].params)
+        var = system._units['visible'].var()
         b = system._units['visible'].params['bias']
         d = numpy.mean(0.5 * (vdata - b) ** 2 \
-            - vdata * numpy.dot(hdata, w.T), axis = 0).reshape((1, v))
+            - vdata * Links.dot(hdata, w), axis = 0).reshape((1, v))
         m = numpy.mean(0.5 * (vmodel - b) ** 2 \
-            - vmodel * numpy.dot(hmodel, w.T), axis = 0).reshape((1, v))
-        diff = numpy.mean(vdata - vmodel, axis = 0).reshape((1, v))
+            - vmodel * Links.dot(hmodel, w), axis = 0).reshape((1, v))
+        diff = (numpy.mean(vdata, axis = 0)
+            - numpy.mean(vmodel, axis = 0)).reshape((1, v))
 
         r = config['update_rate']
         rb = r * config['update_factor_vbias']
@@ -598,10 +925,69 @@ class GRBM(RBM):
         system = self.model.system
         config = self._config
 
-        var = numpy.exp(system._units['visible'].params['lvar']).T
+        var = system._units['visible'].var()
         r = config['update_rate'] * config['update_factor_weights']
-        d = numpy.dot(vdata.T, hdata)
-        m = numpy.dot(vmodel.T, hmodel)
-        s = float(vdata.size)
+        w = system._params['links'][(0, 1)]['W']
+
+        # difference of data and model term as a single product, which is
+        # restricted to the links for sparse weights
+        v = numpy.concatenate([vdata / float(vdata.size),
+            - vmodel / float(vmodel.size)]) / var
+        h = numpy.concatenate([hdata, hmodel])
+
+        return { 'W': r * Links.outer(v, h, w) }
+
+    def _ptmp_sample_hidden(self, vdata, beta):
+        """Sample hidden units of replicas at given inverse temperatures."""
+
+        system = self.model.system
+        w = system._params['links'][(0, 1)]['W']
+        b = system._units['hidden'].params['bias']
+        sdev = system._units['visible'].sdev()
+        logistic = curve.get_function('logistic')
+        hexpect = logistic(beta * (b + Links.dot(vdata / sdev, w)))
+
+        rand = system._get_random().rand(*hexpect.shape)
+
+        return (hexpect > rand).astype(hexpect.dtype)
+
+    def _ptmp_expect_visible(self, hdata, beta):
+        """Expected values of visible units of replicas.
+
+        The expected values of gaussian units do not depend on the
+        temperature, which only scales their variance.
+
+        """
+
+        system = self.model.system
+        w = system._units['visible'].weights(system._units['hidden'].params)
+        b = system._units['visible'].params['bias']
+
+        return b + Links.dot(hdata, w)
+
+    def _ptmp_sample_visible(self, vexpect, beta):
+        """Sample visible units of replicas from expected values."""
+
+        system = self.model.system
+        sdev = system._units['visible'].sdev()
+
+        return system._get_random().normal(
+            vexpect, sdev / numpy.sqrt(beta)).astype(vexpect.dtype)
+
+    def _ptmp_energy(self, vdata, hdata):
+        """Energies of replica states.
+
+        Returns:
+            Numpy array of shape (replicas, particles) containing the
+            energies of the joint states of visible and hidden units.
+
+        """
+
+        system = self.model.system
+        w = system._params['links'][(0, 1)]['W']
+        sdev = system._units['visible'].sdev()
+        evis = system._units['visible'].energy(vdata).sum(axis = 2)
+        ehid = system._units['hidden'].energy(hdata).sum(axis = 2)
+        elnk = - numpy.sum(Links.dot(vdata / sdev, w) * hdata, axis = 2)
 
-        return { 'W': r * (d - m) / s / var }
+        return evis + ehid + elnk
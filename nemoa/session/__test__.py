@@ -4,12 +4,50 @@ __author__ = 'Patrick Michl'
 __email__ = 'frootlab@gmail.com'
 __license__ = 'GPLv3'
 
+import os
+import subprocess
+import sys
 import nemoa
 
 from nemoa.test import BaseTestCase
 
 class TestCase(BaseTestCase):
 
+    def test_session_import(self):
+        # 'import nemoa' imports its subpackages with the first access, such
+        # that the import time is measured in a new interpreter by using the
+        # option '-X importtime', which reports the cumulated import times in
+        # microseconds
+        budget = 100000
+        root = os.path.dirname(os.path.dirname(nemoa.__file__))
+        env = dict(os.environ, PYTHONPATH = root)
+        code = "import sys, nemoa; print(*sorted(sys.modules))"
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+            code], env = env, capture_output = True, text = True)
+        modules = proc.stdout.split()
+        times = {}
+        for line in proc.stderr.splitlines():
+            if not line.startswith('import time:'): continue
+            fields = line[12:].split('|')
+            if not fields[1].strip().isdigit(): continue
+            times[fields[2].strip()] = int(fields[1])
+
+        with self.subTest(cmd = "import nemoa"):
+            self.assertEqual(proc.returncode, 0)
+            self.assertIn('nemoa', times)
+            self.assertLess(times['nemoa'], budget)
+
+        with self.subTest(cmd = "nemoa subpackages"):
+            test = [name for name in modules \
+                if name.startswith('nemoa.') or name == 'numpy']
+            self.assertEqual(test, [])
+
+        with self.subTest(cmd = "nemoa.system"):
+            test = nemoa.system.__name__ == 'nemoa.system'
+            self.assertTrue(test)
+            with self.assertRaises(AttributeError):
+                getattr(nemoa, 'nonexistent')
+
     def test_session_about(self):
 
         with self.subTest(cmd="nemoa.about()"):
@@ -266,8 +266,10 @@ class ANN(nemoa.system.classes.base.System):
         if (sid, tid) in self._params['links']:
             links = self._params['links'][(sid, tid)]
             return nemoa.system.commons.links.Links.energy(
-                sdata, tdata, src, tgt, links)
+                sdata, tdata, src, tgt, links,
+                units = self._units[mapping[-1]])
         elif (tid, sid) in self._params['links']:
             links = self._params['links'][(tid, sid)]
             return nemoa.system.commons.links.Links.energy(
-                tdata, sdata, tgt, src, links)
+                tdata, sdata, tgt, src, links,
+                units = self._units[mapping[-2]])
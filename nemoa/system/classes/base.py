@@ -6,8 +6,10 @@ __license__ = 'GPLv3'
 
 import numpy
 import nemoa
-from nemoa.base import entity, nbase
-from nemoa.math import meta, curve
+from nemoa.base import entity, nbase, shmem
+from nemoa.core import ui
+from nemoa.math import meta, curve, rand
+from nemoa.system.commons.links import Links
 from nemoa.types import Any, Dict
 
 class System(nbase.ObjectIP):
@@ -68,6 +70,9 @@ class System(nbase.ObjectIP):
 
     _config = None
     _params = None
+    _random = None
+    _workspace = None
+    _workspace_limit = 2 ** 28
 
     def __init__(self, *args: Any, **kwds: Any) -> None:
         """Initialize system with content from arguments."""
@@ -98,7 +103,9 @@ class System(nbase.ObjectIP):
             raise ValueError("dataset is not valid")
 
         return self._set_params_init_units(dataset) \
-            and self._set_params_init_links(dataset)
+            and self._set_params_init_links(dataset) \
+            and self._set_params_dtype() \
+            and self._set_params_sparse()
 
     def _check_network(self, network, *args, **kwds):
         """Check if network is valid for system."""
@@ -112,24 +119,14 @@ class System(nbase.ObjectIP):
 
     def _get_algorithms(self, category = None, attribute = None, tree = False):
         """Get algorithms provided by system."""
-        # get dictionary with all methods
-        # with prefix '_get_' and attribute 'name'
-        methods = entity.get_methods(self, pattern = '_get_*', val = 'name')
-
-        # filter algorithms by given category
-        if category is not None:
-            for key, val in list(methods.items()):
-                if val.get('category', None) != category:
-                    del methods[key]
+        # get registry of all methods with prefix '_get_' and attribute
+        # 'name', which is created once per class
+        registry = entity.get_registry(self.__class__, pattern = '_get_*',
+            key = 'name', groupby = 'category')
 
         # create flat structure if category is given or tree is False
-        structured = {}
         if category or not tree:
-            for ukey, udata in methods.items():
-                if attribute: structured[udata['name']] = \
-                    udata[attribute]
-                else: structured[udata['name']] = udata
-            return structured
+            return registry.select(self, category, attribute)
 
         # create tree structure if category is not given
         categories = {
@@ -138,18 +135,11 @@ class System(nbase.ObjectIP):
             ('system', 'links', 'evaluation'): 'links',
             ('system', 'relation', 'evaluation'): 'relation'
         }
-        for ukey, udata in methods.items():
-            if udata['category'] not in categories: continue
-            ckey = categories[udata['category']]
-            if ckey is None:
-                if attribute: structured[udata['name']] = \
-                    udata[attribute]
-                else: structured[udata['name']] = udata
-            else:
-                if ckey not in structured: structured[ckey] = {}
-                if attribute: structured[ckey][udata['name']] = \
-                    udata[attribute]
-                else: structured[ckey][udata['name']] = udata
+        structured = {}
+        for category, ckey in categories.items():
+            algorithms = registry.select(self, category, attribute)
+            if ckey is None: structured.update(algorithms)
+            elif algorithms: structured[ckey] = algorithms
 
         return structured
 
@@ -164,11 +154,12 @@ class System(nbase.ObjectIP):
 
         return nemoa.model.analysis.algorithms(classes = clist, **kwds)
 
-    def _get_algorithm(self, algorithm = None, *args, **kwds):
+    def _get_algorithm(self, algorithm = None, category = None,
+        attribute = None):
         """Get algorithm."""
-        algorithms = self._get_algorithms(*args, **kwds)
-        if algorithm not in algorithms: return None
-        return algorithms[algorithm]
+        registry = entity.get_registry(self.__class__, pattern = '_get_*',
+            key = 'name', groupby = 'category')
+        return registry.get(self, algorithm, category, attribute)
 
     def _get_unit(self, unit):
         """Get unit information."""
@@ -335,6 +326,10 @@ class System(nbase.ObjectIP):
         # get link parameters
         link_params = {}
         for param in list(link_layer_params.keys()):
+            if Links.issparse(link_layer_params[param]):
+                link_params[param] = \
+                    link_layer_params[param][src_id, tgt_id]
+                continue
             layer_param_array = \
                 numpy.array(link_layer_params[param])
             if layer_param_array.size == 1:
@@ -348,20 +343,24 @@ class System(nbase.ObjectIP):
         link_weight = link_params['W']
         link_adjacency = link_params['A']
 
+        if Links.issparse(layer_weights):
+            layer_abs_weights = abs(layer_adjacency.multiply(layer_weights))
+        else:
+            layer_abs_weights = numpy.abs(layer_adjacency * layer_weights)
+
         # calculate normalized weight of link (per link layer)
         if link_weight == 0.0:
             link_norm_weight = 0.0
         else:
-            adjacency_sum = numpy.sum(layer_adjacency)
-            weight_sum = numpy.sum(
-                numpy.abs(layer_adjacency * layer_weights))
+            adjacency_sum = layer_adjacency.sum()
+            weight_sum = layer_abs_weights.sum()
             link_norm_weight = link_weight * adjacency_sum / weight_sum
 
         # calculate intensified weight of link (per link layer)
         if link_norm_weight == 0.0: link_intensity = 0.0
         else:
-            link_norm_max = numpy.amax(numpy.abs(layer_adjacency
-                * layer_weights)) * adjacency_sum / weight_sum
+            link_norm_max = layer_abs_weights.max() \
+                * adjacency_sum / weight_sum
             link_intensity = curve.dialogistic(link_norm_weight,
                 scale = 0.7 * link_norm_max, sigma = 10.)
 
@@ -478,6 +477,121 @@ class System(nbase.ObjectIP):
         return mapping[sid:tid + 1] if sid <= tid \
             else mapping[tid:sid + 1][::-1]
 
+    def _get_dtype(self):
+        """Get numpy dtype of system parameters and computations.
+
+        The dtype is given by the parameter configuration 'dtype', which
+        defaults to 'float64'. With 'float32' models are trained and
+        evaluated in single precision.
+
+        """
+
+        params = (self._config or {}).get('params', {})
+
+        return numpy.dtype(params.get('dtype', 'float64'))
+
+    def _get_sparse(self):
+        """Get storage format of link parameters.
+
+        The storage format is given by the parameter configuration
+        'sparse', which defaults to False. If True, the weights of the
+        link layers are stored as sparse matrices, which only contain
+        the links given by the adjacency matrices.
+
+        """
+
+        params = (self._config or {}).get('params', {})
+
+        return bool(params.get('sparse', False))
+
+    def _get_random(self):
+        """Get random number stream of the system.
+
+        The stream is created with the first request and seeded by the
+        parameter configuration 'seed', which defaults to None. Without a
+        seed, the stream is seeded by the global random state of numpy.
+        The stochastic units, the initialization of the weights and the
+        optimizers of the system draw their random numbers from the
+        stream.
+
+        """
+
+        if self._random is None:
+            params = (self._config or {}).get('params', {})
+            self._random = rand.Stream(params.get('seed', None))
+
+        return self._random
+
+    def _get_workspace(self, data, mapping):
+        """Get preallocated arrays for forward passes along a mapping.
+
+        The workspace of the system keeps the arrays of the intermediate
+        steps of forward passes, such that repeated passes of equally
+        sized data along a mapping do not allocate memory. The arrays are
+        identified by the mapping, the number of samples and the dtype
+        and are recreated if the shape of the unit layers changed. The
+        workspaces, which are kept by the system, are limited to a total
+        of '_workspace_limit' bytes by releasing the least recently
+        created workspaces. Larger workspaces are not kept at all.
+
+        Args:
+            data: numpy array containing source data corresponding to
+                the source unit layer (first argument of the mapping)
+            mapping: n-tuple of strings containing the mapping
+                from source unit layer (first argument of tuple)
+                to target unit layer (last argument of tuple)
+
+        Returns:
+            List with a dictionary for each step of the mapping, which
+            contains the arrays 'source' for the values of the source
+            layer, which is only given for the first step, 'scaled' for
+            the scaled values of gaussian source layers and 'out' for the
+            values of the target layer. For data, which is not given as a
+            matrix, all arrays are None.
+
+        """
+
+        steps = len(mapping) - 1
+        if not isinstance(data, numpy.ndarray) or data.ndim != 2:
+            return [{'source': None, 'scaled': None, 'out': None}] * steps
+
+        size = data.shape[0]
+        dtype = numpy.result_type(data, self._get_dtype())
+        sizes = [len(self._units[layer].params['id']) for layer in mapping]
+
+        if self._workspace is None: self._workspace = {}
+        key = (tuple(mapping), size, dtype.str)
+        arena = self._workspace.get(key)
+        if arena is not None \
+            and [step['out'].shape[1] for step in arena] == sizes[1:] \
+            and arena[0]['source'].shape[1] == sizes[0]:
+            return arena
+        self._workspace.pop(key, None)
+
+        arena = []
+        for id in range(steps):
+            gauss = self._units[mapping[id]].params['class'] == 'gauss'
+            arena.append({
+                'source': numpy.empty((size, sizes[id]), dtype = dtype) \
+                    if id == 0 else None,
+                'scaled': numpy.empty((size, sizes[id]), dtype = dtype) \
+                    if gauss else None,
+                'out': numpy.empty((size, sizes[id + 1]), dtype = dtype)})
+
+        # limit the total size of the workspaces, which are kept
+        def get_nbytes(arena):
+            return sum(array.nbytes for step in arena
+                for array in step.values() if array is not None)
+        nbytes = get_nbytes(arena)
+        if nbytes > self._workspace_limit: return arena
+        total = sum(get_nbytes(kept) for kept in self._workspace.values())
+        while self._workspace and total + nbytes > self._workspace_limit:
+            released = self._workspace.pop(next(iter(self._workspace)))
+            total -= get_nbytes(released)
+        self._workspace[key] = arena
+
+        return arena
+
     def _get_params(self, key = None, *args, **kwds):
         """Get configuration or configuration value."""
 
@@ -603,7 +717,8 @@ class System(nbase.ObjectIP):
         formater = lambda val: '%.3f' % (val),
         plot     = 'histogram'
     )
-    def _get_unitexpect(self, data, mapping = None, block = None):
+    def _get_unitexpect(self, data, mapping = None, block = None,
+        out = None):
         """Expectation values of target units.
 
         Args:
@@ -615,6 +730,9 @@ class System(nbase.ObjectIP):
             block: list of strings containing labels of source units
                 that are 'blocked' by setting their values to the means
                 of their values.
+            out: optional numpy array of shape (data, targets), which is
+                used to store the expectation values. By default a new
+                array is returned.
 
         Returns:
             Numpy array of shape (data, targets).
@@ -626,14 +744,16 @@ class System(nbase.ObjectIP):
         else:
             in_data = numpy.copy(data)
             for i in block: in_data[:,i] = numpy.mean(in_data[:,i])
-        if len(mapping) == 2: return self._units[mapping[1]].expect(
-            in_data, self._units[mapping[0]].params)
-        out_data = numpy.copy(in_data)
+        if len(mapping) == 1: return numpy.copy(in_data)
+        arena = self._get_workspace(in_data, mapping)
         for id in range(len(mapping) - 1):
-            out_data = self._units[mapping[id + 1]].expect(
-                out_data, self._units[mapping[id]].params)
+            step = arena[id]
+            target = out if id == len(mapping) - 2 else step['out']
+            in_data = self._units[mapping[id + 1]].expect(
+                in_data, self._units[mapping[id]].params,
+                out = target, scaled = step['scaled'])
 
-        return out_data
+        return in_data
 
 
     @meta.custom(
@@ -645,7 +765,7 @@ class System(nbase.ObjectIP):
         plot     = 'histogram' )
 
     def _get_unitvalues(self, data, mapping = None, block = None,
-        expect_last = False):
+        expect_last = False, out = None):
         """Unit maximum likelihood values of target units.
 
         Args:
@@ -659,6 +779,9 @@ class System(nbase.ObjectIP):
                 of their values.
             expect_last: return expectation values of the units
                 for the last step instead of maximum likelihood values.
+            out: optional numpy array of shape (data, targets), which is
+                used to store the values. By default a new array is
+                returned.
 
         Returns:
             Numpy array of shape (data, targets).
@@ -670,29 +793,30 @@ class System(nbase.ObjectIP):
         else:
             in_data = numpy.copy(data)
             for i in block: in_data[:,i] = numpy.mean(in_data[:,i])
+        if len(mapping) == 1:
+            if expect_last: return in_data
+            return self._units[mapping[0]].get_values(in_data, out = out)
+        arena = self._get_workspace(in_data, mapping)
         if expect_last:
-            if len(mapping) == 1:
-                return in_data
-            elif len(mapping) == 2:
-                return self._units[mapping[1]].expect(
-                    self._units[mapping[0]].get_samples(in_data),
-                    self._units[mapping[0]].params)
+            if len(mapping) == 2:
+                source = self._units[mapping[0]].get_samples(
+                    in_data, out = arena[0]['source'])
+            else:
+                source = self._get_unitvalues(
+                    data, mapping[0:-1], out = arena[-2]['out'])
             return self._units[mapping[-1]].expect(
-                self._get_unitvalues(data, mapping[0:-1]),
-                self._units[mapping[-2]].params)
-        else:
-            if len(mapping) == 1:
-                return self._units[mapping[0]].get_values(in_data)
-            elif len(mapping) == 2:
-                return self._units[mapping[1]].get_values(
-                    self._units[mapping[1]].expect(in_data,
-                    self._units[mapping[0]].params))
-            data = numpy.copy(in_data)
-            for id in range(len(mapping) - 1):
-                data = self._units[mapping[id + 1]].get_values(
-                    self._units[mapping[id + 1]].expect(data,
-                    self._units[mapping[id]].params))
-            return data
+                source, self._units[mapping[-2]].params, out = out,
+                scaled = arena[-1]['scaled'])
+        for id in range(len(mapping) - 1):
+            step = arena[id]
+            target = out if id == len(mapping) - 2 else step['out']
+            in_data = self._units[mapping[id + 1]].expect(
+                in_data, self._units[mapping[id]].params,
+                out = target, scaled = step['scaled'])
+            in_data = self._units[mapping[id + 1]].get_values(
+                in_data, out = target)
+
+        return in_data
 
     @meta.custom(
         name     = 'units_samples',
@@ -703,7 +827,7 @@ class System(nbase.ObjectIP):
         plot     = 'histogram' )
 
     def _get_unitsamples(self, data, mapping = None,
-        block = None, expect_last = False):
+        block = None, expect_last = False, out = None):
         """Sampled unit values of target units.
 
         Args:
@@ -717,6 +841,9 @@ class System(nbase.ObjectIP):
                 of their values.
             expect_last: return expectation values of the units
                 for the last step instead of sampled values
+            out: optional numpy array of shape (data, targets), which is
+                used to store the values. By default a new array is
+                returned.
 
         Returns:
             Numpy array of shape (data, targets).
@@ -728,28 +855,30 @@ class System(nbase.ObjectIP):
         else:
             in_data = numpy.copy(data)
             for i in block: in_data[:,i] = numpy.mean(in_data[:,i])
+        if len(mapping) == 1:
+            if expect_last: return data
+            return self._units[mapping[0]].get_samples(data, out = out)
+        arena = self._get_workspace(data, mapping)
         if expect_last:
-            if len(mapping) == 1:
-                return data
-            elif len(mapping) == 2:
-                return self._units[mapping[1]].expect(
-                    self._units[mapping[0]].get_samples(data),
-                    self._units[mapping[0]].params)
+            if len(mapping) == 2:
+                source = self._units[mapping[0]].get_samples(
+                    data, out = arena[0]['source'])
+            else:
+                source = self._get_unitsamples(
+                    data, mapping[0:-1], out = arena[-2]['out'])
             return self._units[mapping[-1]].expect(
-                self._get_unitsamples(data, mapping[0:-1]),
-                self._units[mapping[-2]].params)
-        else:
-            if len(mapping) == 1:
-                return self._units[mapping[0]].get_samples(data)
-            elif len(mapping) == 2:
-                return self._units[mapping[1]].get_samples_from_input(
-                    data, self._units[mapping[0]].params)
-            data = numpy.copy(data)
-            for id in range(len(mapping) - 1):
-                data = \
-                    self._units[mapping[id + 1]].get_samples_from_input(
-                    data, self._units[mapping[id]].params)
-            return data
+                source, self._units[mapping[-2]].params, out = out,
+                scaled = arena[-1]['scaled'])
+        for id in range(len(mapping) - 1):
+            step = arena[id]
+            target = out if id == len(mapping) - 2 else step['out']
+            data = self._units[mapping[id + 1]].expect(
+                data, self._units[mapping[id]].params,
+                out = target, scaled = step['scaled'])
+            data = self._units[mapping[id + 1]].get_samples(
+                data, out = target)
+
+        return data
 
     @meta.custom(
         name     = 'units_residuals',
@@ -988,8 +1117,8 @@ class System(nbase.ObjectIP):
 
         # calculate product of weight matrices
         for i in range(1, len(mapping))[::-1]:
-            weights = self._units[mapping[i - 1]].links(
-                {'layer': mapping[i]})['W']
+            weights = Links.get_dense(self._units[mapping[i - 1]].links(
+                {'layer': mapping[i]})['W'])
             if i == len(mapping) - 1: wsp = weights.copy()
             else: wsp = numpy.dot(wsp.copy(), weights)
 
@@ -1006,7 +1135,7 @@ class System(nbase.ObjectIP):
         plot     = 'heatmap',
         formater = lambda val: '%.3f' % (val)
     )
-    def _get_knockout(self, data, mapping = None, **kwds):
+    def _get_knockout(self, data, mapping = None, sources = None, **kwds):
         """Knockout effect from source to target units.
 
         Directed data manipulation based relation describing the
@@ -1022,6 +1151,9 @@ class System(nbase.ObjectIP):
             mapping: tuple of strings containing the mapping
                 from input layer (first argument of tuple)
                 to output layer (last argument of tuple)
+            sources: numpy array containing the indices of the source
+                units, which are knocked out. Default: None knocks out
+                all source units
 
         Returns:
             Numpy array of shape (source, target) containing pairwise
@@ -1032,17 +1164,27 @@ class System(nbase.ObjectIP):
         if not mapping: mapping = self._get_mapping()
         in_labels = self._get_units(layer = mapping[0])
         out_labels = self._get_units(layer = mapping[-1])
+        if sources is None: sources = numpy.arange(len(in_labels))
+        else: sources = numpy.asarray(sources)
 
         # prepare knockout matrix
-        R = numpy.zeros((len(in_labels), len(out_labels)))
+        R = numpy.zeros((len(sources), len(out_labels)))
 
         # calculate unit values without knockout
         measure = kwds.get('measure', 'error')
         default = self._evaluate_units(data,
             func = measure, mapping = mapping)
 
+        # calculate unit values with knockout in stacked batches
+        knockout = self._get_knockout_values(data, mapping = mapping,
+            measure = measure, sources = sources)
+        if knockout is not None:
+            for out_id, out_unit in enumerate(out_labels):
+                R[:, out_id] = knockout[:, out_id] - default[out_unit]
+            return R
+
         # calculate unit values with knockout
-        for in_id, in_unit in enumerate(in_labels):
+        for row, in_id in enumerate(sources):
 
             # modify unit and calculate unit values
             knockout = self._evaluate_units(data, func = measure,
@@ -1050,11 +1192,158 @@ class System(nbase.ObjectIP):
 
             # store difference in knockout matrix
             for out_id, out_unit in enumerate(out_labels):
-                R[in_id, out_id] = \
+                R[row, out_id] = \
                     knockout[out_unit] - default[out_unit]
 
         return R
 
+    def _get_knockout_values(self, data, mapping = None, measure = 'error',
+        sources = None, budget = 2 ** 28):
+        """Unit evaluation values of target units for knocked out sources.
+
+        The knockouts of all source units are evaluated as stacked
+        manipulations of the source data, see _get_unitexpect_stack().
+
+        Args:
+            data: 2-tuple with numpy arrays: input data and output data
+            mapping: tuple of strings containing the mapping
+                from input layer (first argument of tuple)
+                to output layer (last argument of tuple)
+            measure: name of unit evaluation function. Supported values
+                are 'error' and 'accuracy'.
+            sources: numpy array containing the indices of the source
+                units, which are knocked out. Default: None knocks out
+                all source units
+            budget: maximum number of bytes used for stacked knockouts
+
+        Returns:
+            Numpy array of shape (source, target) containing the unit
+            evaluation values of the target units, when knocking out the
+            respective source units, or None if the measure is not
+            supported.
+
+        """
+
+        if measure.startswith('units_'): measure = measure[6:]
+        if measure not in ['error', 'accuracy']: return None
+
+        if not mapping: mapping = self._get_mapping()
+        sdata, tdata = data[0], data[1]
+
+        # knockouts shift source values to their means
+        shift = (numpy.mean(sdata, axis = 0) - sdata).T
+
+        if measure == 'accuracy':
+            normdat = numpy.mean(numpy.square(tdata), axis = 0)
+
+        if sources is None: sources = numpy.arange(sdata.shape[1])
+        else: sources = numpy.asarray(sources)
+        values = numpy.zeros((len(sources), tdata.shape[1]))
+        chunk = self._get_unitexpect_stacksize(sdata, mapping, budget)
+        buffer = None
+        for start in range(0, len(sources), chunk):
+            rows = slice(start, start + chunk)
+            ids = sources[rows]
+            expect, buffer = self._get_unitexpect_stack(sdata, ids,
+                shift[ids], mapping = mapping, buffer = buffer)
+            normres = numpy.mean(numpy.square(tdata - expect), axis = 1)
+            if measure == 'error': values[rows] = normres
+            else: values[rows] = 1. - normres / normdat
+
+        return values
+
+    def _get_unitexpect_stacksize(self, data, mapping, budget):
+        """Number of stacked manipulations within a memory budget.
+
+        Args:
+            data: numpy array containing source data
+            mapping: tuple of strings containing the mapping
+                from source layer to target layer
+            budget: maximum number of bytes used for the stack
+
+        Returns:
+            Integer containing the maximum number of manipulations,
+            which can be evaluated by a single stacked forward pass.
+
+        """
+
+        width = max(len(self._get_units(layer = layer))
+            for layer in mapping[1:])
+
+        return max(1, int(budget / (data.shape[0] * width * data.itemsize)))
+
+    def _get_unitexpect_stack(self, data, ids, shift, mapping = None,
+        buffer = None):
+        """Expected values of target units for stacked manipulations.
+
+        A manipulation adds a shift to the values of a single source unit.
+        This only adds a rank-1 correction to the net input of the first
+        mapped layer, such that the net inputs for many manipulations are
+        obtained from a single product of the data with the weights and
+        stacked along a new axis. Manipulations of several source units
+        add one rank-1 correction per source unit. The remaining layers
+        are evaluated for all stacked manipulations at once.
+
+        Args:
+            data: numpy array of shape (samples, sources) containing
+                source data corresponding to the source unit layer
+            ids: numpy array of shape (manipulations, ) or of shape
+                (manipulations, units) containing the indices of the
+                manipulated source units
+            shift: numpy array of shape (manipulations, samples) or of
+                shape (manipulations, units, samples) containing the
+                shifts of the values of the source units
+            mapping: n-tuple of strings containing the mapping
+                from source unit layer (first argument of tuple)
+                to target unit layer (last argument of tuple)
+            buffer: numpy array, which is used to store the stacked net
+                inputs of the first mapped layer, or None. The buffer is
+                reused if it is large enough.
+
+        Returns:
+            2-tuple with a numpy array of shape (manipulations, samples,
+            targets), containing the expected values of the target units,
+            and the buffer for the stacked net inputs.
+
+        """
+
+        if mapping is None: mapping = self._get_mapping()
+        src = self._units[mapping[0]]
+        tgt = self._units[mapping[1]]
+
+        # net input of first mapped layer without manipulation
+        weights = Links.get_dense(tgt.weights(src.params))
+        if src.params['class'] == 'gauss': sdev = src.sdev()
+        else: sdev = numpy.ones((1, data.shape[1]))
+        netin = tgt.params['bias'] + numpy.dot(data / sdev, weights)
+
+        # add rank-1 corrections of manipulations to stacked net inputs
+        ids = numpy.asarray(ids)
+        if ids.ndim == 1:
+            ids, shift = ids[:, numpy.newaxis], shift[:, numpy.newaxis]
+        shape = (len(ids), ) + netin.shape
+        if buffer is None or buffer.shape[0] < shape[0] \
+            or buffer.shape[1:] != shape[1:]:
+            buffer = numpy.empty(shape, dtype = netin.dtype)
+        stack = buffer[:shape[0]]
+        for unit in range(ids.shape[1]):
+            uids = ids[:, unit]
+            factor = (shift[:, unit] / sdev[0, uids][:, numpy.newaxis]) \
+                [:, :, numpy.newaxis]
+            if unit: stack += factor * weights[uids, numpy.newaxis, :]
+            else: numpy.multiply(factor, weights[uids, numpy.newaxis, :],
+                out = stack)
+        stack += netin[numpy.newaxis]
+
+        # evaluate remaining layers for all manipulations at once
+        expect = tgt.activation(stack)
+        if len(mapping) > 2:
+            expect = self._get_unitexpect(
+                expect.reshape((-1, expect.shape[-1])), mapping[1:])
+            expect = expect.reshape(shape[:2] + (-1, ))
+
+        return expect, buffer
+
     @meta.custom(
         name     = 'coinduction',
         category = ('system', 'relation', 'evaluation'),
@@ -1066,8 +1355,40 @@ class System(nbase.ObjectIP):
         plot     = 'heatmap',
         formater = lambda val: '%.3f' % (val)
     )
-    def _get_coinduction(self, data, *args, **kwds):
-        """Coinduced deviation from source to target units."""
+    def _get_coinduction(self, data, mapping = None, points = 10,
+        amplify = 1., gauge = 0.1, contrast = 20.0, sources = None,
+        budget = 2 ** 28, **kwds):
+        """Coinduced deviation from source to target units.
+
+        The coinduction of a manipulated source unit is given by the
+        deviation of the induction, when the values of the manipulated
+        source unit are fixed. The inductions of all manipulated source
+        units are evaluated as stacked manipulations of the source data,
+        see _get_unitexpect_stack(), where each manipulation fixes the
+        manipulated source unit and shifts an induced source unit to a
+        representative point of its distribution.
+
+        Args:
+            data: 2-tuple with numpy arrays: input data and output data
+            mapping: tuple of strings containing the mapping
+                from source layer (first argument of tuple)
+                to target layer (last argument of tuple)
+            points: number of points to extrapolate induction
+            amplify: amplification of the modified source values
+            gauge: cutoff for strongest induced deviations. The default
+                is lower than the default of the induction to increase
+                the sensitivity.
+            contrast: sigma of the dialogistic contrast function
+            sources: numpy array containing the indices of the
+                manipulated source units. Default: None manipulates all
+                source units
+            budget: maximum number of bytes used for stacked manipulations
+
+        Returns:
+            Numpy array of shape (source, manipulated source) containing
+            the coinduced deviations.
+
+        """
 
         # 2do: Open Problem:
         #       Normalization of CoInduction
@@ -1079,50 +1400,65 @@ class System(nbase.ObjectIP):
         # 2do: Proove:
         # CoInduction <=> Common distribution in 'deep' latent variables
 
-        # algorithmic default parameters
-        gauge = 0.1 # setting gauge lower than induction default
-                    # to increase sensitivity
-
-        mapping = self._get_mapping()
-        srcunits = self._get_units(layer = mapping[0])
-        tgtunits = self._get_units(layer = mapping[-1])
-
-        # prepare cooperation matrix
-        coop = numpy.zeros((len(srcunits), len(srcunits)))
-
-        # create keawords for induction measurement
-
-        if 'gauge' not in kwds: kwds['gauge'] = gauge
+        if not mapping: mapping = self._get_mapping()
+        sdata, tdata = data[0], data[1]
+        samples, count = sdata.shape
+        if sources is None: sources = numpy.arange(count)
+        else: sources = numpy.asarray(sources)
 
         # calculate induction without manipulation
-        ind = self._get_induction(data, *args, **kwds)
-        norm = numpy.sqrt((ind ** 2).sum(axis = 1))
-
-        # calculate induction with manipulation
-        for sid, sunit in enumerate(srcunits):
-
-            # manipulate source unit values and calculate induction
-            datamp = [numpy.copy(data[0]), data[1]]
-            datamp[0][:, sid] = 10.0
-            indmp = self._get_induction(datamp, *args, **kwds)
-
-            print(('manipulation of', sunit))
-            vals = [-2., -1., -0.5, 0., 0.5, 1., 2.]
-            maniparr = numpy.zeros(shape = (len(vals), data[0].shape[1]))
-            for vid, val in enumerate(vals):
-                datamod = [numpy.copy(data[0]), data[1]]
-                datamod[0][:, sid] = val #+ datamod[0][:, sid].mean()
-                indmod = self._get_induction(datamod, *args, **kwds)
-                maniparr[vid, :] = numpy.sqrt(((indmod - ind) ** 2).sum(axis = 1))
-            manipvar = maniparr.var(axis = 0)
-            #manipvar /= numpy.amax(manipvar)
-            manipnorm = numpy.amax(manipvar)
-            # 2do
-            print((manipvar * 1000.))
-            print((manipvar / manipnorm))
-
-            coop[:,sid] = \
-                numpy.sqrt(((indmp - ind) ** 2).sum(axis = 1))
+        ind = self._get_induction(data, mapping = mapping, points = points,
+            amplify = amplify, gauge = gauge, contrast = contrast,
+            budget = budget)
+
+        # get representative points of source unit distributions
+        r_ids = [int((i + 0.5) * int(float(samples) / points))
+            for i in range(points)]
+        try:
+            i_curves = amplify * numpy.take(
+                numpy.sort(sdata, axis = 0), r_ids, axis = 0).T
+        except Exception as err:
+            raise ValueError(
+                "could not evaluate coinduction: unknown error") from err
+
+        # mean over strongest standard deviations of outputs
+        bound = int((1. - gauge) * samples)
+        tdev = tdata.std(axis = 0)
+
+        # the manipulation fixes the values of a source unit, which also
+        # fixes the representative points of its own distribution, such
+        # that its induced deviations vanish and are not evaluated
+        fixed = 10.
+        pairs = numpy.array([(mid, sid) for mid in sources
+            for sid in range(count) if sid != mid]).reshape((-1, 2))
+        R = numpy.zeros((len(sources), count, tdata.shape[1]))
+        cols = numpy.repeat(numpy.arange(len(sources)), count - 1)
+        chunk = max(1, self._get_unitexpect_stacksize(
+            sdata, mapping, budget) // points)
+        buffer = None
+        for start in range(0, len(pairs), chunk):
+            rows = slice(start, start + chunk)
+            mids, sids = pairs[rows, 0], pairs[rows, 1]
+            shift = numpy.empty((len(mids), points, 2, samples))
+            shift[:, :, 0] = (fixed - sdata[:, mids].T)[:, numpy.newaxis]
+            shift[:, :, 1] = i_curves[sids, :, numpy.newaxis] \
+                - sdata[:, sids].T[:, numpy.newaxis, :]
+            expect, buffer = self._get_unitexpect_stack(sdata,
+                numpy.repeat(pairs[rows], points, axis = 0),
+                shift.reshape((-1, 2, samples)),
+                mapping = mapping, buffer = buffer)
+            dev = expect.reshape((len(mids), points, samples, -1)).std(
+                axis = 1)
+            if bound < samples:
+                dev = numpy.partition(dev, bound, axis = 1)
+            R[cols[rows], sids] = dev[:, bound:].mean(axis = 1) / tdev
+
+        # calculate deviations of inductions with manipulation
+        coop = numpy.zeros((count, len(sources)))
+        for col, values in enumerate(R):
+            indmp = self._get_induction_contrast(values, mapping = mapping,
+                contrast = contrast)
+            coop[:, col] = numpy.sqrt(((indmp - ind) ** 2).sum(axis = 1))
 
         return coop
 
@@ -1170,48 +1506,32 @@ class System(nbase.ObjectIP):
         """
 
         if not mapping: mapping = self._get_mapping()
-        inputs = self._get_units(layer = mapping[0])
-        outputs = self._get_units(layer = mapping[-1])
-        sdata = data[0]
-        tdata = data[1]
-        R = numpy.zeros((len(inputs), len(outputs)))
-
-        # get indices of representatives
-        r_ids = [int((i + 0.5) * int(float(sdata.shape[0])
-            / points)) for i in range(points)]
+        R = self._get_induction_values(data, mapping = mapping,
+            points = points, amplify = amplify, gauge = gauge, **kwds)
 
-        for inid, inunit in enumerate(inputs):
-            try:
-                i_curve = numpy.take(numpy.sort(sdata[:, inid]), r_ids)
-            except Exception as err:
-                raise ValueError(
-                    "could not evaluate induction: unknown error") from err
-            i_curve = amplify * i_curve
+        return self._get_induction_contrast(R, mapping = mapping,
+            contrast = contrast)
 
-            # create output matrix for each output
-            C = {outunit: numpy.zeros((sdata.shape[0], points)) \
-                for outunit in outputs}
+    def _get_induction_contrast(self, R, mapping = None, contrast = 20.0):
+        """Amplify contrast of induced deviations.
 
-            for p_id in range(points):
-                i_data  = sdata.copy()
-                i_data[:, inid] = i_curve[p_id]
-
-                o_expect = self._evaluate_units((i_data, data[1]),
-                    func = 'units_expect', mapping = mapping)
-
-                for outunit in outputs:
-                    C[outunit][:, p_id] = o_expect[outunit]
+        Args:
+            R: numpy array of shape (source, target) containing pairwise
+                induced deviations from source to target units
+            mapping: tuple of strings containing the mapping
+                from source layer (first argument of tuple)
+                to target layer (last argument of tuple)
+            contrast: sigma of the dialogistic contrast function
 
-            # calculate mean of standard deviations of outputs
-            for outid, outunit in enumerate(outputs):
+        Returns:
+            Numpy array of shape (source, target) containing pairwise
+            induced deviations with amplified contrast.
 
-                # calculate norm by mean over part of data
-                bound = int((1. - gauge) * sdata.shape[0])
-                subset = numpy.sort(C[outunit].std(axis = 1))[bound:]
-                norm = subset.mean() / tdata[:, outid].std()
+        """
 
-                # calculate influence
-                R[inid, outid] = norm
+        if not mapping: mapping = self._get_mapping()
+        inputs = self._get_units(layer = mapping[0])
+        outputs = self._get_units(layer = mapping[-1])
 
         # amplify contrast of induction
         A = R.copy()
@@ -1228,6 +1548,76 @@ class System(nbase.ObjectIP):
 
         return R
 
+    def _get_induction_values(self, data, mapping = None, points = 10,
+        amplify = 1., gauge = 0.25, sources = None, budget = 2 ** 28,
+        **kwds):
+        """Induced deviation from source to target units without contrast.
+
+        For each source unit the values of all samples are fixed to a
+        given number of representative points of its distribution. These
+        manipulations are evaluated as stacked manipulations of the source
+        data, see _get_unitexpect_stack(), where the number of source units
+        per stack is limited by a memory budget.
+
+        Args:
+            data: 2-tuple with numpy arrays: input data and output data
+            mapping: tuple of strings containing the mapping
+                from source layer (first argument of tuple)
+                to target layer (last argument of tuple)
+            points: number of points to extrapolate induction
+            amplify: amplification of the modified source values
+            gauge: cutoff for strongest induced deviations
+            sources: numpy array containing the indices of the
+                manipulated source units. Default: None manipulates all
+                source units
+            budget: maximum number of bytes used for stacked manipulations
+
+        Returns:
+            Numpy array of shape (source, target) containing pairwise
+            induced deviation from source to target units.
+
+        """
+
+        if not mapping: mapping = self._get_mapping()
+        sdata, tdata = data[0], data[1]
+        samples = sdata.shape[0]
+
+        # get representative points of source unit distributions
+        r_ids = [int((i + 0.5) * int(float(samples) / points))
+            for i in range(points)]
+        try:
+            i_curves = amplify * numpy.take(
+                numpy.sort(sdata, axis = 0), r_ids, axis = 0).T
+        except Exception as err:
+            raise ValueError(
+                "could not evaluate induction: unknown error") from err
+
+        # mean over strongest standard deviations of outputs
+        bound = int((1. - gauge) * samples)
+        tdev = tdata.std(axis = 0)
+
+        if sources is None: sources = numpy.arange(sdata.shape[1])
+        else: sources = numpy.asarray(sources)
+        R = numpy.zeros((len(sources), tdata.shape[1]))
+        chunk = max(1, self._get_unitexpect_stacksize(
+            sdata, mapping, budget) // points)
+        buffer = None
+        for start in range(0, len(sources), chunk):
+            rows = slice(start, start + chunk)
+            ids = sources[rows]
+            shift = i_curves[ids, :, numpy.newaxis] \
+                - sdata[:, ids].T[:, numpy.newaxis, :]
+            expect, buffer = self._get_unitexpect_stack(sdata,
+                numpy.repeat(ids, points), shift.reshape((-1, samples)),
+                mapping = mapping, buffer = buffer)
+            dev = expect.reshape((len(ids), points, samples, -1)).std(
+                axis = 1)
+            if bound < samples:
+                dev = numpy.partition(dev, bound, axis = 1)
+            R[rows] = dev[:, bound:].mean(axis = 1) / tdev
+
+        return R
+
     def set(self, key = None, *args, **kwds):
         """Set meta information, configuration and parameters."""
 
@@ -1422,11 +1812,15 @@ class System(nbase.ObjectIP):
             retval &= self._set_params_init_units(dataset)
             retval &= self._set_params_init_links(dataset)
 
+        retval &= self._set_params_dtype()
+        retval &= self._set_params_sparse()
+
         return retval
 
     def _set_params_create_units(self):
         # create instances of unit classes
         # and link units params to local params dict
+        dtype = self._get_dtype()
         self._units = {}
         for layer_id in range(len(self._params['units'])):
             layer_params = self._params['units'][layer_id]
@@ -1443,6 +1837,48 @@ class System(nbase.ObjectIP):
                 raise ValueError("""could not create system:
                     unit class '%s' is not supported!"""
                     % (layer_class))
+            self._units[layer_name].dtype = dtype
+            self._units[layer_name].random = self._get_random()
+
+        return True
+
+    def _set_params_dtype(self):
+        """Convert unit and link parameters to the system dtype."""
+
+        dtype = self._get_dtype()
+        for layer in self._params['units']:
+            for key in ['bias', 'lvar']:
+                if key not in layer: continue
+                layer[key] = numpy.asarray(layer[key], dtype = dtype)
+        for links in self._params['links'].values():
+            for key in ['W', 'A']:
+                if key not in links: continue
+                if Links.issparse(links[key]):
+                    links[key] = links[key].astype(dtype)
+                    continue
+                links[key] = numpy.asarray(links[key], dtype = dtype)
+
+        return True
+
+    def _set_params_sparse(self):
+        """Convert link parameters to the storage format of the system.
+
+        Sparse link layers store the weights and adjacencies as sparse
+        matrices in CSR format, such that the memory and time of their
+        computations scale with the number of links.
+
+        """
+
+        sparse = self._get_sparse()
+        for links in self._params['links'].values():
+            if 'W' not in links or 'A' not in links: continue
+            if sparse:
+                if getattr(links['W'], 'format', None) == 'csr': continue
+                links['A'], links['W'] = \
+                    Links.get_sparse(links['A'], links['W'])
+                continue
+            links['A'] = Links.get_dense(links['A'])
+            links['W'] = Links.get_dense(links['W'])
 
         return True
 
@@ -1459,8 +1895,10 @@ class System(nbase.ObjectIP):
 
             self._links[src]['target'][tgt] = link_params
             self._units[src].target = link_params
+            self._units[src].target_units = self._units[tgt]
             self._links[tgt]['source'][src] = link_params
             self._units[tgt].source = link_params
+            self._units[tgt].source_units = self._units[src]
 
         return True
 
@@ -1515,10 +1953,12 @@ class System(nbase.ObjectIP):
         if dataset and not entity.has_base(dataset, 'Dataset'):
             raise TypeError("dataset is required to be of type dataset")
 
+        dtype = self._get_dtype()
+        stream = self._get_random()
         for links in self._params['links']:
             source = self._params['links'][links]['source']
             target = self._params['links'][links]['target']
-            A = self._params['links'][links]['A']
+            A = Links.get_dense(self._params['links'][links]['A'])
             x = len(self._units[source].params['id'])
             y = len(self._units[target].params['id'])
             alpha = self._config['init']['w_sigma'] \
@@ -1526,24 +1966,24 @@ class System(nbase.ObjectIP):
             sigma = numpy.ones([x, 1], dtype=float) * alpha / x
 
             if dataset is None:
-                random = numpy.random.normal(numpy.zeros((x, y)), sigma)
+                random = stream.normal(numpy.zeros((x, y)), sigma)
             elif source in dataset.get('colgroups'):
                 rows = self._config['params']['samples'] \
                     if 'samples' in self._config['params'] else '*'
                 data = dataset.get('data', 100000, rows=rows, cols=source)
                 delta = sigma * data.std(axis=0).reshape(x, 1) + 0.001
-                random = numpy.random.normal(numpy.zeros((x, y)), delta)
+                random = stream.normal(numpy.zeros((x, y)), delta)
             elif dataset.columns \
                 == self._units[source].params['id']:
                 rows = self._config['params']['samples'] \
                     if 'samples' in self._config['params'] else '*'
                 data = dataset.get('data', 100000, rows=rows, cols='*')
-                random = numpy.random.normal(numpy.zeros((x, y)),
+                random = stream.normal(numpy.zeros((x, y)),
                     sigma * numpy.std(data, axis=0).reshape(1, x).T)
             else: random = \
-                numpy.random.normal(numpy.zeros((x, y)), sigma)
+                stream.normal(numpy.zeros((x, y)), sigma)
 
-            self._params['links'][links]['W'] = A * random
+            self._params['links'][links]['W'] = (A * random).astype(dtype)
 
         return True
 
@@ -1762,6 +2202,11 @@ class System(nbase.ObjectIP):
             format: string describing format of return values
                 'array': return values as numpy array
                 'dict': return values as python dictionary
+            workers: number of worker processes, which evaluate the
+                relation in parallel over source units. Supported for
+                the relations 'knockout', 'induction' and 'coinduction'.
+                Default: None evaluates the relation in the current
+                process
             eval_stat: if format is 'dict' and eval_stat is True then
                 the return dictionary includes additional statistical
                 values:
@@ -1807,9 +2252,20 @@ class System(nbase.ObjectIP):
         ekwds = kwds.copy()
         if 'mapping' not in ekwds or ekwds['mapping'] is None:
             ekwds['mapping'] = self._get_mapping()
+        workers = ekwds.pop('workers', None)
+
+        # shared memory requires python 3.8 or later
+        if workers and workers > 1 and not shmem.is_available():
+            ui.warning("worker processes require shared memory: "
+                "using single process.")
+            workers = None
 
         # perform evaluation
-        values = algorithm['reference'](*eargs, **ekwds)
+        if workers and workers > 1 \
+            and func in ['knockout', 'induction', 'coinduction']:
+            values = self._get_relation_sharded(data, func, workers,
+                **ekwds)
+        else: values = algorithm['reference'](*eargs, **ekwds)
 
         # create formated return values as matrix or dict
         # (for scalar relation evaluations)
@@ -1858,7 +2314,57 @@ class System(nbase.ObjectIP):
             else: raise Warning(
                 'could not perform system unit relation evaluation')
 
-            return False
+            return retval
+
+    def _get_relation_sharded(self, data, func, workers, **kwds):
+        """Evaluate relation in worker processes over source units.
+
+        The source units are split into shards, which are evaluated by a
+        pool of worker processes. The system parameters and the data are
+        copied once to shared memory, from which every worker process
+        creates its own instance of the system, such that the tasks only
+        pass the indices of the source units.
+
+        Args:
+            data: 2-tuple with numpy arrays: input data and output data
+            func: name of relation function. Supported values are
+                'knockout', 'induction' and 'coinduction'
+            workers: number of worker processes
+            **kwds: keyword arguments of the relation function
+
+        Returns:
+            Numpy array containing the same relation values, as returned
+            by the relation function.
+
+        """
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        mapping = kwds.get('mapping') or self._get_mapping()
+        count = len(self._get_units(layer = mapping[0]))
+        shards = numpy.array_split(numpy.arange(count), min(workers, count))
+
+        # copy system parameters and data to shared memory
+        copy = self.get('copy')
+        shared, blocks = shmem.share((copy['params'], tuple(data)))
+        try:
+            with ProcessPoolExecutor(max_workers = len(shards),
+                initializer = _init_relation_worker,
+                initargs = (copy['config'], shared)) as pool:
+                tasks = [pool.submit(_get_relation_shard, func, ids, kwds)
+                    for ids in shards]
+                values = [task.result() for task in tasks]
+        finally:
+            shmem.release(blocks, unlink = True)
+
+        # merge shards
+        if func == 'coinduction': return numpy.hstack(values)
+        R = numpy.vstack(values)
+        if func == 'induction':
+            R = self._get_induction_contrast(R, mapping = mapping,
+                contrast = kwds.get('contrast', 20.0))
+
+        return R
 
     def save(self, *args, **kwds):
         """Export system to file."""
@@ -1871,3 +2377,34 @@ class System(nbase.ObjectIP):
     def copy(self, *args, **kwds):
         """Create copy of system."""
         return nemoa.system.copy(self, *args, **kwds)
+
+_worker: Dict[str, Any] = {}
+
+def _init_relation_worker(config, shared):
+    """Create system from parameters in shared memory."""
+    from multiprocessing import util
+    (params, data), blocks = shmem.attach(shared)
+    _worker['blocks'] = blocks
+    _worker['data'] = data
+    _worker['system'] = nemoa.system.new(config = config, params = params)
+
+    # release shared memory when the worker process is shut down
+    util.Finalize(None, _release_worker, exitpriority = 10)
+
+def _release_worker():
+    """Delete system of worker process and close shared memory."""
+    import gc
+    blocks = _worker.pop('blocks', [])
+    _worker.clear()
+    gc.collect()
+    shmem.release(blocks)
+
+def _get_relation_shard(func, sources, kwds):
+    """Evaluate relation for a shard of source units."""
+    system, data = _worker['system'], _worker['data']
+    if func == 'knockout':
+        return system._get_knockout(data, sources = sources, **kwds)
+    if func == 'induction':
+        return system._get_induction_values(data, sources = sources,
+            **kwds)
+    return system._get_coinduction(data, sources = sources, **kwds)
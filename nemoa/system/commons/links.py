@@ -8,35 +8,222 @@ import nemoa
 import numpy
 
 class Links:
-    """Class to unify common ann link attributes."""
+    """Class to unify common ann link attributes.
+
+    The weights and adjacencies of link layers are either stored as dense
+    numpy arrays or as sparse matrices in compressed sparse row (CSR)
+    format. Sparse link layers only store the links of the adjacency
+    matrix, such that weights and adjacencies share the same structure.
+
+    """
 
     params = {}
 
     def __init__(self): pass
 
     @staticmethod
-    def energy(dSrc, dTgt, src, tgt, links, calc = 'mean'):
-        """Return link energy as numpy array."""
+    def energy(dSrc, dTgt, src, tgt, links, calc = 'mean', units = None):
+        """Return link energy as numpy array.
+
+        Args:
+            units: optional unit layer instance of the target layer. If
+                given, the product of adjacency and weights and the
+                standard deviations of the source layer are taken from
+                the cached values of the unit layer.
+
+        Returns:
+            For dense links numpy array of shape (samples, source units,
+            target units). For sparse links numpy array of shape
+            (samples, links), which contains the energies of the links
+            in the order given by get_edges().
+
+        """
+
+        if src['class'] not in ['gauss', 'sigmoid']:
+            raise ValueError('unsupported unit class')
+
+        if units is not None:
+            M = - units.adjweights(src)
+            if src['class'] == 'gauss': sdev = units.source_sdev(src)
+        else:
+            if Links.issparse(links['W']):
+                M = links['W'].copy()
+                M.data = - links['A'].data * links['W'].data
+            else: M = - links['A'] * links['W']
+            if src['class'] == 'gauss':
+                sdev = numpy.sqrt(numpy.exp(src['lvar']))
 
-        if src['class'] == 'gauss':
-            M = - links['A'] * links['W'] \
-                / numpy.sqrt(numpy.exp(src['lvar'])).T
-        elif src['class'] == 'sigmoid':
-            M = - links['A'] * links['W']
-        else: raise ValueError('unsupported unit class')
+        if Links.issparse(links['W']):
+            rows, cols = Links.get_edges(links['W'])
+            M = M.data
+            if src['class'] == 'gauss': M = M / sdev[0, rows]
+            return dSrc[:, rows] * dTgt[:, cols] * M
+
+        if src['class'] == 'gauss': M = M / sdev.T
 
         return numpy.einsum('ij,ik,jk->ijk', dSrc, dTgt, M)
 
     @staticmethod
-    def get_updates(data, model):
+    def get_updates(data, model, weights = None):
         """Return weight updates of a link layer."""
 
-        D = numpy.dot(data[0].T, data[1]) / float(data[1].size)
-        M = numpy.dot(model[0].T, model[1]) / float(data[1].size)
+        D = Links.outer(data[0], data[1], weights) / float(data[1].size)
+        M = Links.outer(model[0], model[1], weights) / float(data[1].size)
 
         return { 'W': D - M }
 
     @staticmethod
-    def get_updates_delta(data, delta):
+    def get_updates_delta(data, delta, weights = None):
+
+        return { 'W': -Links.outer(data, delta, weights) / float(data.size) }
+
+    @staticmethod
+    def issparse(weights):
+        """Return True if weights are stored as sparse matrix."""
+
+        return hasattr(weights, 'tocsr')
+
+    @staticmethod
+    def get_sparse(adjacency, weights):
+        """Return adjacency and weights as sparse matrices.
+
+        Args:
+            adjacency: dense or sparse adjacency matrix of link layer
+            weights: dense or sparse weight matrix of link layer
+
+        Returns:
+            2-tuple of sparse matrices in CSR format, containing the
+            adjacency and the weights of the link layer. The matrices
+            share the structure, which is given by the nonzero entries
+            of the adjacency matrix.
+
+        """
+
+        try:
+            import scipy.sparse
+        except ImportError as err:
+            raise ImportError(
+                "requires package scipy: "
+                "https://pypi.org/project/scipy") from err
+
+        A = scipy.sparse.csr_matrix(adjacency != 0, dtype = weights.dtype)
+        A.sort_indices()
+        rows, cols = Links.get_edges(A)
+        if Links.issparse(weights):
+            values = numpy.asarray(weights[rows, cols]).ravel()
+        else: values = weights[rows, cols]
+        W = scipy.sparse.csr_matrix(
+            (values, A.indices.copy(), A.indptr.copy()), shape = A.shape)
+
+        return A, W
+
+    @staticmethod
+    def get_dense(weights):
+        """Return dense or sparse weights as numpy array."""
+
+        if Links.issparse(weights): return weights.toarray()
+
+        return weights
+
+    @staticmethod
+    def get_edges(weights):
+        """Return row and column indices of links of sparse weights."""
+
+        rows = numpy.repeat(numpy.arange(weights.shape[0]),
+            numpy.diff(weights.indptr))
+
+        return rows, weights.indices
+
+    @staticmethod
+    def dot(data, weights, out = None):
+        """Return product of data with dense or sparse weights.
+
+        Args:
+            data: numpy array, which last axis corresponds to the first
+                axis of the weights
+            weights: dense or sparse weight matrix
+            out: optional numpy array of the shape of the product, which
+                is used to store the product. For dense weights, which
+                match the dtype of the array, the product is written
+                without allocating a temporary array.
+
+        Returns:
+            Numpy array, which last axis corresponds to the second axis
+            of the weights.
+
+        """
+
+        if not Links.issparse(weights):
+            if out is None: return numpy.dot(data, weights)
+            if out.flags.c_contiguous \
+                and out.dtype == numpy.result_type(data, weights):
+                return numpy.dot(data, weights, out = out)
+            numpy.copyto(out, numpy.dot(data, weights))
+            return out
+
+        flat = data.reshape((-1, data.shape[-1]))
+        product = weights.T.dot(flat.T).T
+        product = product.reshape(data.shape[:-1] + (weights.shape[1], ))
+        if out is None: return product
+        numpy.copyto(out, product)
+
+        return out
+
+    @staticmethod
+    def outer(data, delta, weights = None):
+        """Return product of transposed data with deltas.
+
+        Args:
+            data: numpy array of shape (samples, sources)
+            delta: numpy array of shape (samples, targets)
+            weights: dense or sparse weight matrix of shape (sources,
+                targets) or None. For sparse weights the product is only
+                evaluated for the links, such that time and memory scale
+                with the number of links.
+
+        Returns:
+            Numpy array of shape (sources, targets) or sparse matrix with
+            the structure of the sparse weights.
+
+        """
+
+        if not Links.issparse(weights): return numpy.dot(data.T, delta)
+
+        rows, cols = Links.get_edges(weights)
+        values = numpy.einsum('ij,ij->j', data[:, rows], delta[:, cols])
+
+        return type(weights)((values, weights.indices, weights.indptr),
+            shape = weights.shape)
+
+    @staticmethod
+    def add(weights, update):
+        """Add update to dense or sparse weights in place.
+
+        Args:
+            weights: dense or sparse weight matrix
+            update: dense or sparse matrix with the shape of the weights
+
+        Returns:
+            The updated weights.
+
+        """
+
+        if not Links.issparse(weights):
+            weights += update
+            return weights
+
+        # fast path for sparse updates with the structure of the weights
+        if Links.issparse(update):
+            update = update.tocsr()
+            if update.nnz == weights.nnz \
+                and numpy.array_equal(update.indptr, weights.indptr) \
+                and numpy.array_equal(update.indices, weights.indices):
+                weights.data += update.data
+                return weights
+
+        rows, cols = Links.get_edges(weights)
+        if Links.issparse(update):
+            weights.data += numpy.asarray(update[rows, cols]).ravel()
+        else: weights.data += numpy.asarray(update)[rows, cols]
 
-        return { 'W': -numpy.dot(data.T, delta) / float(data.size) }
+        return weights
@@ -8,41 +8,130 @@ import nemoa
 import numpy
 
 from nemoa.math import curve
+from nemoa.system.commons.links import Links
 
 class UnitsBaseClass:
     """Base Class for Unit Layer.
 
     Unification of common unit layer functions and attributes.
+
+    Values, which are derived from the parameters of the unit layer and
+    its link layers, like standard deviations and transposed weights, are
+    cached by the unit layer. The cache is invalidated by the version of
+    the parameters, which is incremented by update() and touch().
+
     """
 
     params = {}
     source = {}
     target = {}
+    source_units = None
+    target_units = None
+    dtype = numpy.float64
+    random = numpy.random
+    version = 0
 
     def __init__(self, params = None):
+        self._cache = {}
         if params:
             self.params = params
             if not self.check(params): self.initialize()
 
-    def expect(self, data, source):
+    def touch(self):
+        """Increment version of parameters to invalidate cached values.
+
+        Parameters, which are modified in place without update(), e.g.
+        the weights of link layers, require to touch the connected unit
+        layers.
+
+        """
+
+        self.version += 1
+
+        return True
+
+    def cached(self, key, func, dep = None):
+        """Return cached value, which is derived from parameters.
+
+        Args:
+            key: hashable identifier of the value
+            func: function without arguments, which calculates the value
+            dep: parameter array, which is used by the function. The
+                value is recalculated if the array is replaced.
+
+        Returns:
+            Value of the function for the current version of the
+            parameters.
+
+        """
+
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] == self.version \
+            and entry[1] is dep: return entry[2]
+
+        value = func()
+        self._cache[key] = (self.version, dep, value)
+
+        return value
+
+    def units(self, source):
+        """Return unit layer instance of a connected layer or None."""
+
+        units = self.source_units
+        if units is not None and units.params is source: return units
+        units = self.target_units
+        if units is not None and units.params is source: return units
+
+        return None
+
+    def source_sdev(self, source):
+        """Return standard deviations of a gaussian source layer."""
+
+        units = self.units(source)
+        if units is None: return numpy.sqrt(numpy.exp(source['lvar']))
+
+        return units.sdev()
+
+    def expect(self, data, source, out = None, scaled = None):
+        """Return expected values of units from values of a source layer.
+
+        Args:
+            data: numpy array with values of the source layer
+            source: parameters of the source layer
+            out: optional numpy array of shape (data, units), which is
+                used to store the expected values
+            scaled: optional numpy array of the shape of the data, which
+                is used to store the scaled values of gaussian source
+                layers
+
+        """
 
         if source['class'] == 'sigmoid':
             return self.expect_from_sigmoid_layer(
-                data, source, self.weights(source))
+                data, source, self.weights(source), out = out)
         elif source['class'] == 'gauss':
             return self.expect_from_gauss_layer(
-                data, source, self.weights(source))
+                data, source, self.weights(source), out = out,
+                scaled = scaled)
 
         return False
 
+    def netin(self, data, source):
+        """Return net input of units from values of a source layer."""
+
+        if source['class'] == 'gauss':
+            data = data / self.source_sdev(source)
+
+        return self.params['bias'] + Links.dot(data, self.weights(source))
+
     def get_updates(self, data, model, source):
 
         return self.get_param_updates(data, model, self.weights(source))
 
-    def get_delta(self, in_data, out_delta, source, target):
+    def get_delta(self, in_data, out_delta, source, target, netin = None):
 
         return self.delta_from_bprop(in_data, out_delta,
-            self.weights(source), self.weights(target))
+            self.weights(source), self.weights(target), netin = netin)
 
     def get_samples_from_input(self, data, source):
 
@@ -64,7 +153,11 @@ class UnitsBaseClass:
             return self.source['W']
         elif 'target' in self.target \
             and source['layer'] == self.target['target']:
-            return self.target['W'].T
+            # transposed dense weights are views, which are cheaper to
+            # create than to look up
+            w = self.target['W']
+            if not Links.issparse(w): return w.T
+            return self.cached(('weights', source['layer']), lambda: w.T, w)
         else: raise ValueError("""could not get links:
             layers '%s' and '%s' are not connected!"""
             % (source['layer'], self.params['layer']))
@@ -76,7 +169,7 @@ class UnitsBaseClass:
             return self.source
         elif 'target' in self.target \
             and source['layer'] == self.target['target']:
-            return {'W': self.target['W'].T, 'A': self.target['A'].T}
+            return {'W': self.weights(source), 'A': self.adjacency(source)}
         else: raise ValueError("""could not get links:
             layers '%s' and '%s' are not connected!"""
             % (source['name'], self.params['name']))
@@ -88,11 +181,40 @@ class UnitsBaseClass:
             return self.source['A']
         elif 'target' in self.target \
             and source['layer'] == self.target['target']:
-            return self.target['A'].T
+            a = self.target['A']
+            if not Links.issparse(a): return a.T
+            return self.cached(('adjacency', source['layer']),
+                lambda: a.T, a)
         else: raise ValueError("""could not get links:
             layers '%s' and '%s' are not connected!"""
             % (source['layer'], self.params['layer']))
 
+    def adjweights(self, source):
+        """Return product of adjacency and weights of links to a source
+        layer.
+
+        For sparse link layers the product is a sparse matrix, which
+        shares the structure of the weights, including zero products.
+        The product is recalculated after parameter updates or if the
+        weights are replaced. Adjacencies, which are replaced, require to
+        touch the unit layer.
+
+        """
+
+        def product():
+            a = self.adjacency(source)
+            w = self.weights(source)
+            if not Links.issparse(w): return a * w
+            m = w.copy()
+            m.data = a.data * w.data
+            return m
+
+        if self.source.get('source') == source['layer']:
+            w = self.source['W']
+        else: w = self.target.get('W')
+
+        return self.cached(('adjweights', source['layer']), product, w)
+
 class Sigmoid(UnitsBaseClass):
     """Sigmoidal Unit Layer.
 
@@ -101,13 +223,27 @@ class Sigmoid(UnitsBaseClass):
 
     """
 
+    # activation function and its derivative are bound once, to bypass the
+    # name based dispatch of curve.sigmoid() and curve.bell()
+    _activation = staticmethod(curve.get_function('logistic'))
+    _activation_d = staticmethod(curve.get_function('d_logistic', 'bell'))
+
+    @staticmethod
+    def _activation_inplace(x):
+        """Evaluate standard logistic function in place."""
+
+        numpy.negative(x, out = x)
+        numpy.exp(x, out = x)
+        x += 1.
+        return numpy.reciprocal(x, out = x)
+
     def initialize(self, data = None):
         """Initialize system parameters of sigmoid distributed units
         using data. """
 
         size = len(self.params['id'])
         shape = (1, size)
-        self.params['bias'] = 0.5 * numpy.ones(shape)
+        self.params['bias'] = 0.5 * numpy.ones(shape, dtype = self.dtype)
         return True
 
     def update(self, updates):
@@ -116,7 +252,7 @@ class Sigmoid(UnitsBaseClass):
         if 'bias'in updates:
             self.params['bias'] += updates['bias']
 
-        return True
+        return self.touch()
 
     @staticmethod
     def remove(layer, select):
@@ -138,22 +274,35 @@ class Sigmoid(UnitsBaseClass):
 
         return - data * bias
 
-    def expect_from_sigmoid_layer(self, data, source, weights):
+    def expect_from_sigmoid_layer(self, data, source, weights, out = None):
         """Return expected values of a sigmoid output layer
         calculated from a sigmoid input layer. """
 
         bias = self.params['bias']
+        if out is None:
+            return self._activation(bias + Links.dot(data, weights))
+
+        out = Links.dot(data, weights, out = out)
+        out += bias
 
-        return curve.sigmoid(bias + numpy.dot(data, weights))
+        return self._activation_inplace(out)
 
-    def expect_from_gauss_layer(self, data, source, weights):
+    def expect_from_gauss_layer(self, data, source, weights, out = None,
+        scaled = None):
         """Return expected values of a sigmoid output layer
         calculated from a gaussian input layer. """
 
-        bias = self.params['bias']
-        sdev = numpy.sqrt(numpy.exp(source['lvar']))
+        sdev = self.source_sdev(source)
+        if scaled is None: scaled = data / sdev
+        else: scaled = numpy.divide(data, sdev, out = scaled)
+
+        return self.expect_from_sigmoid_layer(
+            scaled, source, weights, out = out)
 
-        return curve.sigmoid(bias + numpy.dot(data / sdev, weights))
+    def activation(self, x):
+        """Return expected values of sigmoid units from their net input."""
+
+        return self._activation(x)
 
     def get_param_updates(self, data, model, weights):
         """Return parameter updates of a sigmoidal output layer
@@ -169,19 +318,21 @@ class Sigmoid(UnitsBaseClass):
 
         return {'bias': - numpy.mean(delta, axis = 0).reshape((1, size))}
 
-    def delta_from_bprop(self, data, delta, win, wout):
+    def delta_from_bprop(self, data, delta, win, wout, netin = None):
         """
 
         data: input data
         delta: error delta out
         win: weights in
         wout: weights out
+        netin: net input of units from forward pass. If given, the net
+            input is not recomputed from input data and weights in
         """
 
-        value = numpy.dot(delta, wout)
-        bias = self.params['bias']
-        backdelta = value * curve.bell_d_logistic(
-            (bias + numpy.dot(data, win)))
+        value = Links.dot(delta, wout)
+        if netin is None:
+            netin = self.params['bias'] + Links.dot(data, win)
+        backdelta = value * self._activation_d(netin)
 
         return backdelta
 
@@ -195,19 +346,22 @@ class Sigmoid(UnitsBaseClass):
             * (1. - 1. / (1. + numpy.exp(-x))))
 
     @staticmethod
-    def get_values(data):
+    def get_values(data, out = None):
         """Return median of bernoulli distributed layer
         calculated from expected values. """
 
-        return (data > 0.5).astype(float)
+        if out is None: return (data > 0.5).astype(float)
 
-    @staticmethod
-    def get_samples(data):
+        return numpy.greater(data, 0.5, out = out)
+
+    def get_samples(self, data, out = None):
         """Return sample of bernoulli distributed layer
         calculated from expected value. """
 
-        return (data > numpy.random.rand(
-            data.shape[0], data.shape[1])).astype(float)
+        rand = self.random.rand(data.shape[0], data.shape[1])
+        if out is None: return (data > rand).astype(data.dtype)
+
+        return numpy.greater(data, rand, out = out)
 
     def get(self, unit):
 
@@ -240,8 +394,8 @@ class Gauss(UnitsBaseClass):
             sdev = numpy.ones([1, size])
 
         # initialise bias and log variance of units
-        self.params['bias'] = mean
-        self.params['lvar'] = numpy.log(sigma * sdev ** 2)
+        self.params['bias'] = mean.astype(self.dtype)
+        self.params['lvar'] = numpy.log(sigma * sdev ** 2).astype(self.dtype)
 
         return True
 
@@ -253,24 +407,38 @@ class Gauss(UnitsBaseClass):
         if 'lvar' in updates:
             self.params['lvar'] += updates['lvar']
 
-        return True
+        return self.touch()
+
+    def var(self):
+        """Return variances of gaussian units."""
+
+        lvar = self.params['lvar']
+
+        return self.cached('var', lambda: numpy.exp(lvar), lvar)
+
+    def sdev(self):
+        """Return standard deviations of gaussian units."""
+
+        lvar = self.params['lvar']
+
+        return self.cached('sdev', lambda: numpy.sqrt(self.var()), lvar)
 
     def get_param_updates(self, data, model, weights):
         """Return parameter updates of a gaussian output layer
         calculated from real data and modeled data. """
 
         shape = (1, len(self.params['id']))
-        var = numpy.exp(self.params['lvar'])
+        var = self.var()
         bias = self.params['bias']
 
         updBias = numpy.mean(
             data[1] - model[1], axis = 0).reshape(shape) / var
         updLVarData = numpy.mean(
             0.5 * (data[1] - bias) ** 2 - data[1]
-            * numpy.dot(data[0], weights), axis = 0)
+            * Links.dot(data[0], weights), axis = 0)
         updLVarModel = numpy.mean(
             0.5 * (model[1] - bias) ** 2 - model[1]
-            * numpy.dot(model[0], weights), axis = 0)
+            * Links.dot(model[0], weights), axis = 0)
         updLVar = (updLVarData - updLVarModel).reshape(shape) / var
 
         return { 'bias': updBias, 'lvar': updLVar }
@@ -292,20 +460,34 @@ class Gauss(UnitsBaseClass):
 
         return True
 
-    def expect_from_sigmoid_layer(self, data, source, weights):
+    def expect_from_sigmoid_layer(self, data, source, weights, out = None):
         """Return expected values of a gaussian output layer
         calculated from a sigmoid input layer. """
 
-        return self.params['bias'] + numpy.dot(data, weights)
+        if out is None: return self.params['bias'] + Links.dot(data, weights)
 
-    def expect_from_gauss_layer(self, data, source, weights):
+        out = Links.dot(data, weights, out = out)
+        out += self.params['bias']
+
+        return out
+
+    def expect_from_gauss_layer(self, data, source, weights, out = None,
+        scaled = None):
         """Return expected values of a gaussian output layer
         calculated from a gaussian input layer. """
 
-        bias = self.params['bias']
-        sdev = numpy.sqrt(numpy.exp(source['lvar']))
+        sdev = self.source_sdev(source)
+        if scaled is None: scaled = data / sdev
+        else: scaled = numpy.divide(data, sdev, out = scaled)
+
+        return self.expect_from_sigmoid_layer(
+            scaled, source, weights, out = out)
 
-        return bias + numpy.dot(data / sdev, weights)
+    @staticmethod
+    def activation(x):
+        """Return expected values of gaussian units from their net input."""
+
+        return x
 
     @staticmethod
     def grad(x):
@@ -321,24 +503,30 @@ class Gauss(UnitsBaseClass):
     def energy(self, data):
 
         bias = self.params['bias']
-        var = numpy.exp(self.params['lvar'])
+        var = self.var()
         energy = 0.5 * (data - bias) ** 2 / var
 
         return energy
 
     @staticmethod
-    def get_values(data):
+    def get_values(data, out = None):
         """Return median of gauss distributed layer
         calculated from expected values."""
 
-        return data
+        if out is None or out is data: return data
+        numpy.copyto(out, data)
 
-    def get_samples(self, data):
+        return out
+
+    def get_samples(self, data, out = None):
         """Return sample of gauss distributed layer
         calculated from expected values. """
 
-        sigma = numpy.sqrt(numpy.exp(self.params['lvar']))
-        return numpy.random.normal(data, sigma)
+        samples = self.random.normal(data, self.sdev())
+        if out is None: return samples.astype(data.dtype)
+        numpy.copyto(out, samples)
+
+        return out
 
     def get(self, unit):
 
@@ -86,7 +86,8 @@ def install() -> None:
             'pyparsing>=2.2'],
         extras_require={
             'gui': ['pyside'],
-            'gene': ['rpy2']},
+            'gene': ['rpy2'],
+            'sparse': ['scipy']},
         entry_points={
             'console_scripts': [
                 'nemoa = nemoa.core.cli:main']},